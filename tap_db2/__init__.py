@@ -6,7 +6,6 @@ import itertools
 # import json
 import logging
 import os
-import copy
 
 # import uuid
 
@@ -20,21 +19,27 @@ from singer import utils
 from singer.schema import Schema
 from singer.catalog import Catalog, CatalogEntry
 
+import tap_db2.sync_strategies.change_probe as change_probe
 import tap_db2.sync_strategies.common as common
 import tap_db2.sync_strategies.full_table as full_table
 import tap_db2.sync_strategies.incremental as incremental
 import tap_db2.sync_strategies.logical as logical
+import tap_db2.sync_strategies.snapshot as snapshot
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.checkpoint import state_snapshot
+from tap_db2.sync_strategies.data_partitions import discover_data_partitions
 
 from tap_db2.connection import (
     # connect_with_backoff,
-    get_db2_sql_engine,
+    get_db2_engine,
+    PROGRAMMING_ERRORS,
     ResultIterator,
 )
 
 from sqlalchemy import text
-from sqlalchemy.exc import ProgrammingError
 
-ARRAYSIZE = 1
+# Rows fetched at a time by discovery, unless cursor_array_size is set
+ARRAYSIZE = 1000
 
 Column = collections.namedtuple(
     "Column",
@@ -254,6 +259,21 @@ def create_column_metadata(cols, config):
             "sql-datatype",
             c.data_type.strip().lower(),
         )
+        # Used to estimate row sizes when choosing how many rows to fetch
+        mdata = metadata.write(
+            mdata,
+            ("properties", c.column_name),
+            "sql-datatype-length",
+            c.character_maximum_length,
+        )
+        # Lets batch encoding rely on the declared scale of DECIMAL values
+        if c.numeric_scale is not None:
+            mdata = metadata.write(
+                mdata,
+                ("properties", c.column_name),
+                "sql-datatype-scale",
+                c.numeric_scale,
+            )
 
     return metadata.to_list(mdata)
 
@@ -271,7 +291,8 @@ def discover_catalog(db2_conn, config):
             SELECT
                 RTRIM(TABSCHEMA) AS TABLE_SCHEMA,
                 TABNAME AS TABLE_NAME,
-                TYPE AS TABLE_TYPE
+                TYPE AS TABLE_TYPE,
+                TEMPORALTYPE AS TEMPORAL_TYPE
             FROM SYSCAT.TABLES t
             WHERE t.TABSCHEMA NOT IN (
                 'SYSTOOLS',
@@ -285,13 +306,16 @@ def discover_catalog(db2_conn, config):
         )
         table_info = {}
 
-        for (db, table, table_type) in tables_results.fetchall():
+        for (db, table, table_type, temporal_type) in tables_results.fetchall():
             if db not in table_info:
                 table_info[db] = {}
 
             table_info[db][table] = {
                 "row_count": None,
                 "is_view": table_type == "V",
+                "system_period_temporal": (
+                    temporal_type in snapshot.SYSTEM_PERIOD_TEMPORAL_TYPES
+                ),
             }
 
             LOGGER.debug(f"Schema: {db}, Table: {table}")
@@ -327,12 +351,15 @@ def discover_catalog(db2_conn, config):
             """)
         )
         columns = []
-        LOGGER.info(f"{ARRAYSIZE=}")
+        arraysize = config.get('cursor_array_size') or ARRAYSIZE
+        LOGGER.info(f"{arraysize=}")
         
-        for r in ResultIterator(column_results, ARRAYSIZE):
+        for r in ResultIterator(column_results, arraysize):
             columns.append(Column(*r))
         
-        LOGGER.info("Columns Fetched")
+        LOGGER.info("Columns Fetched, fetching data partitions")
+        data_partitions = discover_data_partitions(open_conn)
+
         entries = []
         for (k, cols) in itertools.groupby(
             columns, lambda c: (c.table_schema, c.table_name)
@@ -363,6 +390,11 @@ def discover_catalog(db2_conn, config):
 
                 md_map = metadata.write(md_map, (), "is-view", is_view)
 
+                if table_info[table_schema][table_name]["system_period_temporal"]:
+                    md_map = metadata.write(
+                        md_map, (), "system-period-temporal", True
+                    )
+
             key_properties = [
                 c.column_name for c in cols if c.is_primary_key == 1
             ]
@@ -371,6 +403,24 @@ def discover_catalog(db2_conn, config):
                 md_map, (), "table-key-properties", key_properties
             )
 
+            if (table_schema, table_name) in data_partitions:
+                partitioning = data_partitions[(table_schema, table_name)]
+                md_map = metadata.write(
+                    md_map,
+                    (),
+                    "data-partition-expressions",
+                    partitioning["expressions"],
+                )
+                md_map = metadata.write(
+                    md_map,
+                    (),
+                    "data-partition-nulls-first",
+                    partitioning["nulls-first"],
+                )
+                md_map = metadata.write(
+                    md_map, (), "data-partitions", partitioning["partitions"]
+                )
+
             entry = CatalogEntry(
                 table=table_name,
                 stream=table_name,
@@ -558,12 +608,14 @@ def get_binlog_streams(db2_conn, catalog, config, state):
     return resolve_catalog(discovered, binlog_streams)
 
 
-def write_schema_message(config, catalog_entry, bookmark_properties=[]):
+def write_schema_message(
+    config, catalog_entry, message_writer, bookmark_properties=[]
+):
     key_properties = common.get_key_properties(catalog_entry)
 
     table_stream = common.set_schema_mapping(config, catalog_entry.stream)
 
-    singer.write_message(
+    message_writer.write_message(
         singer.SchemaMessage(
             stream=table_stream,
             schema=catalog_entry.schema.to_dict(),
@@ -573,7 +625,9 @@ def write_schema_message(config, catalog_entry, bookmark_properties=[]):
     )
 
 
-def do_sync_incremental(db2_conn, config, catalog_entry, state, columns):
+def do_sync_incremental(
+    db2_conn, config, catalog_entry, state, columns, message_writer
+):
     md_map = metadata.to_map(catalog_entry.metadata)
     # stream_version = common.get_stream_version(
     #     catalog_entry.tap_stream_id, state
@@ -583,25 +637,43 @@ def do_sync_incremental(db2_conn, config, catalog_entry, state, columns):
     write_schema_message(
         config,
         catalog_entry=catalog_entry,
+        message_writer=message_writer,
         bookmark_properties=[replication_key],
     )
     LOGGER.info("Schema written")
-    incremental.sync_table(db2_conn, config, catalog_entry, state, columns)
+    incremental.sync_table(
+        db2_conn,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        message_writer,
+    )
 
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    message_writer.write_message(
+        singer.StateMessage(value=state_snapshot(state, catalog_entry.tap_stream_id))
+    )
 
 
-def do_sync_full_table(db2_conn, config, catalog_entry, state, columns):
+def do_sync_full_table(
+    db2_conn, config, catalog_entry, state, columns, message_writer
+):
     # key_properties = common.get_key_properties(catalog_entry)
 
-    write_schema_message(config, catalog_entry)
+    write_schema_message(config, catalog_entry, message_writer)
 
     stream_version = common.get_stream_version(
         catalog_entry.tap_stream_id, state
     )
 
     full_table.sync_table(
-        db2_conn, config, catalog_entry, state, columns, stream_version
+        db2_conn,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        stream_version,
+        message_writer,
     )
 
     # Prefer initial_full_table_complete going forward
@@ -611,14 +683,18 @@ def do_sync_full_table(db2_conn, config, catalog_entry, state, columns):
         state, catalog_entry.tap_stream_id, "initial_full_table_complete", True
     )
 
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    message_writer.write_message(
+        singer.StateMessage(value=state_snapshot(state, catalog_entry.tap_stream_id))
+    )
 
 
-def do_sync_log_based_table(db2_conn, config, catalog_entry, state, columns):
+def do_sync_log_based_table(
+    db2_conn, config, catalog_entry, state, columns, message_writer
+):
 
     # key_properties = common.get_key_properties(catalog_entry)
     state = singer.set_currently_syncing(state, catalog_entry.tap_stream_id)
-    write_schema_message(config, catalog_entry)
+    write_schema_message(config, catalog_entry, message_writer)
 
     # stream_version = common.get_stream_version(
     #     catalog_entry.tap_stream_id, state
@@ -626,7 +702,7 @@ def do_sync_log_based_table(db2_conn, config, catalog_entry, state, columns):
 
     # initial instance of log_based connector class
     log_based = logical.log_based_sync(
-        db2_conn, config, catalog_entry, state, columns
+        db2_conn, config, catalog_entry, state, columns, message_writer
     )
 
     # assert all of the log_based prereq's are met
@@ -656,7 +732,9 @@ def do_sync_log_based_table(db2_conn, config, catalog_entry, state, columns):
     initial_load = log_based.log_based_initial_full_table()
 
     if initial_load:
-        do_sync_full_table(db2_conn, config, catalog_entry, state, columns)
+        do_sync_full_table(
+            db2_conn, config, catalog_entry, state, columns, message_writer
+        )
         state = singer.write_bookmark(
             state,
             catalog_entry.tap_stream_id,
@@ -677,7 +755,16 @@ def do_sync_log_based_table(db2_conn, config, catalog_entry, state, columns):
         log_based.execute_log_based_sync()
 
 
-def sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state):
+def sync_non_binlog_streams(
+    db2_conn, non_binlog_catalog, config, state, message_writer
+):
+
+    # Every table opted in is probed in one query, before any is synced
+    change_signatures = change_probe.probe_streams(
+        db2_conn, non_binlog_catalog.streams, config
+    )
+    # System-period temporal tables are all read as of the same point in time
+    run_start = snapshot.run_start_time(db2_conn, non_binlog_catalog.streams, config)
 
     for catalog_entry in non_binlog_catalog.streams:
         columns = list(catalog_entry.schema.properties.keys())
@@ -694,7 +781,9 @@ def sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state):
         )
 
         # Emit a state message to indicate that we've started this stream
-        singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+        message_writer.write_message(
+            singer.StateMessage(value=state_snapshot(state))
+        )
 
         md_map = metadata.to_map(catalog_entry.metadata)
         replication_method = md_map.get((), {}).get("replication-method")
@@ -721,6 +810,13 @@ def sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state):
         LOGGER.info(
             f"Table {catalog_entry.table} will use {replication_method} sync"
         )
+        snapshot_time = snapshot.pin_system_time(
+            catalog_entry, state, config, run_start
+        )
+        LOGGER.info(
+            f"Table {catalog_entry.table} will be read with "
+            f"{common.pin_read_clauses(catalog_entry, config) or 'no extra clauses'}"
+        )
 
         database_name = common.get_database_name(catalog_entry)
 
@@ -731,12 +827,29 @@ def sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state):
             if replication_method == "INCREMENTAL":
                 LOGGER.info(f"syncing {catalog_entry.table} incrementally")
                 do_sync_incremental(
-                    db2_conn, config, catalog_entry, state, columns
+                    db2_conn, config, catalog_entry, state, columns, message_writer
                 )
             elif replication_method == "FULL_TABLE":
+                signature = change_signatures.get(catalog_entry.tap_stream_id)
+                if change_probe.should_skip(catalog_entry, state, signature, config):
+                    state = change_probe.bookmark_skipped_run(state, catalog_entry)
+                    message_writer.write_message(
+                        singer.StateMessage(
+                            value=state_snapshot(state, catalog_entry.tap_stream_id)
+                        )
+                    )
+                    continue
+                state = change_probe.bookmark_signature(state, catalog_entry, signature)
+                if snapshot_time is not None:
+                    state = singer.write_bookmark(
+                        state,
+                        catalog_entry.tap_stream_id,
+                        "snapshot_time",
+                        snapshot_time,
+                    )
                 LOGGER.info(f"syncing {catalog_entry.table} full table")
                 do_sync_full_table(
-                    db2_conn, config, catalog_entry, state, columns
+                    db2_conn, config, catalog_entry, state, columns, message_writer
                 )
             elif replication_method == "LOG_BASED":
                 LOGGER.info(
@@ -744,7 +857,7 @@ def sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state):
                     "LOG_BASED"
                 )
                 do_sync_log_based_table(
-                    db2_conn, config, catalog_entry, state, columns
+                    db2_conn, config, catalog_entry, state, columns, message_writer
                 )
             else:
                 raise Exception(
@@ -753,17 +866,19 @@ def sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state):
                 )
 
     state = singer.set_currently_syncing(state, None)
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    message_writer.write_message(singer.StateMessage(value=state_snapshot(state)))
 
 
-def do_sync(db2_conn, config, catalog, state):
+def do_sync(db2_conn, config, catalog, state, message_writer):
     LOGGER.info("Beginning sync")
     non_binlog_catalog = get_non_binlog_streams(
         db2_conn, catalog, config, state
     )
     for entry in non_binlog_catalog.streams:
         LOGGER.info(f"Need to sync {entry.table}")
-    sync_non_binlog_streams(db2_conn, non_binlog_catalog, config, state)
+    sync_non_binlog_streams(
+        db2_conn, non_binlog_catalog, config, state, message_writer
+    )
 
 
 def log_server_params(db2_conn):
@@ -789,7 +904,7 @@ def log_server_params(db2_conn):
                    SELECT {} FROM SYSIBMADM.ENV_INST_INFO
                 """.format(','.join(server_parameters)))
             )
-        except ProgrammingError:
+        except PROGRAMMING_ERRORS:
             row = open_conn.execute(text(
                 """
                    SELECT {} FROM TABLE (sysproc.env_get_inst_info()) as instanceinfo
@@ -808,24 +923,21 @@ def log_server_params(db2_conn):
 
 def main_impl():
     
-    global ARRAYSIZE
     args = utils.parse_args(REQUIRED_CONFIG_KEYS)
-    db2_conn = get_db2_sql_engine(args.config)
+    db2_conn = get_db2_engine(args.config)
     log_server_params(db2_conn)
-    
-    # Set ARRAYSIZE here
-    ARRAYSIZE = args.config.get('cursor_array_size',1)
-    common.ARRAYSIZE = ARRAYSIZE
 
     if args.discover:
         do_discover(db2_conn, args.config)
-    elif args.catalog:
-        state = args.state or {}
-        do_sync(db2_conn, args.config, args.catalog, state)
-    elif args.properties:
-        catalog = Catalog.from_dict(args.properties)
+    elif args.catalog or args.properties:
+        catalog = args.catalog or Catalog.from_dict(args.properties)
         state = args.state or {}
-        do_sync(db2_conn, args.config, catalog, state)
+        # Everything written during the sync goes through the buffered writer
+        message_writer = writer.from_config(args.config)
+        try:
+            do_sync(db2_conn, args.config, catalog, state, message_writer)
+        finally:
+            message_writer.close()
     else:
         LOGGER.info("No properties were selected")
 
@@ -1,18 +1,39 @@
 #!/usr/bin/env python3
 
 import backoff
+import decimal
+import random
+import time
 
+import ibm_db
+import ibm_db_dbi
 import pyodbc
 
+from ibm_db_sa.ibm_db import DB2Dialect_ibm_db
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import ProgrammingError
 
 import singer
+import singer.metrics as metrics
 # import ssl
 
 # from urllib.parse import quote_plus
 LOGGER = singer.get_logger()
 
+FETCH_BACKENDS = {"sqlalchemy", "ibm_db"}
+
+# Raised for invalid SQL (e.g. a missing catalog view) by either backend
+PROGRAMMING_ERRORS = (ProgrammingError, ibm_db_dbi.ProgrammingError)
+
+# Errors after which the same statement can succeed on a new connection:
+# communication errors, client reroute, a forced agent, deadlocks and lock
+# timeouts
+RETRYABLE_SQLCODES = ("SQL30081N", "SQL30108N", "SQL1224N", "SQL0911N", "SQL0913N")
+DEFAULT_MAX_RECONNECTS = 5
+DEFAULT_RECONNECT_BACKOFF_SECONDS = 2
+MAX_RECONNECT_BACKOFF_SECONDS = 300
+
 @backoff.on_exception(backoff.expo, pyodbc.Error, max_tries=5, factor=2)
 def connect_with_backoff(connection):
     warnings = []
@@ -30,6 +51,68 @@ def connect_with_backoff(connection):
     return connection
 
 
+def retryable_sqlcode(exc):
+    """Returns the SQL code of a retryable error, None for any other error.
+
+    Both backends put the DB2 message, with its SQL code, in the error
+    text; SQLAlchemy wraps the driver's error, which is searched as well.
+    """
+    while exc is not None:
+        message = str(exc)
+        for sqlcode in RETRYABLE_SQLCODES:
+            if sqlcode in message:
+                return sqlcode
+        exc = getattr(exc, "orig", None) or exc.__cause__
+    return None
+
+
+def reconnect_delay(attempt, config):
+    """Seconds to wait before reconnect attempt n, with full jitter."""
+    base = config.get("reconnect_backoff_seconds")
+    if base is None:
+        base = DEFAULT_RECONNECT_BACKOFF_SECONDS
+    return random.uniform(
+        0, min(MAX_RECONNECT_BACKOFF_SECONDS, base * 2 ** (attempt - 1))
+    )
+
+
+def with_reconnect(engine, config, catalog_entry, sync_on_connection):
+    """Runs sync_on_connection(open_conn), reconnecting after retryable errors.
+
+    sync_on_connection must resume from the stream's bookmarks, which only
+    move forward with rows already written, so a new connection picks up
+    after the last row written, or start the stream again in a new table
+    version when it has nothing to resume from. Up to max_reconnects (default 5) reconnects
+    are made per stream, each counted in a "reconnects" metric.
+    """
+    max_reconnects = config.get("max_reconnects")
+    if max_reconnects is None:
+        max_reconnects = DEFAULT_MAX_RECONNECTS
+
+    attempt = 0
+    while True:
+        try:
+            with engine.connect() as open_conn:
+                return sync_on_connection(open_conn)
+        except Exception as exc:
+            sqlcode = retryable_sqlcode(exc)
+            if sqlcode is None or attempt >= max_reconnects:
+                raise
+            attempt += 1
+            delay = reconnect_delay(attempt, config)
+            LOGGER.warning(
+                f"{sqlcode} while syncing {catalog_entry.tap_stream_id}, "
+                f"reconnecting in {delay:.1f}s to resume "
+                f"({attempt} of {max_reconnects}): {exc}"
+            )
+            with metrics.Counter(
+                "reconnects",
+                {"table": catalog_entry.table, "sqlcode": sqlcode},
+            ) as counter:
+                counter.increment()
+            time.sleep(delay)
+
+
 def decode_sketchy_utf16(raw_bytes):
     """Updates the output handling where malformed unicode is received"""
     s = raw_bytes.decode("utf-16le", "ignore")
@@ -78,3 +161,144 @@ def ResultIterator(cursor, arraysize=1):
             break
         for result in results:
             yield result
+
+
+class NativeResult:
+    """Result of a statement executed on the native ibm_db backend.
+
+    Rows are fetched with ibm_db.fetch_tuple straight from the statement
+    handle, skipping the per-row and per-value work in ibm_db_dbi. DECIMAL
+    columns, which ibm_db returns as strings, are converted to Decimal as
+    ibm_db_dbi does, so both backends produce the same values.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.stmt = cursor.stmt_handler
+        self.decimal_columns = []
+        if self.stmt is not None:
+            self.decimal_columns = [
+                idx
+                for idx in range(ibm_db.num_fields(self.stmt) or 0)
+                if str(ibm_db.field_type(self.stmt, idx)).upper() == "DECIMAL"
+            ]
+
+    def _fix_decimals(self, row):
+        row = list(row)
+        for idx in self.decimal_columns:
+            if row[idx] is not None:
+                row[idx] = decimal.Decimal(str(row[idx]).replace(",", "."))
+        return tuple(row)
+
+    def fetchmany(self, size=1):
+        # ibm_db has no multi-row fetch, so this is one fetch_tuple call per
+        # row; it is the CLI that fetches rows from the server in blocks for
+        # FOR READ ONLY cursors, whichever backend is used
+        fetch_tuple = ibm_db.fetch_tuple
+        stmt = self.stmt
+        rows = []
+        for _ in range(size):
+            row = fetch_tuple(stmt)
+            if row is False:
+                break
+            rows.append(row)
+        if self.decimal_columns:
+            rows = [self._fix_decimals(row) for row in rows]
+        return rows
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchall(self):
+        rows = []
+        while True:
+            batch = self.fetchmany(10000)
+            if not batch:
+                return rows
+            rows.extend(batch)
+
+    def close(self):
+        self.cursor.close()
+
+
+class NativeConnection:
+    """A DB-API connection from ibm_db_dbi with the execute() used by the tap.
+
+    Statements are given as SQLAlchemy text() clauses (or plain strings) and
+    compiled with the ibm_db_sa dialect, so named bind parameters become the
+    same qmark parameters SQLAlchemy would send.
+    """
+
+    def __init__(self, connection, dialect):
+        self.connection = connection
+        self.dialect = dialect
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def execute(self, statement, parameters=None):
+        if isinstance(statement, str):
+            sql = statement
+            params = tuple(parameters or ())
+        else:
+            compiled = statement.compile(dialect=self.dialect)
+            sql = str(compiled)
+            params = tuple(compiled.params[name] for name in compiled.positiontup)
+
+        cursor = self.connection.cursor()
+        cursor.execute(sql, params or None)
+        return NativeResult(cursor)
+
+    def close(self):
+        self.connection.close()
+
+
+def dsn_value(value):
+    """Braces a connection string value so ; and = in it are taken literally."""
+    return "{" + str(value).replace("}", "}}") + "}"
+
+
+class NativeEngine:
+    """Opens ibm_db_dbi connections for the native fetch backend.
+
+    Exposes connect() like a SQLAlchemy Engine so discovery and the sync
+    strategies run unchanged on either backend.
+    """
+
+    def __init__(self, config):
+        self.dsn = (
+            "DATABASE={};HOSTNAME={};PORT={};PROTOCOL=TCPIP;UID={};PWD={};".format(
+                config["database"],
+                config["hostname"],
+                config["port"],
+                dsn_value(config["username"]),
+                dsn_value(config["password"]),
+            )
+        )
+        self.dialect = DB2Dialect_ibm_db()
+
+    def connect(self):
+        return NativeConnection(ibm_db_dbi.connect(self.dsn, "", ""), self.dialect)
+
+
+def get_db2_engine(config):
+    """Returns the engine for the configured fetch_backend.
+
+    "sqlalchemy" (the default) uses ibm_db_sa; "ibm_db" executes the same SQL
+    on the ibm_db driver directly, bypassing SQLAlchemy's result processing.
+    """
+    fetch_backend = config.get("fetch_backend") or "sqlalchemy"
+    if fetch_backend not in FETCH_BACKENDS:
+        raise Exception(
+            f"Unknown fetch_backend {fetch_backend}, expected one of {sorted(FETCH_BACKENDS)}"
+        )
+    LOGGER.info(f"Using the {fetch_backend} fetch backend")
+
+    if fetch_backend == "ibm_db":
+        return NativeEngine(config)
+    return get_db2_sql_engine(config)
+
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import datetime
+import decimal
+
+import singer
+
+from tap_db2.sync_strategies.record_encoder import (
+    RecordEncoder,
+    encode_string,
+    encode_value,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - pyarrow is an optional dependency
+    pa = None
+    pc = None
+
+LOGGER = singer.get_logger()
+
+# str() of a Decimal switches to exponent notation below this many decimal
+# places, which Arrow's decimal-to-string cast never does
+MAX_DECIMAL_KERNEL_SCALE = 6
+
+# Errors pyarrow raises when a column slice does not convert to the expected
+# type (out of range integers, extra decimal places and so on)
+ARROW_CONVERSION_ERRORS = (TypeError, ValueError, OverflowError)
+
+# Python types each kernel accepts; datetime is a subclass of date and bool of
+# int, so the types are compared exactly
+NONE_TYPE = type(None)
+TIMESTAMP_VALUE_TYPES = {datetime.datetime, NONE_TYPE}
+DATE_VALUE_TYPES = {datetime.date, NONE_TYPE}
+INTEGER_VALUE_TYPES = {int, NONE_TYPE}
+DECIMAL_VALUE_TYPES = {decimal.Decimal, NONE_TYPE}
+BOOLEAN_VALUE_TYPES = {bool, NONE_TYPE}
+DECIMAL_KERNEL_PRECISION = 38
+
+
+def arrow_available():
+    return pa is not None
+
+
+def _quoted(strings):
+    return pc.binary_join_element_wise('"', strings, '"', "")
+
+
+def _timestamp_kernel(values, value_types, plan, idx):
+    if not value_types <= TIMESTAMP_VALUE_TYPES:
+        return None
+    # Arrow casts to "YYYY-MM-DD HH:MM:SS.ffffff", always with microseconds,
+    # which isoformat() leaves out when they are zero
+    strings = pc.cast(pa.array(values, pa.timestamp("us")), pa.string())
+    strings = pc.replace_substring(strings, " ", "T", max_replacements=1)
+    strings = pc.replace_substring(strings, ".000000", "")
+    return _quoted(pc.binary_join_element_wise(strings, "+00:00", ""))
+
+
+def _date_kernel(values, value_types, plan, idx):
+    if not value_types <= DATE_VALUE_TYPES:
+        return None
+    strings = pc.cast(pa.array(values, pa.date32()), pa.string())
+    if not plan.use_date_data_type_format:
+        strings = pc.binary_join_element_wise(strings, "T00:00:00+00:00", "")
+    return _quoted(strings)
+
+
+def _at_scale(values, scale):
+    exponent = -scale
+    for value in values:
+        if value is not None and (
+            value.as_tuple().exponent != exponent
+            or (value.is_signed() and value.is_zero())
+        ):
+            return False
+    return True
+
+
+def _number_kernel(values, value_types, plan, idx):
+    if value_types <= INTEGER_VALUE_TYPES:
+        return pc.cast(pa.array(values, pa.int64()), pa.string())
+
+    # Arrow pads every value to the column's scale, while str() keeps each
+    # Decimal's own exponent, so the kernel only takes slices whose values
+    # are all at the scale in the catalog. Arrow also has no negative zero.
+    scale = plan.scales[idx]
+    if (
+        value_types <= DECIMAL_VALUE_TYPES
+        and scale is not None
+        and 0 <= scale <= MAX_DECIMAL_KERNEL_SCALE
+        and _at_scale(values, scale)
+    ):
+        array = pa.array(values, pa.decimal128(DECIMAL_KERNEL_PRECISION, scale))
+        return pc.cast(array, pa.string())
+
+    return None
+
+
+def _singer_decimal_kernel(values, value_types, plan, idx):
+    strings = _number_kernel(values, value_types, plan, idx)
+    return None if strings is None else _quoted(strings)
+
+
+def _boolean_kernel(values, value_types, plan, idx):
+    if value_types <= BOOLEAN_VALUE_TYPES:
+        array = pa.array(values, pa.bool_())
+    elif value_types <= INTEGER_VALUE_TYPES:
+        array = pc.not_equal(pa.array(values, pa.int64()), 0)
+    else:
+        return None
+    return pc.if_else(array, "true", "false")
+
+
+# Kernels by StreamPlan converter kind. A kernel is given a column slice and
+# the set of Python types in it, and returns the JSON text of each value
+# (null for nulls), or None when the slice holds types it does not handle
+# exactly like the plan's converter.
+KERNELS = {
+    "timestamp": _timestamp_kernel,
+    "date": _date_kernel,
+    "singer.decimal": _singer_decimal_kernel,
+    "passthrough": _number_kernel,
+    "boolean": _boolean_kernel,
+}
+
+
+class ArrowRecordEncoder(RecordEncoder):
+    """Encodes batches of rows to RECORD message bytes with Arrow kernels.
+
+    Each column of a fetched batch whose values are all of the Python type
+    the driver returns for it (or None) is turned into an Arrow array.
+    TIMESTAMP, DATE, integer, DECIMAL (when every value is at the catalog's
+    scale, up to MAX_DECIMAL_KERNEL_SCALE places) and BOOLEAN columns are then formatted
+    by vectorised compute kernels, and the records are joined into one
+    buffer by Arrow as well. Any other column, or a slice with other types,
+    is converted value by value by the StreamPlan as in RecordEncoder. The output is
+    byte for byte that of RecordEncoder.encode_batch.
+    """
+
+    def __init__(self, plan, table_stream, version, time_extracted):
+        if not arrow_available():
+            raise Exception(
+                "arrow_batches requires pyarrow, install tap-db2[arrow]"
+            )
+        super().__init__(plan, table_stream, version, time_extracted)
+
+    def _column_json(self, idx, values):
+        kernel = KERNELS.get(self.plan.kinds[idx])
+        if kernel is not None:
+            try:
+                json_values = kernel(values, set(map(type, values)), self.plan, idx)
+            except (pa.ArrowException,) + ARROW_CONVERSION_ERRORS:
+                json_values = None
+
+            if json_values is not None:
+                return pc.fill_null(json_values, "null")
+
+        converted = self.plan.batch_converters[idx](values)
+        return pa.array([encode_value(value) for value in converted], pa.string())
+
+    def encode_batch(self, rows):
+        parts = [self.prefix]
+        for idx, values in enumerate(zip(*rows)):
+            separator = ", " if idx else ""
+            parts.append(separator + encode_string(self.plan.columns[idx]) + ": ")
+            parts.append(self._column_json(idx, values))
+        parts.append(self.suffix)
+
+        # The records are laid out one after another in the array's data
+        # buffer, each ending in a newline, so the buffer is the payload
+        records = pc.binary_join_element_wise(*parts, "")
+        _, offsets, data = records.buffers()
+        offsets = memoryview(offsets).cast("i")
+        start = offsets[records.offset]
+        end = offsets[records.offset + len(records)]
+        return bytes(memoryview(data)[start:end])
+
+
+def record_encoder_for_stream(plan, table_stream, version, time_extracted, config):
+    """Returns an ArrowRecordEncoder if arrow_batches is set, else a RecordEncoder."""
+    if config.get("arrow_batches"):
+        return ArrowRecordEncoder(plan, table_stream, version, time_extracted)
+    return RecordEncoder(plan, table_stream, version, time_extracted)
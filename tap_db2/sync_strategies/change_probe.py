@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import singer
+from singer import metadata
+from sqlalchemy import text
+
+import tap_db2.sync_strategies.common as common
+
+LOGGER = singer.get_logger()
+
+# A table that shows no changes is still synced on every n-th run
+DEFAULT_REFRESH_EVERY_RUNS = 7
+
+SIGNATURE_FIELDS = [
+    "alter_time",
+    "stats_time",
+    "rows_inserted",
+    "rows_updated",
+    "rows_deleted",
+    "db_conn_time",
+]
+
+
+def uses_change_probe(catalog_entry, config):
+    """Whether a FULL_TABLE sync is skipped when the table shows no changes.
+
+    Set full_table_skip_unchanged in the config, or the stream's
+    "full-table-skip-unchanged" metadata. MON_GET_TABLE only counts the
+    rows of tables, so views are always synced.
+    """
+    if common.get_is_view(catalog_entry):
+        return False
+    md_map = metadata.to_map(catalog_entry.metadata)
+    skip_unchanged = md_map.get((), {}).get("full-table-skip-unchanged")
+    if skip_unchanged is None:
+        skip_unchanged = config.get("full_table_skip_unchanged")
+    return bool(skip_unchanged)
+
+
+def refresh_every_runs(config):
+    return int(
+        config.get("full_table_refresh_every_runs") or DEFAULT_REFRESH_EVERY_RUNS
+    )
+
+
+def json_value(value):
+    if value is None or isinstance(value, (int, str)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return int(value)
+
+
+def table_change_signatures(open_conn, catalog_entries):
+    """Returns {tap_stream_id: signature} for the tables, in a single query.
+
+    A signature is the table's ALTER_TIME and STATS_TIME, its rows inserted,
+    updated and deleted as counted by MON_GET_TABLE over all members, and
+    the latest time a member activated the database. The counters start
+    again from zero when a member is activated, which moves db_conn_time,
+    so two equal signatures mean no rows were written in between. Counters
+    are None for a table nobody has touched since activation.
+    """
+    tables = {
+        (common.get_database_name(entry), entry.table): entry.tap_stream_id
+        for entry in catalog_entries
+    }
+    if not tables:
+        return {}
+
+    params = {}
+    predicates = []
+    for idx, (table_schema, table_name) in enumerate(tables):
+        params[f"table_schema_{idx}"] = table_schema
+        params[f"table_name_{idx}"] = table_name
+        predicates.append(
+            f"(t.TABSCHEMA = :table_schema_{idx} AND t.TABNAME = :table_name_{idx})"
+        )
+
+    sql = f"""
+        SELECT t.TABSCHEMA, t.TABNAME, t.ALTER_TIME, t.STATS_TIME,
+        SUM(m.ROWS_INSERTED), SUM(m.ROWS_UPDATED), SUM(m.ROWS_DELETED),
+        (SELECT MAX(DB_CONN_TIME) FROM TABLE(MON_GET_DATABASE(-2)) AS d)
+        FROM SYSCAT.TABLES t
+        LEFT JOIN TABLE(MON_GET_TABLE(NULL, NULL, -2)) AS m
+        ON m.TABSCHEMA = t.TABSCHEMA AND m.TABNAME = t.TABNAME
+        WHERE {" OR ".join(predicates)}
+        GROUP BY t.TABSCHEMA, t.TABNAME, t.ALTER_TIME, t.STATS_TIME
+        """
+    signatures = {}
+    for row in open_conn.execute(text(sql).bindparams(**params)).fetchall():
+        tap_stream_id = tables.get((row[0], row[1]))
+        if tap_stream_id is not None:
+            signatures[tap_stream_id] = dict(
+                zip(SIGNATURE_FIELDS, [json_value(v) for v in row[2:]])
+            )
+    return signatures
+
+
+def probe_streams(db2_conn, catalog_entries, config):
+    """Returns the change signatures of the streams using the change probe.
+
+    A probe that fails, for lack of the monitoring privileges say, returns
+    no signatures, so every stream is synced.
+    """
+    probed = [e for e in catalog_entries if uses_change_probe(e, config)]
+    if not probed:
+        return {}
+    try:
+        with db2_conn.connect() as open_conn:
+            signatures = table_change_signatures(open_conn, probed)
+    except Exception as exc:  # pylint: disable=broad-except
+        LOGGER.warning(f"Could not probe tables for changes, syncing them all: {exc}")
+        return {}
+    LOGGER.info(f"Probed {len(signatures)} tables for changes")
+    return signatures
+
+
+def should_skip(catalog_entry, state, signature, config):
+    """Whether the FULL_TABLE sync of the stream can be skipped this run.
+
+    Only a stream whose last sync finished, whose signature is unchanged
+    since, and that has been skipped fewer than
+    full_table_refresh_every_runs - 1 runs in a row, is skipped.
+    """
+    if signature is None:
+        return False
+    tap_stream_id = catalog_entry.tap_stream_id
+    bookmark = state.get("bookmarks", {}).get(tap_stream_id, {})
+    if not bookmark.get("initial_full_table_complete") or "version" in bookmark:
+        return False
+
+    probe = bookmark.get("change_probe") or {}
+    if probe.get("signature") != signature:
+        LOGGER.info(f"{tap_stream_id} changed since its last sync: {signature}")
+        return False
+    if probe.get("runs_skipped", 0) + 1 >= refresh_every_runs(config):
+        LOGGER.info(
+            f"{tap_stream_id} shows no changes, but was skipped "
+            f"{probe.get('runs_skipped', 0)} runs in a row; syncing it"
+        )
+        return False
+    LOGGER.info(f"{tap_stream_id} shows no changes since its last sync, skipping it")
+    return True
+
+
+def bookmark_skipped_run(state, catalog_entry):
+    probe = singer.get_bookmark(state, catalog_entry.tap_stream_id, "change_probe")
+    probe["runs_skipped"] = probe.get("runs_skipped", 0) + 1
+    return singer.write_bookmark(
+        state, catalog_entry.tap_stream_id, "change_probe", probe
+    )
+
+
+def bookmark_signature(state, catalog_entry, signature):
+    """Keeps the signature taken before a sync, to compare with on the next run.
+
+    It is taken before the table is read, so changes made during the sync
+    show up as a different signature next time.
+    """
+    if signature is None:
+        singer.clear_bookmark(state, catalog_entry.tap_stream_id, "change_probe")
+        return state
+    return singer.write_bookmark(
+        state,
+        catalog_entry.tap_stream_id,
+        "change_probe",
+        {"signature": signature, "runs_skipped": 0},
+    )
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import time
+
+import singer
+
+LOGGER = singer.get_logger()
+
+DEFAULT_CHECKPOINT_ROWS = 1000
+
+
+class CheckpointPolicy:
+    """Decides when sync_query writes a STATE message.
+
+    A checkpoint is due once rows rows, bytes bytes of RECORD messages or
+    seconds seconds have gone by since the last one, whichever comes first.
+    Limits that are None are not checked. It is consulted once per fetched
+    batch, so a STATE always follows the whole batch whose last row it
+    bookmarks.
+    """
+
+    def __init__(self, rows=DEFAULT_CHECKPOINT_ROWS, seconds=None, bytes=None):
+        # pylint: disable=redefined-builtin
+        self.rows = rows
+        self.seconds = seconds
+        self.bytes = bytes
+        self._reset()
+
+    def _reset(self):
+        self.rows_since = 0
+        self.bytes_since = 0
+        self.last_checkpoint = time.monotonic()
+
+    def due(self, rows, nbytes):
+        """Records a written batch and returns whether a STATE is due."""
+        self.rows_since += rows
+        self.bytes_since += nbytes
+
+        if (
+            (self.rows is not None and self.rows_since >= self.rows)
+            or (self.bytes is not None and self.bytes_since >= self.bytes)
+            or (
+                self.seconds is not None
+                and time.monotonic() - self.last_checkpoint >= self.seconds
+            )
+        ):
+            self._reset()
+            return True
+        return False
+
+
+def checkpoint_policy(config):
+    """Builds the CheckpointPolicy from checkpoint_rows/_seconds/_bytes."""
+    return CheckpointPolicy(
+        rows=config.get("checkpoint_rows") or DEFAULT_CHECKPOINT_ROWS,
+        seconds=config.get("checkpoint_seconds"),
+        bytes=config.get("checkpoint_bytes"),
+    )
+
+
+def state_snapshot(state, tap_stream_id=None):
+    """Copies the parts of state that change while a stream is synced.
+
+    The top level, the bookmarks mapping and the bookmarks of tap_stream_id
+    are copied; the bookmarks of every other stream are shared with state.
+    This is enough for a StateMessage, since the writer encodes a message as
+    soon as it is written and singer.write_bookmark only changes the stream
+    being synced.
+    """
+    snapshot = dict(state)
+    bookmarks = state.get("bookmarks")
+    if bookmarks is not None:
+        snapshot["bookmarks"] = dict(bookmarks)
+        if tap_stream_id in bookmarks:
+            snapshot["bookmarks"][tap_stream_id] = dict(bookmarks[tap_stream_id])
+    return snapshot
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code,too-many-arguments,too-many-locals
+
+import singer
+from singer import metadata
+from sqlalchemy import text
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.sync_strategies.checkpoint import state_snapshot
+from tap_db2.sync_strategies.keyset import (
+    chunk_size_for_stream,
+    keyset_chunk_query,
+    keyset_range,
+)
+from tap_db2.sync_strategies.pk_ranges import raw_key_plan
+from tap_db2.sync_strategies.stream_plan import BINARY_TYPES
+
+LOGGER = singer.get_logger()
+
+# Columns that can't be cast to VARCHAR; changes to them alone go unnoticed
+UNHASHABLE_TYPES = {"xml", "blob", "clob", "dbclob"}
+
+
+def uses_checksum_chunks(catalog_entry, config):
+    """Whether a FULL_TABLE sync only re-reads the key chunks that changed.
+
+    Set full_table_checksums in the config, or the stream's
+    "full-table-checksums" metadata. Only tables with a key are chunked.
+    """
+    if not common.get_key_properties(catalog_entry) or common.get_is_view(
+        catalog_entry
+    ):
+        return False
+    if chunk_size_for_stream(catalog_entry, config) <= 0:
+        return False
+    md_map = metadata.to_map(catalog_entry.metadata)
+    checksums = md_map.get((), {}).get("full-table-checksums")
+    if checksums is None:
+        checksums = config.get("full_table_checksums")
+    return bool(checksums)
+
+
+def checksum_version(catalog_entry, state):
+    """The table version the chunk checksums were taken for, None if none were."""
+    checksums = singer.get_bookmark(
+        state, catalog_entry.tap_stream_id, "chunk_checksums"
+    )
+    return checksums.get("version") if checksums else None
+
+
+def row_hash_expression(catalog_entry, columns):
+    """Hashes a row's column values into a BIGINT with HASH8.
+
+    Each column is hashed on its own and the hashes are hashed together,
+    which keeps the hashed string short however wide the row is and tells
+    NULL apart from any value.
+    """
+    md_map = metadata.to_map(catalog_entry.metadata)
+    column_hashes = []
+    skipped = []
+    for column in columns:
+        sql_data_type = md_map.get(("properties", column), {}).get("sql-datatype")
+        if sql_data_type in UNHASHABLE_TYPES:
+            skipped.append(column)
+            continue
+        value = common.escape(column)
+        if sql_data_type in BINARY_TYPES:
+            value = f"HEX({value})"
+        column_hashes.append(f"COALESCE(VARCHAR(HASH8(VARCHAR({value}))), 'N')")
+    if skipped:
+        LOGGER.warning(f"Changes to {skipped} are not detected by the chunk checksums")
+    return "HASH8({})".format(" || ',' || ".join(column_hashes))
+
+
+def table_sql(catalog_entry):
+    return "{}.{}{}".format(
+        common.escape(common.get_database_name(catalog_entry)),
+        common.escape(catalog_entry.table),
+        common.system_time_clause(catalog_entry),
+    )
+
+
+def chunk_checksum(open_conn, catalog_entry, key_properties, row_hash, lower, upper):
+    """Returns (rows, checksum) of the rows after lower, up to upper.
+
+    The checksum is the sum of the rows' hashes, computed by DB2 so only one
+    row is returned however large the chunk.
+    """
+    where, params = keyset_range(catalog_entry, key_properties, lower, upper)
+    sql = (
+        f"SELECT COUNT(*), SUM(DECIMAL({row_hash}, 31, 0)) "
+        f"FROM {table_sql(catalog_entry)} WHERE {where}"
+    )
+    rows, checksum = open_conn.execute(text(sql).bindparams(**params)).fetchone()
+    return rows, None if checksum is None else str(checksum)
+
+
+def nth_key(open_conn, catalog_entry, key_properties, lower, upper, n, config):
+    """Returns the n-th key after lower, up to upper, None if there are fewer."""
+    where, params = keyset_range(catalog_entry, key_properties, lower, upper)
+    keys = ", ".join(common.escape(k) for k in key_properties)
+    sql = (
+        f"SELECT {keys} FROM {table_sql(catalog_entry)} WHERE {where} "
+        f"ORDER BY {keys} OFFSET {n - 1} ROWS FETCH FIRST 1 ROWS ONLY"
+    )
+    row = open_conn.execute(text(sql).bindparams(**params)).fetchone()
+    if row is None:
+        return None
+    plan = raw_key_plan(catalog_entry, key_properties, config)
+    return plan.convert_values(row, plan.positions(key_properties))
+
+
+def sync_checksum_chunks(
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    max_pk_values,
+    message_writer,
+):
+    """Syncs only the key chunks of a table whose checksum changed.
+
+    Chunk boundaries and checksums are kept in the "chunk_checksums"
+    bookmark from one sync to the next, with the table version the rows
+    were written with, which the next sync writes with again (see
+    sync_table). Each chunk of the last sync is checksummed again and only
+    re-read if it changed; one that grew past twice full_table_chunk_size
+    is split as it is re-read. Keys after the last chunk are read in new
+    chunks. Progress is kept in "pending_chunk_checksums", so an
+    interrupted sync resumes after the last chunk it finished.
+
+    max_pk_values is None for an empty table. Deleted rows change their
+    chunk's checksum, but the rest of the chunk is written again without
+    them, so deletes reach the target only with a full sync of a new
+    version.
+    """
+    tap_stream_id = catalog_entry.tap_stream_id
+    key_properties = common.get_key_properties(catalog_entry)
+    chunk_size = chunk_size_for_stream(catalog_entry, config)
+    row_hash = row_hash_expression(catalog_entry, columns)
+    select_sql = common.generate_select_sql(catalog_entry, columns, config)
+
+    previous = singer.get_bookmark(state, tap_stream_id, "chunk_checksums") or {}
+    previous_chunks = []
+    if previous.get("version") == stream_version:
+        previous_chunks = previous.get("chunks", [])
+
+    pending = singer.get_bookmark(state, tap_stream_id, "pending_chunk_checksums")
+    if pending is None:
+        pending = []
+        singer.write_bookmark(state, tap_stream_id, "pending_chunk_checksums", pending)
+
+    counts = {"unchanged": 0, "changed": 0, "new": 0}
+
+    def position():
+        return pending[-1]["upper"] if pending else None
+
+    def finish_chunk(upper, rows, checksum):
+        pending.append({"upper": upper, "rows": rows, "checksum": checksum})
+        message_writer.write_message(
+            singer.StateMessage(value=state_snapshot(state, tap_stream_id))
+        )
+
+    def write_chunk(upper, kind, summary=None):
+        lower = position()
+        # Checksummed before it is read, so a change in between is caught
+        # by the next sync
+        rows, checksum = summary or chunk_checksum(
+            open_conn, catalog_entry, key_properties, row_hash, lower, upper
+        )
+        chunk_sql, params = keyset_chunk_query(
+            catalog_entry, select_sql, key_properties, lower, upper, None
+        )
+        common.sync_query(
+            open_conn,
+            catalog_entry,
+            state,
+            chunk_sql,
+            columns,
+            stream_version,
+            table_stream,
+            params,
+            config,
+            message_writer,
+            encoding=encoding,
+        )
+        counts[kind] += 1
+        finish_chunk(upper, rows, checksum)
+
+    def write_chunks(upper, kind):
+        # Chunks of chunk_size rows up to upper, the last one ending at upper
+        while True:
+            next_upper = nth_key(
+                open_conn,
+                catalog_entry,
+                key_properties,
+                position(),
+                upper,
+                chunk_size,
+                config,
+            )
+            if next_upper is None or next_upper == upper:
+                write_chunk(upper, kind)
+                return
+            write_chunk(next_upper, kind)
+
+    with common.StreamEncoding(
+        catalog_entry, columns, config, state, table_stream, stream_version
+    ) as encoding:
+        pending_uppers = [chunk["upper"] for chunk in pending]
+        for index, chunk in enumerate(previous_chunks):
+            if chunk["upper"] in pending_uppers:
+                continue
+            lower = previous_chunks[index - 1]["upper"] if index else None
+            if position() == lower:
+                rows, checksum = chunk_checksum(
+                    open_conn,
+                    catalog_entry,
+                    key_properties,
+                    row_hash,
+                    lower,
+                    chunk["upper"],
+                )
+                if checksum == chunk["checksum"]:
+                    counts["unchanged"] += 1
+                    finish_chunk(chunk["upper"], rows, checksum)
+                    continue
+                if rows <= 2 * chunk_size:
+                    write_chunk(chunk["upper"], "changed", (rows, checksum))
+                    continue
+            write_chunks(chunk["upper"], "changed")
+
+        # Keys after the last chunk of the last sync
+        if max_pk_values is not None and nth_key(
+            open_conn,
+            catalog_entry,
+            key_properties,
+            position(),
+            max_pk_values,
+            1,
+            config,
+        ):
+            write_chunks(max_pk_values, "new")
+
+    LOGGER.info(
+        f"Chunk checksums of {tap_stream_id}: {counts['unchanged']} unchanged, "
+        f"{counts['changed']} re-read after a change, {counts['new']} new"
+    )
+    singer.write_bookmark(
+        state,
+        tap_stream_id,
+        "chunk_checksums",
+        {"version": stream_version, "chunks": pending},
+    )
+    singer.clear_bookmark(state, tap_stream_id, "pending_chunk_checksums")
@@ -1,20 +1,29 @@
 #!/usr/bin/env python3
 # pylint: disable=too-many-arguments,duplicate-code,too-many-locals
 
-import copy
+import collections
+import contextlib
 import datetime
 import singer
 import time
-import uuid
 
 import singer.metrics as metrics
 from singer import metadata
 from singer import utils
-from tap_db2.connection import ResultIterator
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.checkpoint import checkpoint_policy, state_snapshot
+from tap_db2.sync_strategies.fetch_size import fetch_batches, fetch_size_for_stream
+from tap_db2.sync_strategies.prefetch import prefetched
+from tap_db2.sync_strategies.arrow_encoder import record_encoder_for_stream
+from tap_db2.sync_strategies.server_render import rendered_columns
+from tap_db2.sync_strategies.serialization_pool import (
+    SerializationPool,
+    serialization_mode,
+    serialization_workers,
+)
+from tap_db2.sync_strategies.stream_plan import StreamPlan
 from sqlalchemy import text
 
-ARRAYSIZE = 1
-
 LOGGER = singer.get_logger()
 
 def escape(string):
@@ -89,20 +98,166 @@ def get_key_properties(catalog_entry):
     return key_properties
 
 
-def generate_select_sql(catalog_entry, columns):
+def system_time_clause(catalog_entry):
+    """Returns the period specification reading the table as of a point in time.
+
+    The point is the stream's "system-time-as-of" metadata, set for
+    system-period temporal tables when a sync starts. It is a Db2 timestamp,
+    so it is rewritten as a literal rather than bound, and the clause is
+    part of the table reference, ahead of any WHERE.
+    """
+    md_map = metadata.to_map(catalog_entry.metadata)
+    as_of = md_map.get((), {}).get("system-time-as-of")
+    if not as_of:
+        return ""
+    as_of = datetime.datetime.fromisoformat(str(as_of))
+    return " FOR SYSTEM_TIME AS OF TIMESTAMP '{}'".format(
+        as_of.strftime("%Y-%m-%d %H:%M:%S.%f")
+    )
+
+
+def generate_select_sql(catalog_entry, columns, config=None, extra_columns=()):
+    """Returns the SELECT of columns, followed by the extra_columns expressions."""
     database_name = get_database_name(catalog_entry)
     escaped_db = escape(database_name)
     escaped_table = escape(catalog_entry.table)
-    escaped_columns = [escape(c) for c in columns]
 
-    select_sql = "SELECT {} FROM {}.{}".format(
-        ",".join(escaped_columns), escaped_db, escaped_table
+    # Rendered columns are left without an alias, so that WHERE and ORDER BY
+    # clauses naming the column still refer to the table column
+    templates = rendered_columns(catalog_entry, columns, config or {})
+    if templates:
+        LOGGER.info(f"Rendering {', '.join(templates)} as strings in the SELECT")
+    escaped_columns = [
+        templates[c].format(column=escape(c)) if c in templates else escape(c)
+        for c in columns
+    ] + list(extra_columns)
+
+    select_sql = "SELECT {} FROM {}.{}{}".format(
+        ",".join(escaped_columns),
+        escaped_db,
+        escaped_table,
+        system_time_clause(catalog_entry),
     )
 
     # escape percent signs
     select_sql = select_sql.replace("%", "%%")
     return select_sql
 
+ISOLATION_LEVELS = ("UR", "CS", "RS", "RR")
+
+
+def read_option(catalog_entry, config, metadata_key, config_key, default=None):
+    md_map = metadata.to_map(catalog_entry.metadata)
+    value = md_map.get((), {}).get(metadata_key)
+    if value is None:
+        value = config.get(config_key)
+    return default if value is None else value
+
+
+def read_clauses(catalog_entry, config):
+    """Returns the clauses ending every query that reads a stream's rows.
+
+    Each is set by the stream's metadata, or else the config:
+    "query-read-only" / query_read_only (FOR READ ONLY, on by default, so
+    the cursor is never updatable and rows are blocked into fetches),
+    "query-optimize-for-rows" / query_optimize_for_rows (OPTIMIZE FOR n
+    ROWS), "query-isolation" / query_isolation (WITH UR, CS, RS or RR,
+    otherwise the connection's isolation level), "query-currently-committed"
+    / query_currently_committed (USE CURRENTLY COMMITTED, at CS, so rows
+    being changed are read as last committed instead of waited for) and
+    "query-skip-locked-data" / query_skip_locked_data (SKIP LOCKED DATA,
+    which Db2 only honours at CS and RS).
+    """
+    clauses = []
+    if read_option(catalog_entry, config, "query-read-only", "query_read_only", True):
+        clauses.append("FOR READ ONLY")
+
+    optimize_for_rows = read_option(
+        catalog_entry, config, "query-optimize-for-rows", "query_optimize_for_rows"
+    )
+    if optimize_for_rows:
+        clauses.append(f"OPTIMIZE FOR {int(optimize_for_rows)} ROWS")
+
+    isolation = read_option(
+        catalog_entry, config, "query-isolation", "query_isolation"
+    )
+    if isolation:
+        isolation = str(isolation).upper()
+        if isolation not in ISOLATION_LEVELS:
+            raise Exception(
+                f"Unknown query isolation {isolation} for "
+                f"{catalog_entry.tap_stream_id}, expected one of "
+                f"{', '.join(ISOLATION_LEVELS)}"
+            )
+        clauses.append(f"WITH {isolation}")
+
+    currently_committed = read_option(
+        catalog_entry,
+        config,
+        "query-currently-committed",
+        "query_currently_committed",
+    )
+    if currently_committed:
+        if isolation is None:
+            isolation = "CS"
+            clauses.append("WITH CS")
+        if isolation == "CS":
+            clauses.append("USE CURRENTLY COMMITTED")
+        else:
+            LOGGER.warning(
+                f"Currently committed reads need isolation CS, not {isolation}, "
+                f"leaving them out for {catalog_entry.tap_stream_id}"
+            )
+            currently_committed = False
+
+    if read_option(
+        catalog_entry, config, "query-skip-locked-data", "query_skip_locked_data"
+    ):
+        if currently_committed:
+            LOGGER.warning(
+                "SKIP LOCKED DATA can't be combined with currently committed "
+                f"reads, leaving it out for {catalog_entry.tap_stream_id}"
+            )
+        elif isolation in ("UR", "RR"):
+            LOGGER.warning(
+                f"SKIP LOCKED DATA has no effect at isolation {isolation}, "
+                f"leaving it out for {catalog_entry.tap_stream_id}"
+            )
+        else:
+            LOGGER.warning(
+                f"{catalog_entry.tap_stream_id} is read with SKIP LOCKED DATA: "
+                "rows other transactions hold locks on are skipped without an "
+                "error and never emitted by this sync, and an INCREMENTAL sync "
+                "only reads them later if their replication key moves past its "
+                "bookmark"
+            )
+            clauses.append("SKIP LOCKED DATA")
+
+    return " ".join(clauses)
+
+
+def pin_read_clauses(catalog_entry, config):
+    """Sets the stream's "query-read-clauses" metadata, returning the clauses.
+
+    The clauses are worked out, and their warnings logged, once per stream;
+    every query reading the stream then takes them from the metadata.
+    """
+    clauses = read_clauses(catalog_entry, config)
+    md_map = metadata.to_map(catalog_entry.metadata)
+    md_map = metadata.write(md_map, (), "query-read-clauses", clauses)
+    catalog_entry.metadata = metadata.to_list(md_map)
+    return clauses
+
+
+def with_read_clauses(sql, catalog_entry, config):
+    """Appends the stream's read clauses to a complete SELECT statement."""
+    md_map = metadata.to_map(catalog_entry.metadata)
+    clauses = md_map.get((), {}).get("query-read-clauses")
+    if clauses is None:
+        clauses = read_clauses(catalog_entry, config or {})
+    return f"{sql} {clauses}" if clauses else sql
+
+
 def default_date_format():
     return False
 
@@ -113,67 +268,40 @@ def default_offset_value():
     """
     return False
 
+def default_fast_record_encoder():
+    return True
+
+def use_fast_record_encoder(config):
+    """
+    Records are encoded straight to bytes unless fast_record_encoder is set to
+    false in the config, which falls back to a singer.RecordMessage per record
+    """
+    fast_record_encoder = config.get("fast_record_encoder")
+    if fast_record_encoder is None:
+        return default_fast_record_encoder()
+    return fast_record_encoder
+
 def row_to_singer_record(
     catalog_entry, version, table_stream, row, columns, time_extracted, config
 ):
-    row_to_persist = ()
-    use_date_data_type_format = config.get("use_date_datatype") or default_date_format()
-    md_map = metadata.to_map(catalog_entry.metadata)
-    md_map[("properties", "_sdc_deleted_at")] = {
-        "sql-datatype": "datetime"  # maybe datetimeoffset??
-    }
-    for idx, elem in enumerate(row):
-        property_type = catalog_entry.schema.properties[columns[idx]].type
-        sql_data_type = md_map.get(("properties", columns[idx])).get("sql-datatype")
-        property_format = catalog_entry.schema.properties[columns[idx]].format
-        if isinstance(elem, datetime.datetime):
-            row_to_persist += (elem.isoformat() + "+00:00",)
-
-        elif isinstance(elem, datetime.date):
-            if use_date_data_type_format:
-                row_to_persist += (elem.isoformat(),)
-            else:
-                row_to_persist += (elem.isoformat() + "T00:00:00+00:00",)
-
-        elif isinstance(elem, datetime.timedelta):
-            epoch = datetime.datetime.utcfromtimestamp(0)
-            timedelta_from_epoch = epoch + elem
-            row_to_persist += (timedelta_from_epoch.isoformat() + "+00:00",)
-
-        elif isinstance(elem, bytes):
-            if sql_data_type in ["binary", "varbinary"]:
-                # Convert binary byte array to hex string‘
-                hex_representation = f"0x{elem.hex().upper()}"
-                row_to_persist += (hex_representation,)
-            else:
-                # for BIT value, treat 0 as False and anything else as True
-                boolean_representation = elem != b"\x00"
-                row_to_persist += (boolean_representation,)
-
-        elif "boolean" in sql_data_type or sql_data_type == "boolean":
-            if elem is None:
-                boolean_representation = None
-            elif elem == 0:
-                boolean_representation = False
-            else:
-                boolean_representation = True
-            row_to_persist += (boolean_representation,)
-        elif isinstance(elem, uuid.UUID):
-            row_to_persist += (str(elem),)
-        
-        elif property_format == 'singer.decimal':
-            if elem is None:
-                row_to_persist += (elem,)
-            else:
-                row_to_persist += (str(elem),)
-            
-        else:
-            row_to_persist += (elem,)
-    rec = dict(zip(columns, row_to_persist))
+    """Converts a single row to a RecordMessage.
+
+    Builds a StreamPlan for every call; the sync loops build the plan once per
+    stream and use record_message_for_row instead.
+    """
+    plan = StreamPlan(
+        catalog_entry,
+        columns,
+        config,
+        sql_data_types={"_sdc_deleted_at": "datetime"},  # maybe datetimeoffset??
+    )
+    return record_message_for_row(plan, version, table_stream, row, time_extracted)
+
 
+def record_message_for_row(plan, version, table_stream, row, time_extracted):
     return singer.RecordMessage(
         stream=table_stream,
-        record=rec,
+        record=plan.to_record(row),
         version=version,
         time_extracted=time_extracted,
     )
@@ -190,6 +318,172 @@ def whitelist_bookmark_keys(bookmark_key_set, tap_stream_id, state):
         singer.clear_bookmark(state, tap_stream_id, bk)
 
 
+def write_row_bookmarks(
+    state,
+    catalog_entry,
+    replication_method,
+    replication_key,
+    key_properties,
+    values,
+):
+    """Bookmarks a synced row, given its converted key and replication key values."""
+    if replication_method in {"FULL_TABLE", "LOG_BASED"}:
+        max_pk_values = singer.get_bookmark(
+            state, catalog_entry.tap_stream_id, "max_pk_values"
+        )
+
+        if max_pk_values:
+            last_pk_fetched = {
+                k: v for k, v in values.items() if k in key_properties
+            }
+
+            state = singer.write_bookmark(
+                state,
+                catalog_entry.tap_stream_id,
+                "last_pk_fetched",
+                last_pk_fetched,
+            )
+
+    elif replication_method == "INCREMENTAL":
+        if replication_key is not None:
+            state = singer.write_bookmark(
+                state,
+                catalog_entry.tap_stream_id,
+                "replication_key",
+                replication_key,
+            )
+
+            state = singer.write_bookmark(
+                state,
+                catalog_entry.tap_stream_id,
+                "replication_key_value",
+                values[replication_key],
+            )
+
+    return state
+
+
+def encode_batches(
+    batches,
+    plan,
+    encoder,
+    stream_version,
+    table_stream,
+    time_extracted,
+    bookmark_positions,
+):
+    """Yields (row count, RECORD message bytes, bookmark values) per batch.
+
+    The in-process counterpart of SerializationPool.encode; encoder is None
+    when fast_record_encoder is off.
+    """
+    for rows in batches:
+        if encoder is not None:
+            payload = encoder.encode_batch(rows)
+        else:
+            payload = b"".join(
+                [
+                    writer.encode_message(
+                        record_message_for_row(
+                            plan, stream_version, table_stream, row, time_extracted
+                        )
+                    )
+                    for row in rows
+                ]
+            )
+        yield len(rows), payload, plan.convert_values(rows[-1], bookmark_positions)
+
+
+def split_last_column(batches, last_values):
+    """Yields the batches without their last column.
+
+    The last column's value in each batch's last row is appended to
+    last_values as the batch is taken, for the caller to pop once the batch
+    is written.
+    """
+    for rows in batches:
+        last_values.append(rows[-1][-1])
+        yield [row[:-1] for row in rows]
+
+
+class StreamEncoding:
+    """What sync_query sets up to encode and bookmark the rows of a stream.
+
+    Chunked syncs run a query per chunk; creating one of these per stream
+    and passing it to each sync_query builds the StreamPlan, the record
+    encoder, the checkpoint policy, the fetch size and, with
+    serialization_workers, the worker pool once for all the chunks.
+    Records are stamped with the time it was created.
+    """
+
+    def __init__(
+        self, catalog_entry, columns, config, state, table_stream, stream_version
+    ):
+        self.table_stream = table_stream
+        self.stream_version = stream_version
+        self.time_extracted = utils.now()
+        self.replication_key = singer.get_bookmark(
+            state, catalog_entry.tap_stream_id, "replication_key"
+        )
+
+        self.plan = StreamPlan(catalog_entry, columns, config)
+        md_map = metadata.to_map(catalog_entry.metadata)
+        self.replication_method = md_map.get((), {}).get("replication-method")
+        self.key_properties = get_key_properties(catalog_entry)
+        bookmark_columns = set(self.key_properties)
+        if self.replication_key is not None:
+            bookmark_columns.add(self.replication_key)
+        self.bookmark_positions = self.plan.positions(bookmark_columns)
+
+        self.fetch_size = fetch_size_for_stream(catalog_entry, columns, config)
+        self.encoder = None
+        if use_fast_record_encoder(config):
+            self.encoder = record_encoder_for_stream(
+                self.plan, table_stream, stream_version, self.time_extracted, config
+            )
+        self.policy = checkpoint_policy(config)
+
+        self._stack = contextlib.ExitStack()
+        self.pool = None
+        workers = serialization_workers(config)
+        if workers:
+            mode = serialization_mode(config)
+            LOGGER.info(f"Encoding records on {workers} worker {mode}s")
+            self.pool = self._stack.enter_context(
+                SerializationPool(
+                    workers,
+                    catalog_entry,
+                    columns,
+                    config,
+                    table_stream,
+                    stream_version,
+                    self.time_extracted,
+                    bookmark_columns,
+                    mode,
+                )
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._stack.__exit__(exc_type, exc_value, traceback)
+
+    def encode(self, batches):
+        """Yields (row count, RECORD message bytes, bookmark values) per batch."""
+        if self.pool is not None:
+            return self.pool.encode(batches)
+        return encode_batches(
+            batches,
+            self.plan,
+            self.encoder,
+            self.stream_version,
+            self.table_stream,
+            self.time_extracted,
+            self.bookmark_positions,
+        )
+
+
 def sync_query(
     cursor,
     catalog_entry,
@@ -200,85 +494,87 @@ def sync_query(
     table_stream,
     params,
     config,
+    message_writer,
+    encoding=None,
+    trailing_bookmark=None,
 ):
-    replication_key = singer.get_bookmark(
-        state, catalog_entry.tap_stream_id, "replication_key"
-    )
+    """Runs select_sql with params and writes its rows, returning the row count.
 
+    encoding is the stream's StreamEncoding; one is created for this query
+    alone if it is not given. trailing_bookmark is a (bookmark key, convert)
+    pair for a query selecting one more column after columns: that column
+    is not written, and its converted value in each batch's last row is
+    bookmarked once the batch is written.
+    """
     # query_string = cursor.mogrify(select_sql, params)
 
-    time_extracted = utils.now()
-    if len(params) == 0:
-        results = cursor.execute(text(select_sql))
-    else:
-        LOGGER.info(params["replication_key_value"])
-        stmt = text(select_sql).bindparams(replication_key_value=params["replication_key_value"])
-        results = cursor.execute(stmt)
-    
-    LOGGER.info(f"{ARRAYSIZE=}")
-    rows_saved = 0
+    select_sql = with_read_clauses(select_sql, catalog_entry, config)
+
     database_name = get_database_name(catalog_entry)
+    rows_synced = 0
 
     with metrics.record_counter(None) as counter:
         counter.tags["database"] = database_name
         counter.tags["table"] = catalog_entry.table
-        
-        for row in ResultIterator(results, ARRAYSIZE):
-            
-            counter.increment()
-            rows_saved += 1
-            record_message = row_to_singer_record(
-                catalog_entry,
-                stream_version,
-                table_stream,
-                row,
-                columns,
-                time_extracted,
-                config,
-            )
-            singer.write_message(record_message)
-            md_map = metadata.to_map(catalog_entry.metadata)
-            stream_metadata = md_map.get((), {})
-            replication_method = stream_metadata.get("replication-method")
-
-            if replication_method in {"FULL_TABLE", "LOG_BASED"}:
-                key_properties = get_key_properties(catalog_entry)
 
-                max_pk_values = singer.get_bookmark(
-                    state, catalog_entry.tap_stream_id, "max_pk_values"
-                )
-
-                if max_pk_values:
-                    last_pk_fetched = {
-                        k: v
-                        for k, v in record_message.record.items()
-                        if k in key_properties
-                    }
-
-                    state = singer.write_bookmark(
+        with contextlib.ExitStack() as stack:
+            if encoding is None:
+                encoding = stack.enter_context(
+                    StreamEncoding(
+                        catalog_entry,
+                        columns,
+                        config,
                         state,
-                        catalog_entry.tap_stream_id,
-                        "last_pk_fetched",
-                        last_pk_fetched,
+                        table_stream,
+                        stream_version,
                     )
+                )
+
+            if len(params) == 0:
+                results = cursor.execute(text(select_sql))
+            else:
+                stmt = text(select_sql).bindparams(**params)
+                results = cursor.execute(stmt)
 
-            elif replication_method == "INCREMENTAL":
-                if replication_key is not None:
+            batches = stack.enter_context(
+                prefetched(fetch_batches(results, encoding.fetch_size), config)
+            )
+            last_values = collections.deque()
+            if trailing_bookmark is not None:
+                batches = split_last_column(batches, last_values)
+
+            for row_count, payload, bookmark_values in encoding.encode(batches):
+                message_writer.write_bytes(payload)
+                counter.increment(row_count)
+                rows_synced += row_count
+
+                # Bookmarks come from the last row of each batch
+                state = write_row_bookmarks(
+                    state,
+                    catalog_entry,
+                    encoding.replication_method,
+                    encoding.replication_key,
+                    encoding.key_properties,
+                    bookmark_values,
+                )
+                if trailing_bookmark is not None:
+                    key, convert = trailing_bookmark
                     state = singer.write_bookmark(
                         state,
                         catalog_entry.tap_stream_id,
-                        "replication_key",
-                        replication_key,
+                        key,
+                        convert(last_values.popleft()),
                     )
 
-                    state = singer.write_bookmark(
-                        state,
-                        catalog_entry.tap_stream_id,
-                        "replication_key_value",
-                        record_message.record[replication_key],
+                if encoding.policy.due(row_count, len(payload)):
+                    message_writer.write_message(
+                        singer.StateMessage(
+                            value=state_snapshot(state, catalog_entry.tap_stream_id)
+                        )
                     )
 
-            if rows_saved % 1000 == 0:
-                singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    message_writer.write_message(
+        singer.StateMessage(value=state_snapshot(state, catalog_entry.tap_stream_id))
+    )
 
-    singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+    return rows_synced
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code,too-many-arguments
+
+import singer
+from singer import metadata
+from sqlalchemy import text
+
+from tap_db2.sync_strategies.keyset import tuple_predicate
+from tap_db2.sync_strategies.parallel_reader import sync_parts_by_predicate
+
+LOGGER = singer.get_logger()
+
+# Bounds of the first and last range of a partitioned table
+UNBOUNDED_VALUES = {"MINVALUE", "MAXVALUE"}
+
+
+def split_partition_values(values):
+    """Splits a LOWVALUE/HIGHVALUE of SYSCAT.DATAPARTITIONS into its literals.
+
+    The catalog keeps one SQL literal per partitioning column, separated by
+    commas, e.g. "'2023-01-01',5" or "MAXVALUE".
+    """
+    literals = []
+    current = ""
+    quoted = False
+    for char in values or "":
+        if char == "'":
+            quoted = not quoted
+        if char == "," and not quoted:
+            literals.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        literals.append(current.strip())
+    return literals
+
+
+def discover_data_partitions(open_conn):
+    """Returns the data partitions of range-partitioned tables by (schema, table).
+
+    Each entry has the partitioning "expressions" in key order, whether
+    each sorts its NULLs first ("nulls-first") and the "partitions" in
+    SYSCAT.DATAPARTITIONS order, with their name and low and high bounds as
+    SQL literals. Partitions being attached or detached are left out.
+    """
+    expression_results = open_conn.execute(text(
+        """
+        SELECT
+            RTRIM(TABSCHEMA) AS TABLE_SCHEMA,
+            TABNAME AS TABLE_NAME,
+            DATAPARTITIONEXPRESSION AS EXPRESSION,
+            NULLSFIRST
+        FROM SYSCAT.DATAPARTITIONEXPRESSION
+        WHERE TABSCHEMA NOT LIKE 'SYS%'
+        ORDER BY TABSCHEMA, TABNAME, DATAPARTITIONKEYSEQ
+        """)
+    )
+    partitioned = {}
+    for (db, table, expression, nulls_first) in expression_results.fetchall():
+        partitioned.setdefault(
+            (db, table), {"expressions": [], "nulls-first": [], "partitions": []}
+        )
+        partitioned[(db, table)]["expressions"].append(str(expression).strip())
+        partitioned[(db, table)]["nulls-first"].append(nulls_first == "Y")
+
+    partition_results = open_conn.execute(text(
+        """
+        SELECT
+            RTRIM(TABSCHEMA) AS TABLE_SCHEMA,
+            TABNAME AS TABLE_NAME,
+            DATAPARTITIONNAME AS PARTITION_NAME,
+            LOWINCLUSIVE,
+            LOWVALUE,
+            HIGHINCLUSIVE,
+            HIGHVALUE
+        FROM SYSCAT.DATAPARTITIONS
+        WHERE TABSCHEMA NOT LIKE 'SYS%'
+        AND STATUS = ''
+        ORDER BY TABSCHEMA, TABNAME, SEQNO
+        """)
+    )
+    for (db, table, name, low_inclusive, low, high_inclusive, high) in (
+        partition_results.fetchall()
+    ):
+        if (db, table) not in partitioned:
+            continue
+        partitioned[(db, table)]["partitions"].append(
+            {
+                "name": name,
+                "low": split_partition_values(low),
+                "low-inclusive": low_inclusive == "Y",
+                "high": split_partition_values(high),
+                "high-inclusive": high_inclusive == "Y",
+            }
+        )
+
+    return partitioned
+
+
+def bound_predicate(
+    expressions, literals, operator, inclusive, unbounded, nulls_first=None
+):
+    """Compares the partitioning expressions with one bound of a partition.
+
+    The columns after a MINVALUE or MAXVALUE are unconstrained, so the bound
+    is cut there; unbounded is the value that makes the cut bound inclusive
+    (MINVALUE for a low bound, MAXVALUE for a high one). NULLs compare as
+    DB2 places them, below every value of a NULLS FIRST expression and above
+    every value otherwise.
+    """
+    if nulls_first is None:
+        nulls_first = [False] * len(expressions)
+    for idx, literal in enumerate(literals):
+        if literal.upper() in UNBOUNDED_VALUES:
+            if idx == 0:
+                return None
+            inclusive = literal.upper() == unbounded
+            literals = literals[:idx]
+            break
+    return tuple_predicate(
+        expressions[:len(literals)],
+        literals,
+        operator,
+        inclusive=inclusive,
+        nulls_first=nulls_first[:len(literals)],
+    )
+
+
+def partition_predicate(expressions, partition, nulls_first=None):
+    """Returns the WHERE condition selecting the rows of one data partition.
+
+    DB2 uses it to eliminate every other partition from the scan. Rows with
+    a NULL key are matched by the partition DB2 stores them in, the first
+    (NULLS FIRST) or the last (NULLS LAST, the default) for a NULL in the
+    first expression.
+    """
+    predicates = [
+        bound_predicate(
+            expressions,
+            partition["low"],
+            ">",
+            partition["low-inclusive"],
+            "MINVALUE",
+            nulls_first,
+        ),
+        bound_predicate(
+            expressions,
+            partition["high"],
+            "<",
+            partition["high-inclusive"],
+            "MAXVALUE",
+            nulls_first,
+        ),
+    ]
+    predicates = [p for p in predicates if p is not None]
+    return " AND ".join(f"({p})" for p in predicates) or "1 = 1"
+
+
+def data_partitions_for_stream(catalog_entry):
+    md_map = metadata.to_map(catalog_entry.metadata)
+    stream_metadata = md_map.get((), {})
+    return (
+        stream_metadata.get("data-partition-expressions"),
+        stream_metadata.get("data-partitions"),
+    )
+
+
+def data_partition_nulls_first(catalog_entry):
+    """Whether each partitioning expression sorts NULLs first; None if unknown.
+
+    Catalogs discovered before this was recorded fall back to DB2's default
+    of NULLS LAST.
+    """
+    md_map = metadata.to_map(catalog_entry.metadata)
+    return md_map.get((), {}).get("data-partition-nulls-first")
+
+
+def uses_data_partitions(catalog_entry, config):
+    """Whether a FULL_TABLE sync reads the stream partition by partition.
+
+    Set full_table_by_partition in the config, or the stream's
+    "full-table-by-partition" metadata, for a range-partitioned table.
+    """
+    expressions, partitions = data_partitions_for_stream(catalog_entry)
+    if not expressions or not partitions:
+        return False
+    md_map = metadata.to_map(catalog_entry.metadata)
+    by_partition = md_map.get((), {}).get("full-table-by-partition")
+    if by_partition is None:
+        by_partition = config.get("full_table_by_partition")
+    return bool(by_partition)
+
+
+def sync_data_partitions(
+    engine,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    parallelism,
+    message_writer,
+):
+    """Syncs a range-partitioned table one data partition at a time.
+
+    Finished partitions are kept in the "completed_partitions" bookmark (see
+    sync_parts_by_predicate).
+    """
+    expressions, partitions = data_partitions_for_stream(catalog_entry)
+    nulls_first = data_partition_nulls_first(catalog_entry)
+    parts = [
+        (p["name"], partition_predicate(expressions, p, nulls_first))
+        for p in partitions
+    ]
+    sync_parts_by_predicate(
+        engine,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        stream_version,
+        table_stream,
+        parts,
+        "completed_partitions",
+        parallelism,
+        message_writer,
+    )
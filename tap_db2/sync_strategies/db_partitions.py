@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code,too-many-arguments
+
+import singer
+from singer import metadata
+from sqlalchemy import text
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.sync_strategies.parallel_reader import sync_parts_by_predicate
+
+LOGGER = singer.get_logger()
+
+
+def uses_db_partitions(catalog_entry, config):
+    """Whether a FULL_TABLE sync is split by database partition (DPF).
+
+    Set full_table_by_dbpartition in the config, or the stream's
+    "full-table-by-dbpartition" metadata. The table is only split when it
+    turns out to be spread over more than one database partition.
+    """
+    if common.get_is_view(catalog_entry):
+        return False
+    md_map = metadata.to_map(catalog_entry.metadata)
+    by_dbpartition = md_map.get((), {}).get("full-table-by-dbpartition")
+    if by_dbpartition is None:
+        by_dbpartition = config.get("full_table_by_dbpartition")
+    return bool(by_dbpartition)
+
+
+def db_partitions_for_table(open_conn, catalog_entry):
+    """Returns the numbers of the database partitions holding the table.
+
+    These are the partitions of the database partition group of the table's
+    table space; a database that is not partitioned has just one.
+    """
+    results = open_conn.execute(
+        text(
+            """
+            SELECT d.DBPARTITIONNUM
+            FROM SYSCAT.TABLES t
+            JOIN SYSCAT.TABLESPACES s ON s.TBSPACE = t.TBSPACE
+            JOIN SYSCAT.DBPARTITIONGROUPDEF d ON d.DBPGNAME = s.DBPGNAME
+            WHERE t.TABSCHEMA = :table_schema
+            AND t.TABNAME = :table_name
+            AND d.IN_USE = 'Y'
+            ORDER BY d.DBPARTITIONNUM
+            """
+        ).bindparams(
+            table_schema=common.get_database_name(catalog_entry),
+            table_name=catalog_entry.table,
+        )
+    )
+    return [row[0] for row in results.fetchall()]
+
+
+def db_partition_predicate(column, partition_number):
+    """Selects the rows stored on one database partition.
+
+    DBPARTITIONNUM of any column of a row is the partition the row is
+    stored on, and DB2 runs the scan only on that partition.
+    """
+    return f"DBPARTITIONNUM({common.escape(column)}) = {int(partition_number)}"
+
+
+def sync_db_partitions(
+    engine,
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    parallelism,
+    message_writer,
+):
+    """Syncs a table one database partition per query, if it has several.
+
+    Returns False, without syncing, when the table is on a single database
+    partition. Every partition is read at once unless parallelism limits
+    it, so the scan runs on all data nodes instead of a single scan
+    through the coordinator. Finished partitions are kept in the
+    "completed_dbpartitions" bookmark (see sync_parts_by_predicate).
+    """
+    partition_numbers = db_partitions_for_table(open_conn, catalog_entry)
+    if len(partition_numbers) < 2:
+        LOGGER.info(
+            f"{catalog_entry.tap_stream_id} is on {len(partition_numbers)} "
+            "database partition, reading it in one query"
+        )
+        return False
+
+    parts = [
+        (n, db_partition_predicate(columns[0], n)) for n in partition_numbers
+    ]
+    sync_parts_by_predicate(
+        engine,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        stream_version,
+        table_stream,
+        parts,
+        "completed_dbpartitions",
+        parallelism or len(parts),
+        message_writer,
+    )
+    return True
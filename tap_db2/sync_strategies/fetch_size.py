@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import sys
+import time
+
+import singer
+from singer import metadata
+
+LOGGER = singer.get_logger()
+
+# Memory allowed for one fetched batch of rows when sizing automatically
+DEFAULT_FETCH_MEMORY_BUDGET_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_FETCH_SIZE = 50000
+# A fetch quicker than this is dominated by the round trip, so the batch grows;
+# a fetch slower than the maximum holds up conversion, so the batch shrinks
+MIN_FETCH_SECONDS = 0.05
+MAX_FETCH_SECONDS = 1.0
+
+# Approximate size in memory of the Python object the driver returns per value
+TUPLE_OVERHEAD_BYTES = 56
+POINTER_BYTES = 8
+STRING_OVERHEAD_BYTES = 49
+DEFAULT_VALUE_BYTES = 64
+VALUE_BYTES_FOR_TYPE = {
+    "smallint": 28,
+    "integer": 28,
+    "int": 28,
+    "bigint": 32,
+    "real": 24,
+    "double": 24,
+    "decimal": 104,
+    "numeric": 104,
+    "decfloat": 104,
+    "date": 32,
+    "time": 40,
+    "timestamp": 48,
+    "boolean": 28,
+}
+STRING_TYPES = {"char", "character", "varchar", "xml", "binary", "varbinary"}
+
+
+def estimate_row_bytes(catalog_entry, columns):
+    """Estimates the memory used by one fetched row from the catalog.
+
+    Strings count at their declared maximum length (sql-datatype-length), so
+    the estimate is an upper bound; FetchSizeTuner corrects it from the rows
+    actually fetched.
+    """
+    md_map = metadata.to_map(catalog_entry.metadata)
+    row_bytes = TUPLE_OVERHEAD_BYTES
+    for column in columns:
+        column_md = md_map.get(("properties", column), {})
+        sql_data_type = column_md.get("sql-datatype")
+        length = column_md.get("sql-datatype-length")
+
+        if sql_data_type in STRING_TYPES and length:
+            value_bytes = STRING_OVERHEAD_BYTES + length
+        else:
+            value_bytes = VALUE_BYTES_FOR_TYPE.get(sql_data_type, DEFAULT_VALUE_BYTES)
+        row_bytes += POINTER_BYTES + value_bytes
+
+    return row_bytes
+
+
+def measure_row_bytes(row):
+    return TUPLE_OVERHEAD_BYTES + sum(
+        POINTER_BYTES + sys.getsizeof(value) for value in row
+    )
+
+
+class FixedFetchSize:
+    """Fetches a constant number of rows, as set by cursor_array_size."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def observe(self, rows, elapsed):
+        pass
+
+
+class FetchSizeTuner:
+    """Picks the fetchmany size for one stream and adjusts it while fetching.
+
+    The starting size fits memory_budget bytes of rows at the estimated row
+    width. After each fetch the width is re-measured from a sample row, and
+    the size doubles while full fetches return in under MIN_FETCH_SECONDS and
+    halves when a fetch takes longer than MAX_FETCH_SECONDS, always within
+    the memory budget.
+    """
+
+    def __init__(
+        self,
+        estimated_row_bytes,
+        memory_budget=DEFAULT_FETCH_MEMORY_BUDGET_BYTES,
+        max_size=DEFAULT_MAX_FETCH_SIZE,
+    ):
+        self.row_bytes = estimated_row_bytes
+        self.memory_budget = memory_budget
+        self.max_size = max_size
+        self.size = self.limit()
+
+    def limit(self):
+        return max(1, min(self.max_size, self.memory_budget // self.row_bytes))
+
+    def observe(self, rows, elapsed):
+        if not rows:
+            return
+
+        # Weighted towards the rows seen so far, one sample per batch
+        self.row_bytes = max(
+            1, (3 * self.row_bytes + measure_row_bytes(rows[-1])) // 4
+        )
+
+        if len(rows) >= self.size and elapsed < MIN_FETCH_SECONDS:
+            size = self.size * 2
+        elif elapsed > MAX_FETCH_SECONDS:
+            size = self.size // 2
+        else:
+            size = self.size
+
+        self.size = max(1, min(size, self.limit()))
+
+
+def fetch_size_for_stream(catalog_entry, columns, config):
+    """Returns the fetch size policy for a stream.
+
+    A cursor_array_size in the config fixes the size for every stream;
+    otherwise it is tuned per stream from fetch_memory_budget_bytes.
+    """
+    cursor_array_size = config.get("cursor_array_size")
+    if cursor_array_size:
+        LOGGER.info(f"Fetching {cursor_array_size} rows at a time (cursor_array_size)")
+        return FixedFetchSize(cursor_array_size)
+
+    estimated_row_bytes = estimate_row_bytes(catalog_entry, columns)
+    tuner = FetchSizeTuner(
+        estimated_row_bytes,
+        memory_budget=(
+            config.get("fetch_memory_budget_bytes")
+            or DEFAULT_FETCH_MEMORY_BUDGET_BYTES
+        ),
+        max_size=config.get("max_cursor_array_size") or DEFAULT_MAX_FETCH_SIZE,
+    )
+    LOGGER.info(
+        f"Estimated row size for {catalog_entry.tap_stream_id} is "
+        f"{estimated_row_bytes} bytes, starting with {tuner.size} rows per fetch"
+    )
+    return tuner
+
+
+def fetch_batches(results, fetch_size):
+    """Yields lists of rows from fetchmany, sized by the fetch size policy."""
+    while True:
+        start = time.monotonic()
+        rows = results.fetchmany(fetch_size.size)
+        fetch_size.observe(rows, time.monotonic() - start)
+        if not rows:
+            break
+        yield rows
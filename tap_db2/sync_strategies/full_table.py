@@ -6,13 +6,39 @@ import singer
 from singer import metadata
 
 import tap_db2.sync_strategies.common as common
+from sqlalchemy import text
 
 from tap_db2.connection import (
     connect_with_backoff,
-    get_db2_sql_engine,
     modify_ouput_converter,
     revert_ouput_converter,
+    with_reconnect,
 )
+from tap_db2.sync_strategies.checksum_chunks import (
+    checksum_version,
+    sync_checksum_chunks,
+    uses_checksum_chunks,
+)
+from tap_db2.sync_strategies.data_partitions import (
+    sync_data_partitions,
+    uses_data_partitions,
+)
+from tap_db2.sync_strategies.db_partitions import (
+    sync_db_partitions,
+    uses_db_partitions,
+)
+from tap_db2.sync_strategies.keyset import (
+    DEFAULT_FULL_TABLE_CHUNK_SIZE,
+    chunk_size_for_stream,
+    keyset_chunk_query,
+)
+from tap_db2.sync_strategies.pk_ranges import parallelism_for_stream, sync_pk_ranges
+from tap_db2.sync_strategies.rid_order import (
+    sync_rid_ordered,
+    sync_rid_ranges,
+    uses_rid_order,
+)
+from tap_db2.sync_strategies.stream_plan import StreamPlan
 
 LOGGER = singer.get_logger()
 
@@ -25,6 +51,17 @@ def generate_bookmark_keys(catalog_entry):
     base_bookmark_keys = {
         "last_pk_fetched",
         "max_pk_values",
+        "pk_ranges",
+        "completed_partitions",
+        "completed_dbpartitions",
+        "max_rid",
+        "last_rid_fetched",
+        "rid_ranges",
+        "partial_parts",
+        "chunk_checksums",
+        "pending_chunk_checksums",
+        "change_probe",
+        "snapshot_time",
         "version",
         "initial_full_table_complete",
     }
@@ -34,8 +71,366 @@ def generate_bookmark_keys(catalog_entry):
     return bookmark_keys
 
 
-def sync_table(mssql_conn, config, catalog_entry, state, columns, stream_version):
-    mssql_conn = get_db2_sql_engine(config)
+# Where an interrupted sync has got to, cleared once the table is read
+PROGRESS_BOOKMARK_KEYS = (
+    "max_pk_values",
+    "last_pk_fetched",
+    "pk_ranges",
+    "completed_partitions",
+    "completed_dbpartitions",
+    "partial_parts",
+    "max_rid",
+    "last_rid_fetched",
+    "rid_ranges",
+)
+
+
+def resumes_in_place(catalog_entry, config, state):
+    """Whether an interrupted sync can carry on in the version it started.
+
+    Rows read again replace the ones already written when the stream has a
+    key. Without one they would be written twice, so only reads in row id
+    order, which resume after the last row written, and parts of which none
+    was left half read ("partial_parts") carry on. A table read in a single
+    query has to be read again in a new version.
+    """
+    if common.get_key_properties(catalog_entry):
+        return True
+    if uses_rid_order(catalog_entry, config):
+        return True
+    bookmark = state.get("bookmarks", {}).get(catalog_entry.tap_stream_id, {})
+    if bookmark.get("partial_parts"):
+        return False
+    return "completed_partitions" in bookmark or "completed_dbpartitions" in bookmark
+
+
+def restart_in_new_version(catalog_entry, state, stream_version):
+    """Drops the stream's progress bookmarks, returning the version to read it in."""
+    tap_stream_id = catalog_entry.tap_stream_id
+    LOGGER.warning(
+        f"{tap_stream_id} has no key to tell the rows already written from the "
+        "ones read again, reading it from the start in a new table version"
+    )
+    for key in PROGRESS_BOOKMARK_KEYS:
+        singer.clear_bookmark(state, tap_stream_id, key)
+    singer.clear_bookmark(state, tap_stream_id, "version")
+    return max(common.get_stream_version(tap_stream_id, state), stream_version + 1)
+
+
+def uses_keyset_chunks(catalog_entry, config):
+    # Keys of views are only declared in the catalog and may not be unique
+    return bool(
+        common.get_key_properties(catalog_entry)
+        and not common.get_is_view(catalog_entry)
+        and chunk_size_for_stream(catalog_entry, config) > 0
+    )
+
+
+def get_max_pk_values(open_conn, catalog_entry, key_properties, config):
+    """Returns the converted key values of the table's last row, None if empty.
+
+    They are selected exactly as the sync selects them, so they compare with
+    the last_pk_fetched bookmarks written from synced rows.
+    """
+    select_sql = common.generate_select_sql(catalog_entry, key_properties, config)
+    order_by = ", ".join(common.escape(k) + " DESC" for k in key_properties)
+    sql = f"{select_sql} ORDER BY {order_by} FETCH FIRST 1 ROWS ONLY"
+    row = open_conn.execute(text(sql)).fetchone()
+    if row is None:
+        return None
+
+    plan = StreamPlan(catalog_entry, key_properties, config)
+    return plan.convert_values(row, plan.positions(key_properties))
+
+
+def bookmark_max_pk_values(open_conn, catalog_entry, state, key_properties, config):
+    """Returns the max_pk_values bookmark, taking it from the table if unset.
+
+    None means the table is empty and there is nothing to sync.
+    """
+    max_pk_values = singer.get_bookmark(
+        state, catalog_entry.tap_stream_id, "max_pk_values"
+    )
+    if max_pk_values is None:
+        max_pk_values = get_max_pk_values(
+            open_conn, catalog_entry, key_properties, config
+        )
+        if max_pk_values is None:
+            LOGGER.info("Table is empty, nothing to sync")
+            return None
+        singer.write_bookmark(
+            state, catalog_entry.tap_stream_id, "max_pk_values", max_pk_values
+        )
+    return max_pk_values
+
+
+def sync_keyset_chunks(
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    message_writer,
+):
+    """Syncs the table in key order, a chunk of rows per query.
+
+    The table's last key is bookmarked as max_pk_values before the first
+    chunk, so rows inserted during the sync are left for the next one. Each
+    chunk starts after the last_pk_fetched bookmark, which sync_query moves
+    forward with the rows it writes, so an interrupted sync resumes after
+    the last row in its last STATE message.
+    """
+    key_properties = common.get_key_properties(catalog_entry)
+    chunk_size = chunk_size_for_stream(catalog_entry, config)
+
+    max_pk_values = bookmark_max_pk_values(
+        open_conn, catalog_entry, state, key_properties, config
+    )
+    if max_pk_values is None:
+        return
+    LOGGER.info(
+        f"Syncing in chunks of {chunk_size} rows up to keys {max_pk_values}"
+    )
+
+    select_sql = common.generate_select_sql(catalog_entry, columns, config)
+
+    with common.StreamEncoding(
+        catalog_entry, columns, config, state, table_stream, stream_version
+    ) as encoding:
+        while True:
+            last_pk_fetched = singer.get_bookmark(
+                state, catalog_entry.tap_stream_id, "last_pk_fetched"
+            )
+            chunk_sql, params = keyset_chunk_query(
+                catalog_entry,
+                select_sql,
+                key_properties,
+                last_pk_fetched,
+                max_pk_values,
+                chunk_size,
+            )
+
+            rows_synced = common.sync_query(
+                open_conn,
+                catalog_entry,
+                state,
+                chunk_sql,
+                columns,
+                stream_version,
+                table_stream,
+                params,
+                config,
+                message_writer,
+                encoding=encoding,
+            )
+            if rows_synced < chunk_size:
+                break
+
+
+def uses_pk_ranges(
+    catalog_entry,
+    state,
+    config,
+    ranges_bookmark="pk_ranges",
+    position_bookmark="last_pk_fetched",
+):
+    """Whether the chunks are read as parallel ranges.
+
+    A sync that was interrupted resumes the way it started: with its
+    ranges if it has them, sequentially if it has a position bookmarked.
+    """
+    bookmark = state.get("bookmarks", {}).get(catalog_entry.tap_stream_id, {})
+    if ranges_bookmark in bookmark:
+        return True
+    if position_bookmark in bookmark:
+        return False
+    return parallelism_for_stream(catalog_entry, config) > 1
+
+
+def sync_keyset_ranges(
+    engine,
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    message_writer,
+):
+    key_properties = common.get_key_properties(catalog_entry)
+    max_pk_values = bookmark_max_pk_values(
+        open_conn, catalog_entry, state, key_properties, config
+    )
+    if max_pk_values is None:
+        return
+
+    sync_pk_ranges(
+        engine,
+        open_conn,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        stream_version,
+        table_stream,
+        chunk_size_for_stream(catalog_entry, config),
+        max_pk_values,
+        parallelism_for_stream(catalog_entry, config),
+        message_writer,
+    )
+
+
+def sync_rows(
+    engine,
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    message_writer,
+):
+    """Reads the table the way its metadata and the config ask for.
+
+    Range partitions first, then database partitions, then the chunks by
+    key that changed since the last sync, then parallel ranges or chunks by
+    key, or by row id for a table without one, and otherwise a single query.
+    """
+    if uses_data_partitions(catalog_entry, config):
+        sync_data_partitions(
+            engine,
+            config,
+            catalog_entry,
+            state,
+            columns,
+            stream_version,
+            table_stream,
+            parallelism_for_stream(catalog_entry, config),
+            message_writer,
+        )
+        return
+
+    if uses_db_partitions(catalog_entry, config) and sync_db_partitions(
+        engine,
+        open_conn,
+        config,
+        catalog_entry,
+        state,
+        columns,
+        stream_version,
+        table_stream,
+        parallelism_for_stream(catalog_entry, config, default=None),
+        message_writer,
+    ):
+        return
+
+    if uses_rid_order(catalog_entry, config):
+        if uses_pk_ranges(
+            catalog_entry, state, config, "rid_ranges", "last_rid_fetched"
+        ):
+            sync_rid_ranges(
+                engine,
+                open_conn,
+                config,
+                catalog_entry,
+                state,
+                columns,
+                stream_version,
+                table_stream,
+                parallelism_for_stream(catalog_entry, config),
+                message_writer,
+            )
+        else:
+            sync_rid_ordered(
+                open_conn,
+                config,
+                catalog_entry,
+                state,
+                columns,
+                stream_version,
+                table_stream,
+                message_writer,
+            )
+        return
+
+    if uses_checksum_chunks(catalog_entry, config):
+        sync_checksum_chunks(
+            open_conn,
+            config,
+            catalog_entry,
+            state,
+            columns,
+            stream_version,
+            table_stream,
+            bookmark_max_pk_values(
+                open_conn,
+                catalog_entry,
+                state,
+                common.get_key_properties(catalog_entry),
+                config,
+            ),
+            message_writer,
+        )
+        return
+
+    if uses_keyset_chunks(catalog_entry, config):
+        if uses_pk_ranges(catalog_entry, state, config):
+            sync_keyset_ranges(
+                engine,
+                open_conn,
+                config,
+                catalog_entry,
+                state,
+                columns,
+                stream_version,
+                table_stream,
+                message_writer,
+            )
+        else:
+            sync_keyset_chunks(
+                open_conn,
+                config,
+                catalog_entry,
+                state,
+                columns,
+                stream_version,
+                table_stream,
+                message_writer,
+            )
+        return
+
+    LOGGER.info("Generating select_sql")
+    select_sql = common.generate_select_sql(catalog_entry, columns, config)
+
+    params = {}
+
+    common.sync_query(
+        open_conn,
+        catalog_entry,
+        state,
+        select_sql,
+        columns,
+        stream_version,
+        table_stream,
+        params,
+        config,
+        message_writer,
+    )
+
+
+def sync_table(
+    mssql_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    message_writer,
+):
     common.whitelist_bookmark_keys(
         generate_bookmark_keys(catalog_entry), catalog_entry.tap_stream_id, state
     )
@@ -51,6 +446,16 @@ def sync_table(mssql_conn, config, catalog_entry, state, columns, stream_version
 
     table_stream = common.set_schema_mapping(config, catalog_entry.stream)
 
+    # Unchanged chunks are not written again, so the rows written for them
+    # by earlier syncs have to stay in the version being activated
+    if uses_checksum_chunks(catalog_entry, config) and checksum_version(
+        catalog_entry, state
+    ):
+        stream_version = checksum_version(catalog_entry, state)
+
+    if version_exists and not resumes_in_place(catalog_entry, config, state):
+        stream_version = restart_in_new_version(catalog_entry, state, stream_version)
+
     activate_version_message = singer.ActivateVersionMessage(
         stream=table_stream, version=stream_version
     )
@@ -60,34 +465,54 @@ def sync_table(mssql_conn, config, catalog_entry, state, columns, stream_version
     if not initial_full_table_complete and not (
         version_exists and state_version is None
     ):
-        singer.write_message(activate_version_message)
+        message_writer.write_message(activate_version_message)
+
+    # An interrupted sync resumes with the same version, so the final
+    # ACTIVATE_VERSION keeps the rows written before the interruption
+    state = singer.write_bookmark(
+        state, catalog_entry.tap_stream_id, "version", stream_version
+    )
 
-    with mssql_conn.connect() as open_conn:
-        LOGGER.info("Generating select_sql")
-        select_sql = common.generate_select_sql(catalog_entry, columns)
+    connections = 0
 
-        params = {}
+    def sync_on_connection(open_conn):
+        nonlocal connections, stream_version
+        connections += 1
+        if connections > 1 and not resumes_in_place(catalog_entry, config, state):
+            stream_version = restart_in_new_version(
+                catalog_entry, state, stream_version
+            )
+            singer.write_bookmark(
+                state, catalog_entry.tap_stream_id, "version", stream_version
+            )
 
         if catalog_entry.tap_stream_id == "dbo-InputMetadata":
             prev_converter = modify_ouput_converter(open_conn)
 
-        common.sync_query(
+        sync_rows(
+            mssql_conn,
             open_conn,
+            config,
             catalog_entry,
             state,
-            select_sql,
             columns,
             stream_version,
             table_stream,
-            params,
-            config,
+            message_writer,
         )
 
         if catalog_entry.tap_stream_id == "dbo-InputMetadata":
             revert_ouput_converter(open_conn, prev_converter)
 
+    # After a lost connection, sync_rows resumes from the bookmarks, or
+    # starts again in a new version when that would write rows twice
+    with_reconnect(mssql_conn, config, catalog_entry, sync_on_connection)
+
     # clear max pk value and last pk fetched upon successful sync
-    singer.clear_bookmark(state, catalog_entry.tap_stream_id, "max_pk_values")
-    singer.clear_bookmark(state, catalog_entry.tap_stream_id, "last_pk_fetched")
+    for key in PROGRESS_BOOKMARK_KEYS:
+        singer.clear_bookmark(state, catalog_entry.tap_stream_id, key)
+    singer.clear_bookmark(state, catalog_entry.tap_stream_id, "snapshot_time")
 
-    singer.write_message(activate_version_message)
+    message_writer.write_message(
+        singer.ActivateVersionMessage(stream=table_stream, version=stream_version)
+    )
@@ -6,12 +6,14 @@ import singer
 from singer import metadata
 
 import tap_db2.sync_strategies.common as common
+from tap_db2.connection import with_reconnect
+from tap_db2.sync_strategies.incremental_windows import sync_windows, uses_windows
 
 LOGGER = singer.get_logger()
 
 BOOKMARK_KEYS = {"replication_key", "replication_key_value", "version"}
 
-def sync_table(mssql_conn, config, catalog_entry, state, columns):
+def sync_table(mssql_conn, config, catalog_entry, state, columns, message_writer):
     common.whitelist_bookmark_keys(
         BOOKMARK_KEYS, catalog_entry.tap_stream_id, state
     )
@@ -24,13 +26,9 @@ def sync_table(mssql_conn, config, catalog_entry, state, columns):
         state, catalog_entry.tap_stream_id, "replication_key"
     )
 
-    replication_key_value = None
-
-    if replication_key_metadata == replication_key_state:
-        replication_key_value = singer.get_bookmark(
-            state, catalog_entry.tap_stream_id, "replication_key_value"
-        )
-    else:
+    # The bookmarked value is only kept for the same replication key; sync_rows
+    # reads it, on every connection, as rows are written
+    if replication_key_metadata != replication_key_state:
         state = singer.write_bookmark(
             state,
             catalog_entry.tap_stream_id,
@@ -54,48 +52,93 @@ def sync_table(mssql_conn, config, catalog_entry, state, columns):
         stream=table_stream, version=stream_version
     )
 
-    singer.write_message(activate_version_message)
-    
-    # Get the offset value from config
-    offset_value = config.get('offset_value') or 0
-    LOGGER.info(f"Incremental Load will be offset by {offset_value}")
+    message_writer.write_message(activate_version_message)
     
-    LOGGER.info("Beginning SQL")
-    with mssql_conn.connect() as open_conn:
-        select_sql = common.generate_select_sql(catalog_entry, columns)
-        params = {}
-
-        if replication_key_value is not None:
-            replication_key_format = catalog_entry.schema.properties[
-              replication_key_metadata
-              ].format
-            
-            select_sql += f' WHERE "{replication_key_metadata}" >= :replication_key_value '
-
-            # Handle the offset value
-            # datetime - use pendulum to alter the value to be passed as a bind parameter
-            # other (numeric) - add the offset value in the SQL
-            if replication_key_format == "date-time":
-                replication_key_value = pendulum.parse(replication_key_value).add(seconds=offset_value)
-            else:
-                select_sql += f' + ({offset_value})' 
-
-            select_sql += f' ORDER BY "{replication_key_metadata}" ASC'
-
-            params["replication_key_value"] = replication_key_value
-            
-        elif replication_key_metadata is not None:
-            select_sql += ' ORDER BY "{}" ASC'.format(replication_key_metadata)
-
-        common.sync_query(
+    def sync_on_connection(open_conn):
+        sync_rows(
             open_conn,
+            config,
             catalog_entry,
             state,
-            select_sql,
             columns,
             stream_version,
             table_stream,
-            params,
+            message_writer,
+        )
+
+    # After a lost connection, the query starts again from the bookmarked
+    # replication key value
+    with_reconnect(mssql_conn, config, catalog_entry, sync_on_connection)
+
+
+def sync_rows(
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    message_writer,
+):
+    if uses_windows(catalog_entry, config):
+        sync_windows(
+            open_conn,
             config,
+            catalog_entry,
+            state,
+            columns,
+            stream_version,
+            table_stream,
+            message_writer,
         )
+        return
+
+    catalog_metadata = metadata.to_map(catalog_entry.metadata)
+    replication_key_metadata = catalog_metadata.get((), {}).get("replication-key")
+    replication_key_value = singer.get_bookmark(
+        state, catalog_entry.tap_stream_id, "replication_key_value"
+    )
 
+    # Get the offset value from config
+    offset_value = config.get('offset_value') or 0
+    LOGGER.info(f"Incremental Load will be offset by {offset_value}")
+    
+    LOGGER.info("Beginning SQL")
+    select_sql = common.generate_select_sql(catalog_entry, columns, config)
+    params = {}
+
+    if replication_key_value is not None:
+        replication_key_format = catalog_entry.schema.properties[
+          replication_key_metadata
+          ].format
+        
+        select_sql += f' WHERE "{replication_key_metadata}" >= :replication_key_value '
+
+        # Handle the offset value
+        # datetime - use pendulum to alter the value to be passed as a bind parameter
+        # other (numeric) - add the offset value in the SQL
+        if replication_key_format == "date-time":
+            replication_key_value = pendulum.parse(replication_key_value).add(seconds=offset_value)
+        else:
+            select_sql += f' + ({offset_value})' 
+
+        select_sql += f' ORDER BY "{replication_key_metadata}" ASC'
+
+        params["replication_key_value"] = replication_key_value
+        
+    elif replication_key_metadata is not None:
+        select_sql += ' ORDER BY "{}" ASC'.format(replication_key_metadata)
+
+    common.sync_query(
+        open_conn,
+        catalog_entry,
+        state,
+        select_sql,
+        columns,
+        stream_version,
+        table_stream,
+        params,
+        config,
+        message_writer,
+    )
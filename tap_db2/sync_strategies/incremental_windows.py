@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code,too-many-arguments,too-many-locals
+
+import datetime
+
+import pendulum
+import singer
+from singer import metadata
+from sqlalchemy import text
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.sync_strategies.checkpoint import state_snapshot
+from tap_db2.sync_strategies.stream_plan import StreamPlan
+
+LOGGER = singer.get_logger()
+
+# A window is never more than this many times larger or smaller than the last
+MAX_WINDOW_GROWTH = 4
+# Initial windows when the table has no statistics to estimate them from
+DEFAULT_WINDOW_SECONDS = 24 * 60 * 60
+
+
+def window_rows(catalog_entry, config):
+    """Rows each window of an INCREMENTAL sync aims for; 0 reads all at once.
+
+    Set incremental_window_rows in the config, or the stream's
+    "incremental-window-rows" metadata.
+    """
+    md_map = metadata.to_map(catalog_entry.metadata)
+    rows = md_map.get((), {}).get("incremental-window-rows")
+    if rows is None:
+        rows = config.get("incremental_window_rows")
+    return int(rows or 0)
+
+
+def replication_key_kind(catalog_entry, replication_key):
+    """"date-time" or "integer" for keys windows can be cut from, else None."""
+    key_schema = catalog_entry.schema.properties.get(replication_key)
+    if key_schema is None:
+        return None
+    if key_schema.format == "date-time":
+        return "date-time"
+    key_type = key_schema.type
+    if "integer" in (key_type if isinstance(key_type, list) else [key_type]):
+        return "integer"
+    return None
+
+
+def uses_windows(catalog_entry, config):
+    if window_rows(catalog_entry, config) <= 0:
+        return False
+    md_map = metadata.to_map(catalog_entry.metadata)
+    replication_key = md_map.get((), {}).get("replication-key")
+    if replication_key_kind(catalog_entry, replication_key) is None:
+        LOGGER.warning(
+            f"Replication key {replication_key} of {catalog_entry.tap_stream_id} "
+            "is neither a timestamp nor an integer, reading it in one query"
+        )
+        return False
+    return True
+
+
+def from_sql(catalog_entry):
+    return "FROM {}.{}{}".format(
+        common.escape(common.get_database_name(catalog_entry)),
+        common.escape(catalog_entry.table),
+        common.system_time_clause(catalog_entry),
+    )
+
+
+def start_value(catalog_entry, state, kind, config):
+    """The bookmarked replication key value moved by offset_value, or None."""
+    value = singer.get_bookmark(
+        state, catalog_entry.tap_stream_id, "replication_key_value"
+    )
+    if value is None:
+        return None
+    offset_value = config.get("offset_value") or 0
+    if kind == "date-time":
+        return pendulum.parse(value).add(seconds=offset_value).naive()
+    return int(value) + offset_value
+
+
+def key_bounds(open_conn, catalog_entry, replication_key, lower):
+    """Returns the smallest and largest key at or after lower, or (None, None)."""
+    key = common.escape(replication_key)
+    sql = f"SELECT MIN({key}), MAX({key}) {from_sql(catalog_entry)}"
+    params = {}
+    if lower is not None:
+        sql += f" WHERE {key} >= :lower"
+        params["lower"] = lower
+    return tuple(open_conn.execute(text(sql).bindparams(**params)).fetchone())
+
+
+def table_cardinality(open_conn, catalog_entry):
+    row = open_conn.execute(
+        text(
+            "SELECT CARD FROM SYSCAT.TABLES "
+            "WHERE TABSCHEMA = :table_schema AND TABNAME = :table_name"
+        ).bindparams(
+            table_schema=common.get_database_name(catalog_entry),
+            table_name=catalog_entry.table,
+        )
+    ).fetchone()
+    return None if row is None or row[0] is None or row[0] < 0 else row[0]
+
+
+def key_span(low, high):
+    """Distance between two keys, in seconds for timestamps and dates."""
+    if isinstance(low, datetime.date):
+        if not isinstance(low, datetime.datetime):
+            return (high - low).days * DEFAULT_WINDOW_SECONDS
+        return (high - low).total_seconds()
+    return high - low
+
+
+def advance(value, window):
+    """The key window after value, at least one second, day or integer."""
+    if isinstance(value, datetime.datetime):
+        return value + datetime.timedelta(seconds=max(1, round(window)))
+    if isinstance(value, datetime.date):
+        days = max(1, round(window / DEFAULT_WINDOW_SECONDS))
+        return value + datetime.timedelta(days=days)
+    return value + max(1, int(window))
+
+
+def window_end(lower, high, window):
+    """The end of the window starting at lower, or None if it reaches high.
+
+    The window is compared with the keys left before advancing, so a window
+    grown over empty ones never steps past the largest key a date or
+    timestamp can hold.
+    """
+    if window >= key_span(lower, high):
+        return None
+    try:
+        upper = advance(lower, window)
+    except OverflowError:
+        return None
+    return None if upper > high else upper
+
+
+def initial_window(open_conn, catalog_entry, low, high, target_rows, config):
+    """Sizes the first window from the table's CARD, as if keys were even.
+
+    incremental_window_size, in seconds for timestamps or in key values for
+    integers, takes precedence.
+    """
+    if config.get("incremental_window_size"):
+        return float(config["incremental_window_size"])
+    span = key_span(low, high)
+    try:
+        card = table_cardinality(open_conn, catalog_entry)
+    except Exception as exc:  # pylint: disable=broad-except
+        LOGGER.warning(
+            f"Could not read the row count of {catalog_entry.table}: {exc}"
+        )
+        card = None
+    if card:
+        return max(1.0, float(span) * target_rows / card)
+    if isinstance(low, datetime.date):
+        return float(DEFAULT_WINDOW_SECONDS)
+    return float(target_rows)
+
+
+def next_window(window, rows, target_rows):
+    """Scales the window by how far its rows were from the target."""
+    if rows == 0:
+        return window * MAX_WINDOW_GROWTH
+    scale = min(MAX_WINDOW_GROWTH, max(1 / MAX_WINDOW_GROWTH, target_rows / rows))
+    return max(1.0, window * scale)
+
+
+def bookmark_value(key_plan, value):
+    """value formatted as the bookmark of a row with that key is.
+
+    key_plan is a StreamPlan of the replication key alone.
+    """
+    return key_plan.converters[0](value)
+
+
+def sync_windows(
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    message_writer,
+):
+    """Reads the rows of an INCREMENTAL stream one key window at a time.
+
+    Keys from the bookmarked value up to the largest key when the sync
+    starts are cut into windows, each read by its own ORDER BY query, so
+    DB2 only ever sorts one window. Windows are sized to hold about
+    incremental_window_rows rows and resized after each by the rows it
+    held. Once a window is read its end is bookmarked, so a resumed sync
+    starts at the next window even when the last ones were empty.
+
+    Like the single query of a first sync, which reads them last, a sync
+    without a bookmarked value first reads the rows whose replication key is
+    NULL, in one query. Later syncs never read them.
+    """
+    tap_stream_id = catalog_entry.tap_stream_id
+    md_map = metadata.to_map(catalog_entry.metadata)
+    replication_key = md_map.get((), {}).get("replication-key")
+    kind = replication_key_kind(catalog_entry, replication_key)
+    target_rows = window_rows(catalog_entry, config)
+    select_sql = common.generate_select_sql(catalog_entry, columns, config)
+    key = common.escape(replication_key)
+
+    with common.StreamEncoding(
+        catalog_entry, columns, config, state, table_stream, stream_version
+    ) as encoding:
+        lower = start_value(catalog_entry, state, kind, config)
+        if lower is None:
+            rows = common.sync_query(
+                open_conn,
+                catalog_entry,
+                state,
+                f"{select_sql} WHERE {key} IS NULL",
+                columns,
+                stream_version,
+                table_stream,
+                {},
+                config,
+                message_writer,
+                encoding=encoding,
+            )
+            LOGGER.info(
+                f"Synced {rows} rows of {tap_stream_id} without a {replication_key}"
+            )
+
+        low, high = key_bounds(open_conn, catalog_entry, replication_key, lower)
+        if low is None:
+            LOGGER.info(f"No rows to sync for {tap_stream_id}")
+            return
+
+        window = initial_window(
+            open_conn, catalog_entry, low, high, target_rows, config
+        )
+        lower = low
+        key_plan = StreamPlan(catalog_entry, [replication_key], config)
+
+        while True:
+            upper = window_end(lower, high, window)
+            last_window = upper is None
+            if last_window:
+                where = f"{key} >= :lower AND {key} <= :upper"
+                upper = high
+            else:
+                where = f"{key} >= :lower AND {key} < :upper"
+
+            rows = common.sync_query(
+                open_conn,
+                catalog_entry,
+                state,
+                f"{select_sql} WHERE {where} ORDER BY {key} ASC",
+                columns,
+                stream_version,
+                table_stream,
+                {"lower": lower, "upper": upper},
+                config,
+                message_writer,
+                encoding=encoding,
+            )
+            LOGGER.info(
+                f"Synced {rows} rows of {tap_stream_id} with {replication_key} "
+                f"from {lower} to {upper}"
+            )
+            if last_window:
+                return
+
+            state = singer.write_bookmark(
+                state,
+                tap_stream_id,
+                "replication_key_value",
+                bookmark_value(key_plan, upper),
+            )
+            # sync_query has just written a STATE for a window that had rows; the
+            # end of an empty one is only saved here
+            if rows == 0:
+                message_writer.write_message(
+                    singer.StateMessage(value=state_snapshot(state, tap_stream_id))
+                )
+
+            window = next_window(window, rows, target_rows)
+            lower = upper
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import datetime
+import decimal
+
+from singer import metadata
+
+from tap_db2.sync_strategies.common import escape
+from tap_db2.sync_strategies.stream_plan import (
+    BINARY_TYPES,
+    DATE_TYPES,
+    TIME_TYPES,
+    TIMESTAMP_TYPES,
+)
+
+# Converted as strings when their schema format is singer.decimal
+DECIMAL_TYPES = {"decimal", "numeric", "decfloat"}
+
+# Rows read per keyset chunk, unless full_table_chunk_size is set
+DEFAULT_FULL_TABLE_CHUNK_SIZE = 100000
+
+
+def chunk_size_for_stream(catalog_entry, config):
+    """Rows per keyset chunk of a FULL_TABLE sync, 0 to read the table in one query.
+
+    The stream's "full-table-chunk-size" metadata takes precedence over
+    full_table_chunk_size in the config.
+    """
+    md_map = metadata.to_map(catalog_entry.metadata)
+    chunk_size = md_map.get((), {}).get("full-table-chunk-size")
+    if chunk_size is None:
+        chunk_size = config.get("full_table_chunk_size")
+    if chunk_size is None:
+        return DEFAULT_FULL_TABLE_CHUNK_SIZE
+    return int(chunk_size)
+
+
+def bind_value(value, sql_data_type):
+    """Converts a bookmarked key value back to a bind parameter value.
+
+    Bookmarks hold key values as written to RECORD messages; strings are
+    parsed back into values DB2 compares with the key column.
+    """
+    if value is None or not isinstance(value, str):
+        return value
+
+    if sql_data_type in TIMESTAMP_TYPES:
+        return datetime.datetime.fromisoformat(value).replace(tzinfo=None)
+    elif sql_data_type in DATE_TYPES:
+        # "2023-01-02", or "2023-01-02T00:00:00+00:00" without use_date_datatype
+        return datetime.date.fromisoformat(value[:10])
+    elif sql_data_type in TIME_TYPES:
+        # "03:04:05", or "1970-01-01T03:04:05+00:00" without use_date_datatype
+        if "T" in value:
+            return datetime.datetime.fromisoformat(value).time()
+        return datetime.time.fromisoformat(value)
+    elif sql_data_type in DECIMAL_TYPES:
+        return decimal.Decimal(value)
+    elif sql_data_type in BINARY_TYPES and value.startswith("0x"):
+        return bytes.fromhex(value[2:])
+
+    return value
+
+
+def bind_values(catalog_entry, values, param_prefix):
+    """Returns bind parameters named <param_prefix>_<n> for ordered key values."""
+    md_map = metadata.to_map(catalog_entry.metadata)
+    return {
+        f"{param_prefix}_{idx}": bind_value(
+            value, md_map.get(("properties", column), {}).get("sql-datatype")
+        )
+        for idx, (column, value) in enumerate(values.items())
+    }
+
+
+def tuple_predicate(expressions, values, operator, inclusive=False, nulls_first=None):
+    """Compares a tuple of SQL expressions with a tuple of SQL values.
+
+    For expressions (a, b, c), values (x, y, z) and operator ">" this is
+        a >= x AND ((a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z))
+    DB2 has no row value comparison, so the tuple comparison is expanded into
+    OR/AND terms; the leading term lets DB2 start an index range scan or
+    eliminate data partitions. With inclusive, the last expression is
+    compared with <operator>=, so a tuple equal to the values matches.
+
+    nulls_first, one boolean per expression, makes NULL compare as lower
+    (True) or higher (False) than any value, as DB2 orders the keys of a
+    partitioned table; by default a NULL matches no comparison.
+    """
+
+    def compare(idx, comparison):
+        term = f"{expressions[idx]} {comparison} {values[idx]}"
+        if nulls_first is not None and nulls_first[idx] == (comparison[0] == "<"):
+            term = f"({term} OR {expressions[idx]} IS NULL)"
+        return term
+
+    terms = []
+    for idx in range(len(expressions)):
+        last_operator = operator
+        if inclusive and idx == len(expressions) - 1:
+            last_operator = operator + "="
+        equal_terms = [f"{expressions[j]} = {values[j]}" for j in range(idx)]
+        terms.append(" AND ".join(equal_terms + [compare(idx, last_operator)]))
+
+    if len(terms) == 1:
+        return terms[0]
+    leading = compare(0, f"{operator}=")
+    return f"{leading} AND ({' OR '.join(f'({term})' for term in terms)})"
+
+
+def keyset_predicate(escaped_keys, param_prefix, operator, inclusive=False):
+    """Compares the key columns with bind parameters <param_prefix>_<n>."""
+    params = [f":{param_prefix}_{idx}" for idx in range(len(escaped_keys))]
+    return tuple_predicate(escaped_keys, params, operator, inclusive)
+
+
+def ordered_key_values(key_properties, values):
+    return {k: values[k] for k in key_properties}
+
+
+def keyset_range(catalog_entry, key_properties, lower, upper):
+    """Returns (WHERE condition, params) for keys after lower, up to upper.
+
+    lower is exclusive, and None for the start of the table; upper is
+    inclusive.
+    """
+    escaped_keys = [escape(k) for k in key_properties]
+    predicates = [keyset_predicate(escaped_keys, "max_pk", "<", inclusive=True)]
+    params = bind_values(
+        catalog_entry, ordered_key_values(key_properties, upper), "max_pk"
+    )
+    if lower:
+        predicates.insert(0, keyset_predicate(escaped_keys, "last_pk", ">"))
+        params.update(
+            bind_values(
+                catalog_entry, ordered_key_values(key_properties, lower), "last_pk"
+            )
+        )
+    return " AND ".join(f"({p})" for p in predicates), params
+
+
+def keyset_chunk_query(
+    catalog_entry, select_sql, key_properties, lower, upper, chunk_size
+):
+    """Returns (sql, params) reading the next chunk of rows in key order.
+
+    The chunk starts after the key values in lower (from the start when
+    None) and ends at the key values in upper, inclusive. A chunk_size of
+    None reads every row up to upper.
+    """
+    where, params = keyset_range(catalog_entry, key_properties, lower, upper)
+    sql = "{} WHERE {} ORDER BY {}".format(
+        select_sql, where, ", ".join(escape(k) for k in key_properties)
+    )
+    if chunk_size is not None:
+        sql += f" FETCH FIRST {chunk_size} ROWS ONLY"
+    return sql, params
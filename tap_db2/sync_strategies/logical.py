@@ -30,7 +30,9 @@ class log_based_sync:
     Methods to validate the log-based sync of a table from mssql
     """
 
-    def __init__(self, mssql_conn, config, catalog_entry, state, columns):
+    def __init__(
+        self, mssql_conn, config, catalog_entry, state, columns, message_writer
+    ):
         self.logger = singer.get_logger()
         self.config = config
         self.catalog_entry = catalog_entry
@@ -40,6 +42,7 @@ class log_based_sync:
         self.schema_name = common.get_database_name(self.catalog_entry)
         self.table_name = catalog_entry.table
         self.mssql_conn = mssql_conn
+        self.message_writer = message_writer
 
     def assert_log_based_is_enabled(self):
         database_is_change_tracking_enabled = self._get_change_tracking_database()
@@ -166,7 +169,7 @@ class log_based_sync:
             )
             return True
 
-        # singer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
+        # writer.write_message(singer.StateMessage(value=copy.deepcopy(state)))
 
     def _get_current_log_version(self):
         """Returns the highest tracked version to date by change tracking. Set as part of the initial load and used if no rows were synced (maybe)"""
@@ -225,12 +228,32 @@ class log_based_sync:
                 f"Expected at least 1 key property column in the config, got {key_properties}."
             )
 
-        ct_sql_query = self._build_ct_sql_query(key_properties)
+        ct_sql_query = common.with_read_clauses(
+            self._build_ct_sql_query(key_properties).rstrip(),
+            self.catalog_entry,
+            self.config,
+        )
         self.logger.info("Executing log-based query: {}".format(ct_sql_query))
         time_extracted = utils.now()
         stream_version = common.get_stream_version(
             self.catalog_entry.tap_stream_id, self.state
         )
+        # Conversion plans are built once; deletes only carry the key columns
+        sdc_data_types = {"_sdc_deleted_at": "datetime"}
+        upsert_plan = common.StreamPlan(
+            self.catalog_entry,
+            self.columns + ["_sdc_deleted_at"],
+            self.config,
+            sql_data_types=sdc_data_types,
+        )
+        delete_plan = common.StreamPlan(
+            self.catalog_entry,
+            key_properties + ["_sdc_deleted_at"],
+            self.config,
+            sql_data_types=sdc_data_types,
+        )
+        table_stream = self.catalog_entry.stream.replace("-", "_")
+
         with self.mssql_conn.connect() as open_conn:
 
             if self.catalog_entry.tap_stream_id == "dbo-InputMetadata":
@@ -247,17 +270,15 @@ class log_based_sync:
 
                 while row:
                     counter.increment()
-                    desired_columns = []
                     ordered_row = []
 
                     rows_saved += 1
 
                     if row["sys_change_operation"] == "D":
-                        for index, column in enumerate(key_properties):
-                            desired_columns.append(column)
+                        plan = delete_plan
+                        for column in key_properties:
                             ordered_row.append(row[column])
 
-                        desired_columns.append("_sdc_deleted_at")
                         if row["commit_time"] is None:
                             self.logger.warn(
                                 "Found deleted record with no timestamp, falling back to current time."
@@ -267,24 +288,20 @@ class log_based_sync:
                             ordered_row.append(row["commit_time"])
 
                     else:
-
-                        for index, column in enumerate(self.columns):
-                            desired_columns.append(column)
+                        plan = upsert_plan
+                        for column in self.columns:
                             ordered_row.append(row[column])
 
-                        desired_columns.append("_sdc_deleted_at")
                         ordered_row.append(None)
 
-                    table_stream = self.catalog_entry.stream.replace("-", "_")
-                    record_message = common.row_to_singer_record(
-                        self.catalog_entry,
+                    record_message = common.record_message_for_row(
+                        plan,
                         stream_version,
                         table_stream,
                         ordered_row,
-                        desired_columns,
                         time_extracted,
                     )
-                    singer.write_message(record_message)
+                    self.message_writer.write_message(record_message)
 
                     self.state = singer.write_bookmark(
                         self.state,
@@ -296,7 +313,9 @@ class log_based_sync:
                     # do more
                     row = results.fetchone()
 
-            singer.write_message(singer.StateMessage(value=copy.deepcopy(self.state)))
+            self.message_writer.write_message(
+                singer.StateMessage(value=copy.deepcopy(self.state))
+            )
 
             if self.catalog_entry.tap_stream_id == "dbo-InputMetadata":
                 revert_ouput_converter(open_conn, prev_converter)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code,too-many-arguments,too-many-locals
+
+import abc
+import collections
+import queue
+import threading
+
+import singer
+import singer.metrics as metrics
+from singer import utils
+from sqlalchemy import text
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.sync_strategies.checkpoint import checkpoint_policy, state_snapshot
+from tap_db2.sync_strategies.fetch_size import fetch_batches, fetch_size_for_stream
+from tap_db2.sync_strategies.serialization_pool import BatchEncoder
+
+LOGGER = singer.get_logger()
+
+# Encoded batches waiting for the writer, per reader running
+BATCHES_IN_FLIGHT_PER_READER = 2
+
+# How long a blocked put waits before checking whether the writer has gone
+PUT_TIMEOUT_SECONDS = 0.5
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class PartReader(abc.ABC):
+    """Reads one part of a table (a key range, a partition) on its own connection.
+
+    Runs on a reader thread, converting and encoding the rows with its own
+    BatchEncoder, and hands (row count, payload, bookmark values) per batch
+    to the writer, followed by _DONE once the part is read. Subclasses
+    implement read_part, calling put_results for each query they run.
+    """
+
+    def __init__(
+        self,
+        index,
+        engine,
+        catalog_entry,
+        columns,
+        config,
+        table_stream,
+        stream_version,
+        bookmark_columns,
+    ):
+        self.index = index
+        self.engine = engine
+        self.catalog_entry = catalog_entry
+        self.columns = columns
+        self.config = config
+        self.table_stream = table_stream
+        self.stream_version = stream_version
+        self.bookmark_columns = bookmark_columns
+        self.queue = None
+        self.stop = None
+        self.batch_encoder = None
+        self.fetch_size = None
+        self.thread = threading.Thread(
+            target=self._read, name=f"tap-db2-reader-{index}", daemon=True
+        )
+
+    def start(self, out_queue, stop):
+        self.queue = out_queue
+        self.stop = stop
+        self.thread.start()
+
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.queue.put((self.index, item), timeout=PUT_TIMEOUT_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self):
+        try:
+            self.batch_encoder = BatchEncoder(
+                self.catalog_entry,
+                self.columns,
+                self.config,
+                self.table_stream,
+                self.stream_version,
+                utils.now(),
+                self.bookmark_columns,
+            )
+            self.fetch_size = fetch_size_for_stream(
+                self.catalog_entry, self.columns, self.config
+            )
+            with self.engine.connect() as open_conn:
+                self.read_part(open_conn)
+            self._put(_DONE)
+        except Exception as exc:  # pylint: disable=broad-except
+            self._put(_Failure(exc))
+
+    def put_results(self, results, trailing_bookmark=None):
+        """Encodes and hands over the rows of results.
+
+        trailing_bookmark is as for common.sync_query, its value added to
+        each batch's bookmark values. Returns (rows read, last bookmark
+        values), or None once the writer has stopped.
+        """
+        rows_read = 0
+        bookmark_values = None
+        batches = fetch_batches(results, self.fetch_size)
+        last_values = collections.deque()
+        if trailing_bookmark is not None:
+            batches = common.split_last_column(batches, last_values)
+        for rows in batches:
+            row_count, payload, bookmark_values = self.batch_encoder.encode(rows)
+            if trailing_bookmark is not None:
+                key, convert = trailing_bookmark
+                bookmark_values = dict(
+                    bookmark_values, **{key: convert(last_values.popleft())}
+                )
+            if not self._put((row_count, payload, bookmark_values)):
+                return None
+            rows_read += row_count
+        return rows_read, bookmark_values
+
+    def put_progress(self, bookmark_values):
+        """Hands over bookmark values for a position not taken from a row.
+
+        Returns False once the writer has stopped.
+        """
+        return self._put((0, b"", bookmark_values))
+
+    @abc.abstractmethod
+    def read_part(self, open_conn):
+        """Reads the part on open_conn, handing its rows over with put_results."""
+
+
+def write_from_readers(
+    readers,
+    concurrency,
+    catalog_entry,
+    state,
+    config,
+    on_batch,
+    on_done,
+    message_writer,
+):
+    """Writes the batches of readers, running up to concurrency at a time.
+
+    This thread is the only one writing RECORD and STATE messages and
+    changing state: on_batch(index, bookmark_values) is called after each
+    batch is written and on_done(index) once a reader has finished, before
+    the STATE written for it. Other STATE messages follow the checkpoint
+    policy. The first reader failure is raised once the readers are stopped.
+    """
+    concurrency = max(1, min(concurrency, len(readers)))
+    out_queue = queue.Queue(maxsize=BATCHES_IN_FLIGHT_PER_READER * concurrency)
+    stop = threading.Event()
+    waiting = list(readers)
+    started = []
+    policy = checkpoint_policy(config)
+
+    def start_next():
+        reader = waiting.pop(0)
+        reader.start(out_queue, stop)
+        started.append(reader)
+
+    def write_state():
+        message_writer.write_message(
+            singer.StateMessage(value=state_snapshot(state, catalog_entry.tap_stream_id))
+        )
+
+    with metrics.record_counter(None) as counter:
+        counter.tags["database"] = common.get_database_name(catalog_entry)
+        counter.tags["table"] = catalog_entry.table
+
+        try:
+            while waiting and len(started) < concurrency:
+                start_next()
+
+            remaining = len(readers)
+            while remaining:
+                index, item = out_queue.get()
+                if isinstance(item, _Failure):
+                    raise item.exc
+
+                if item is _DONE:
+                    remaining -= 1
+                    on_done(index)
+                    write_state()
+                    if waiting:
+                        start_next()
+                    continue
+
+                row_count, payload, bookmark_values = item
+                if payload:
+                    message_writer.write_bytes(payload)
+                    counter.increment(row_count)
+                on_batch(index, bookmark_values)
+
+                if policy.due(row_count, len(payload)):
+                    write_state()
+        finally:
+            stop.set()
+            # Unblock readers waiting on a full queue
+            while True:
+                try:
+                    out_queue.get_nowait()
+                except queue.Empty:
+                    break
+            for reader in started:
+                reader.thread.join()
+
+
+class PredicateReader(PartReader):
+    """Reads the rows of the table matching a WHERE condition in one query."""
+
+    def __init__(self, index, predicate, *args):
+        super().__init__(index, *args)
+        self.predicate = predicate
+
+    def read_part(self, open_conn):
+        select_sql = common.generate_select_sql(
+            self.catalog_entry, self.columns, self.config
+        )
+        sql = common.with_read_clauses(
+            f"{select_sql} WHERE {self.predicate}", self.catalog_entry, self.config
+        )
+        self.put_results(open_conn.execute(text(sql)))
+
+
+def sync_parts_by_predicate(
+    engine,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    parts,
+    bookmark_key,
+    concurrency,
+    message_writer,
+):
+    """Syncs a table as parts, each the rows matching a WHERE condition.
+
+    parts is a list of (name, predicate). Up to concurrency parts are read
+    at once, each on its own connection. A part's name is added to the
+    bookmark_key bookmark once all its rows are written, so a resumed sync
+    skips it. Parts with rows written but not all of them are kept in the
+    "partial_parts" bookmark: a resumed sync reads them again from their
+    start, which a stream without a key can only do in a new table version
+    (see full_table.resumes_in_place).
+    """
+    tap_stream_id = catalog_entry.tap_stream_id
+    completed = singer.get_bookmark(state, tap_stream_id, bookmark_key)
+    if completed is None:
+        completed = []
+        state = singer.write_bookmark(state, tap_stream_id, bookmark_key, completed)
+    partial = singer.get_bookmark(state, tap_stream_id, "partial_parts")
+    if partial is None:
+        partial = []
+        state = singer.write_bookmark(state, tap_stream_id, "partial_parts", partial)
+
+    pending = [(name, predicate) for name, predicate in parts if name not in completed]
+    LOGGER.info(
+        f"Reading {len(pending)} of {len(parts)} parts of "
+        f"{catalog_entry.tap_stream_id}, {concurrency} at a time"
+    )
+
+    readers = []
+    for idx, (name, predicate) in enumerate(pending):
+        LOGGER.info(f"Part {name}: {predicate}")
+        readers.append(
+            PredicateReader(
+                idx,
+                predicate,
+                engine,
+                catalog_entry,
+                columns,
+                config,
+                table_stream,
+                stream_version,
+                [],
+            )
+        )
+
+    def on_batch(index, bookmark_values):
+        if pending[index][0] not in partial:
+            partial.append(pending[index][0])
+
+    # Only called once the batches the reader handed over before it are written
+    def on_done(index):
+        name = pending[index][0]
+        if name in partial:
+            partial.remove(name)
+        completed.append(name)
+        LOGGER.info(f"Part {name} complete")
+
+    write_from_readers(
+        readers,
+        concurrency,
+        catalog_entry,
+        state,
+        config,
+        on_batch,
+        on_done,
+        message_writer,
+    )
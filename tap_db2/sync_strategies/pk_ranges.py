@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code,too-many-arguments,too-many-locals
+
+import singer
+from singer import metadata
+from sqlalchemy import text
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.sync_strategies.keyset import keyset_chunk_query
+from tap_db2.sync_strategies.parallel_reader import PartReader, write_from_readers
+from tap_db2.sync_strategies.split_planner import plan_splits
+from tap_db2.sync_strategies.stream_plan import StreamPlan
+
+LOGGER = singer.get_logger()
+
+DEFAULT_FULL_TABLE_PARALLELISM = 1
+
+
+def parallelism_for_stream(
+    catalog_entry, config, default=DEFAULT_FULL_TABLE_PARALLELISM
+):
+    """Connections a FULL_TABLE sync of the stream reads at the same time on.
+
+    The stream's "full-table-parallelism" metadata takes precedence over
+    full_table_parallelism in the config; default is returned if neither
+    is set.
+    """
+    md_map = metadata.to_map(catalog_entry.metadata)
+    parallelism = md_map.get((), {}).get("full-table-parallelism")
+    if parallelism is None:
+        parallelism = config.get("full_table_parallelism")
+    if parallelism is None:
+        return default
+    return int(parallelism)
+
+
+def raw_key_plan(catalog_entry, key_properties, config):
+    # Key values are selected without server side rendering; converting them
+    # gives the same strings a rendered SELECT returns
+    return StreamPlan(
+        catalog_entry, key_properties, dict(config, server_side_rendering=False)
+    )
+
+
+def plan_pk_ranges(open_conn, catalog_entry, key_properties, max_pk_values, ranges, config):
+    """Splits the keys up to max_pk_values into ranges of about the same rows.
+
+    Returns a list of {"lower": ..., "upper": ...} key values, the lower
+    bound exclusive (None for the first range) and the upper inclusive. The
+    boundaries are chosen by the split_planner in the config (see
+    split_planner.plan_splits).
+    """
+    split_plan = plan_splits(
+        open_conn, catalog_entry, key_properties, max_pk_values, ranges, config
+    )
+    plan = raw_key_plan(catalog_entry, key_properties, config)
+    positions = plan.positions(key_properties)
+    boundaries = []
+    for row in split_plan.boundaries:
+        boundary = plan.convert_values(row, positions)
+        if boundary != max_pk_values and boundary not in boundaries:
+            boundaries.append(boundary)
+
+    pk_ranges = []
+    lower = None
+    for upper in boundaries + [max_pk_values]:
+        pk_ranges.append({"lower": lower, "upper": upper})
+        lower = upper
+
+    for note in split_plan.notes:
+        LOGGER.warning(f"Key ranges of {catalog_entry.tap_stream_id} may be skewed: {note}")
+    LOGGER.info(
+        f"Split about {split_plan.estimated_rows} rows of "
+        f"{catalog_entry.tap_stream_id} by {split_plan.method} into "
+        f"{len(pk_ranges)} key ranges: {pk_ranges}"
+    )
+    return pk_ranges
+
+
+class RangeReader(PartReader):
+    """Reads one key range in keyset chunks."""
+
+    def __init__(self, index, pk_range, chunk_size, *args):
+        super().__init__(index, *args)
+        self.pk_range = pk_range
+        self.chunk_size = chunk_size
+
+    def read_part(self, open_conn):
+        key_properties = common.get_key_properties(self.catalog_entry)
+        select_sql = common.generate_select_sql(
+            self.catalog_entry, self.columns, self.config
+        )
+        lower = self.pk_range.get("last_pk_fetched") or self.pk_range["lower"]
+
+        while True:
+            chunk_sql, params = keyset_chunk_query(
+                self.catalog_entry,
+                select_sql,
+                key_properties,
+                lower,
+                self.pk_range["upper"],
+                self.chunk_size,
+            )
+            chunk_sql = common.with_read_clauses(
+                chunk_sql, self.catalog_entry, self.config
+            )
+            read = self.put_results(
+                open_conn.execute(text(chunk_sql).bindparams(**params))
+            )
+            if read is None:
+                return
+            rows_read, bookmark_values = read
+            if rows_read < self.chunk_size:
+                return
+            lower = bookmark_values
+
+
+def sync_pk_ranges(
+    engine,
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    chunk_size,
+    max_pk_values,
+    parallelism,
+    message_writer,
+):
+    """Syncs a table as key ranges read at the same time on several connections.
+
+    The ranges are planned once and kept in the "pk_ranges" bookmark, each
+    with its own last_pk_fetched and complete flag, so a resumed sync reads
+    only what is left of the unfinished ranges. Reader threads extract and
+    encode the ranges while this thread writes them (see write_from_readers).
+    """
+    key_properties = common.get_key_properties(catalog_entry)
+
+    pk_ranges = singer.get_bookmark(state, catalog_entry.tap_stream_id, "pk_ranges")
+    if pk_ranges is None:
+        pk_ranges = plan_pk_ranges(
+            open_conn, catalog_entry, key_properties, max_pk_values, parallelism, config
+        )
+        state = singer.write_bookmark(
+            state, catalog_entry.tap_stream_id, "pk_ranges", pk_ranges
+        )
+    else:
+        LOGGER.info(f"Resuming key ranges {pk_ranges}")
+
+    unfinished = [i for i, r in enumerate(pk_ranges) if not r.get("complete")]
+    LOGGER.info(
+        f"Reading {len(unfinished)} of {len(pk_ranges)} key ranges on "
+        f"{len(unfinished)} connections"
+    )
+
+    readers = [
+        RangeReader(
+            i,
+            pk_ranges[i],
+            chunk_size,
+            engine,
+            catalog_entry,
+            columns,
+            config,
+            table_stream,
+            stream_version,
+            key_properties,
+        )
+        for i in unfinished
+    ]
+
+    def on_batch(index, bookmark_values):
+        pk_ranges[index]["last_pk_fetched"] = bookmark_values
+
+    def on_done(index):
+        pk_ranges[index]["complete"] = True
+        LOGGER.info(f"Key range {index} complete")
+
+    write_from_readers(
+        readers,
+        len(readers),
+        catalog_entry,
+        state,
+        config,
+        on_batch,
+        on_done,
+        message_writer,
+    )
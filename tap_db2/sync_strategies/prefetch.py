@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import contextlib
+import queue
+import threading
+
+import singer
+
+LOGGER = singer.get_logger()
+
+# How long a blocked put waits before checking whether the consumer has gone
+PUT_TIMEOUT_SECONDS = 0.5
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class BatchPrefetcher:
+    """Runs a batch iterator on a fetch thread, up to depth batches ahead.
+
+    The fetch thread calls fetchmany (through the given iterator) while the
+    consuming thread converts and writes the previous batches. Batches come
+    out in the order they were fetched, so bookmarks and STATE messages are
+    produced exactly as without prefetching. The queue is bounded by depth,
+    so a slow consumer holds the fetch thread back rather than buffering the
+    whole table. An exception on the fetch thread is raised in the consumer
+    once the batches fetched before it have been consumed.
+
+    Use as a context manager; leaving the block stops the fetch thread and
+    waits for it, so the cursor is not in use when the connection closes.
+    """
+
+    def __init__(self, batches, depth):
+        self.batches = batches
+        self.queue = queue.Queue(maxsize=depth)
+        self.stop = threading.Event()
+        self.thread = threading.Thread(
+            target=self._fetch, name="tap-db2-prefetch", daemon=True
+        )
+
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=PUT_TIMEOUT_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch(self):
+        try:
+            for batch in self.batches:
+                if not self._put(batch):
+                    return
+            self._put(_DONE)
+        except Exception as exc:  # pylint: disable=broad-except
+            self._put(_Failure(exc))
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop.set()
+        # Unblock a fetch thread waiting on a full queue
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.thread.join()
+
+
+def prefetched(batches, config):
+    """Wraps batches in a BatchPrefetcher when prefetch_batches is configured.
+
+    Returns a context manager yielding an iterable of batches either way.
+    """
+    depth = config.get("prefetch_batches") or 0
+    if depth <= 0:
+        return contextlib.nullcontext(batches)
+
+    LOGGER.info(f"Prefetching up to {depth} batches on a fetch thread")
+    return BatchPrefetcher(batches, depth)
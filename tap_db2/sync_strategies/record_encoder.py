@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import decimal
+import math
+
+import simplejson
+import singer
+
+# singer.format_message encodes with simplejson and ensure_ascii=True. The C
+# string encoder behind that is used directly where it is available, with the
+# standard library's C encoder (which produces the same output) as a fallback.
+try:
+    from simplejson._speedups import encode_basestring_ascii as encode_string
+except ImportError:  # pragma: no cover - depends on the simplejson build
+    from json.encoder import encode_basestring_ascii as encode_string
+
+RECORD_PLACEHOLDER = '"record": {}'
+
+
+def encode_value(value):
+    """Encodes a single converted value exactly as singer.format_message would."""
+    value_type = type(value)
+    if value_type is str:
+        return encode_string(value)
+    elif value is None:
+        return "null"
+    elif value is True:
+        return "true"
+    elif value is False:
+        return "false"
+    elif value_type is int:
+        return int.__repr__(value)
+    elif value_type is float and math.isfinite(value):
+        return float.__repr__(value)
+    elif value_type is decimal.Decimal:
+        return str(value)
+
+    # Anything else (including non-finite floats, which raise) is left to the
+    # same encoder singer uses
+    return simplejson.dumps(value, use_decimal=True, allow_nan=False)
+
+
+class RecordEncoder:
+    """Encodes rows straight to RECORD message bytes for one stream.
+
+    The envelope around the record ("type", "stream", "version" and
+    "time_extracted") is constant for a stream, so it is rendered once with
+    singer.format_message and only the record body is encoded per row. The
+    output is byte for byte what singer.write_message produces for the same
+    RecordMessage, without building the record dict or the message.
+    """
+
+    def __init__(self, plan, table_stream, version, time_extracted):
+        envelope = singer.format_message(
+            singer.RecordMessage(
+                stream=table_stream,
+                record={},
+                version=version,
+                time_extracted=time_extracted,
+            )
+        )
+        # The placeholder can only occur once unescaped, as the record field
+        record_at = envelope.index(RECORD_PLACEHOLDER)
+        self.prefix = envelope[:record_at] + '"record": {'
+        self.suffix = "}" + envelope[record_at + len(RECORD_PLACEHOLDER):] + "\n"
+
+        self.plan = plan
+        self.keys = tuple(encode_string(column) + ": " for column in plan.columns)
+
+    def encode_row(self, row):
+        body = ", ".join(
+            [
+                key + encode_value(convert(elem))
+                for key, convert, elem in zip(self.keys, self.plan.converters, row)
+            ]
+        )
+        return (self.prefix + body + self.suffix).encode("ascii")
+
+    def encode_batch(self, rows):
+        """Encodes a batch of rows, converting them a column at a time."""
+        prefix = self.prefix
+        suffix = self.suffix
+        keys = self.keys
+        return "".join(
+            [
+                prefix
+                + ", ".join(
+                    [key + encode_value(value) for key, value in zip(keys, values)]
+                )
+                + suffix
+                for values in self.plan.convert_batch(rows)
+            ]
+        ).encode("ascii")
+
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code,too-many-arguments,too-many-locals
+
+import singer
+from singer import metadata
+from sqlalchemy import text
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.sync_strategies.keyset import bind_value
+from tap_db2.sync_strategies.parallel_reader import PartReader, write_from_readers
+
+LOGGER = singer.get_logger()
+
+
+def uses_rid_order(catalog_entry, config):
+    """Whether a FULL_TABLE sync of a table without a key is read in row id order.
+
+    Set full_table_rid_order in the config, or the stream's
+    "full-table-rid-order" metadata. Tables with a key use keyset chunks.
+    """
+    if common.get_key_properties(catalog_entry) or common.get_is_view(catalog_entry):
+        return False
+    md_map = metadata.to_map(catalog_entry.metadata)
+    rid_order = md_map.get((), {}).get("full-table-rid-order")
+    if rid_order is None:
+        rid_order = config.get("full_table_rid_order")
+    return bool(rid_order)
+
+
+def rid_expression(catalog_entry):
+    """RID_BIT of the table's rows.
+
+    Unlike RID, RID_BIT is unique in range-partitioned and DPF tables too,
+    and compares as binary in the order rows are stored.
+    """
+    return "RID_BIT({}.{})".format(
+        common.escape(common.get_database_name(catalog_entry)),
+        common.escape(catalog_entry.table),
+    )
+
+
+def encode_rid(rid):
+    return None if rid is None else f"0x{bytes(rid).hex().upper()}"
+
+
+def decode_rid(rid):
+    return bind_value(rid, "varbinary")
+
+
+def from_sql(catalog_entry):
+    return "FROM {}.{}".format(
+        common.escape(common.get_database_name(catalog_entry)),
+        common.escape(catalog_entry.table),
+    )
+
+
+def rid_range_predicate(catalog_entry, lower, upper):
+    """Returns (WHERE condition, params) for row ids after lower, up to upper."""
+    rid = rid_expression(catalog_entry)
+    predicates = [f"{rid} <= :upper_rid"]
+    params = {"upper_rid": decode_rid(upper)}
+    if lower is not None:
+        predicates.insert(0, f"{rid} > :lower_rid")
+        params["lower_rid"] = decode_rid(lower)
+    return " AND ".join(predicates), params
+
+
+def get_max_rid(open_conn, catalog_entry):
+    """Returns the largest row id of the table, None if it is empty."""
+    sql = f"SELECT MAX({rid_expression(catalog_entry)}) {from_sql(catalog_entry)}"
+    return encode_rid(open_conn.execute(text(sql)).fetchone()[0])
+
+
+def select_rid_range(catalog_entry, columns, config, lower, upper):
+    """Returns (SELECT, params) for the rows after lower up to upper in row id order.
+
+    Db2 has no access path for a range of row ids, so each such query scans
+    the whole table; the rows are read in one ordered query, with their row
+    id selected after columns for the last_rid_fetched bookmark.
+    """
+    rid = rid_expression(catalog_entry)
+    select_sql = common.generate_select_sql(catalog_entry, columns, config, [rid])
+    where, params = rid_range_predicate(catalog_entry, lower, upper)
+    return f"{select_sql} WHERE {where} ORDER BY {rid}", params
+
+
+def plan_rid_ranges(open_conn, catalog_entry, max_rid, ranges):
+    """Splits the row ids up to max_rid into ranges of about the same rows."""
+    rid = rid_expression(catalog_entry)
+    where, params = rid_range_predicate(catalog_entry, None, max_rid)
+    row_count = open_conn.execute(
+        text(f"SELECT COUNT(*) {from_sql(catalog_entry)} WHERE {where}").bindparams(
+            **params
+        )
+    ).fetchone()[0]
+    step = -(-row_count // ranges)
+
+    boundaries = []
+    if ranges > 1 and step > 0:
+        sql = (
+            f'SELECT "RID" FROM (SELECT {rid} AS "RID", ROW_NUMBER() OVER '
+            f'(ORDER BY {rid}) AS "ROW_NUM" {from_sql(catalog_entry)} WHERE {where}) '
+            f'AS "RIDS" WHERE MOD("ROW_NUM", {step}) = 0 ORDER BY "RID"'
+        )
+        boundaries = [
+            encode_rid(row[0])
+            for row in open_conn.execute(text(sql).bindparams(**params)).fetchall()
+        ]
+        boundaries = [b for b in boundaries if b != max_rid]
+
+    rid_ranges = []
+    lower = None
+    for upper in boundaries + [max_rid]:
+        rid_ranges.append({"lower": lower, "upper": upper})
+        lower = upper
+
+    LOGGER.info(
+        f"Split {row_count} rows of {catalog_entry.tap_stream_id} into "
+        f"{len(rid_ranges)} row id ranges: {rid_ranges}"
+    )
+    return rid_ranges
+
+
+def bookmark_max_rid(open_conn, catalog_entry, state):
+    max_rid = singer.get_bookmark(state, catalog_entry.tap_stream_id, "max_rid")
+    if max_rid is None:
+        max_rid = get_max_rid(open_conn, catalog_entry)
+        if max_rid is None:
+            LOGGER.info("Table is empty, nothing to sync")
+            return None
+        singer.write_bookmark(state, catalog_entry.tap_stream_id, "max_rid", max_rid)
+    return max_rid
+
+
+def sync_rid_ordered(
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    message_writer,
+):
+    """Syncs a table without a key in row id (RID_BIT) order.
+
+    The largest row id is bookmarked as max_rid when the sync starts, and
+    the rows up to it are read by a single query ordered by row id. The row
+    id of the last row of each batch written is bookmarked as
+    last_rid_fetched, so a reconnect carries on after the last row written
+    and a resumed sync after the last row of its last STATE message: only
+    the rows written after that STATE are read again. Each resume costs a
+    scan and sort of the rows left, as Db2 cannot seek to a row id. Row ids
+    change when a table is reorganized, so a sync should not be resumed
+    across a REORG.
+    """
+    max_rid = bookmark_max_rid(open_conn, catalog_entry, state)
+    if max_rid is None:
+        return
+    lower = singer.get_bookmark(state, catalog_entry.tap_stream_id, "last_rid_fetched")
+    LOGGER.info(f"Syncing by row id after {lower} up to {max_rid}")
+
+    sql, params = select_rid_range(catalog_entry, columns, config, lower, max_rid)
+    common.sync_query(
+        open_conn,
+        catalog_entry,
+        state,
+        sql,
+        columns,
+        stream_version,
+        table_stream,
+        params,
+        config,
+        message_writer,
+        trailing_bookmark=("last_rid_fetched", encode_rid),
+    )
+
+
+class RidRangeReader(PartReader):
+    """Reads one row id range in row id order, reporting each batch's last row id."""
+
+    def __init__(self, index, rid_range, *args):
+        super().__init__(index, *args)
+        self.rid_range = rid_range
+
+    def read_part(self, open_conn):
+        lower = self.rid_range.get("last_rid_fetched") or self.rid_range["lower"]
+        sql, params = select_rid_range(
+            self.catalog_entry, self.columns, self.config, lower, self.rid_range["upper"]
+        )
+        sql = common.with_read_clauses(sql, self.catalog_entry, self.config)
+        self.put_results(
+            open_conn.execute(text(sql).bindparams(**params)),
+            ("last_rid_fetched", encode_rid),
+        )
+
+
+def sync_rid_ranges(
+    engine,
+    open_conn,
+    config,
+    catalog_entry,
+    state,
+    columns,
+    stream_version,
+    table_stream,
+    parallelism,
+    message_writer,
+):
+    """Syncs a table without a key as row id ranges read at the same time.
+
+    The ranges are split by plan_rid_ranges in one pass over the row ids,
+    and each is read by a single query ordered by row id, like
+    sync_rid_ordered. The ranges and the last row id written in each are
+    kept in the "rid_ranges" bookmark.
+    """
+    max_rid = bookmark_max_rid(open_conn, catalog_entry, state)
+    if max_rid is None:
+        return
+
+    rid_ranges = singer.get_bookmark(state, catalog_entry.tap_stream_id, "rid_ranges")
+    if rid_ranges is None:
+        rid_ranges = plan_rid_ranges(open_conn, catalog_entry, max_rid, parallelism)
+        state = singer.write_bookmark(
+            state, catalog_entry.tap_stream_id, "rid_ranges", rid_ranges
+        )
+    else:
+        LOGGER.info(f"Resuming row id ranges {rid_ranges}")
+
+    unfinished = [i for i, r in enumerate(rid_ranges) if not r.get("complete")]
+    readers = [
+        RidRangeReader(
+            i,
+            rid_ranges[i],
+            engine,
+            catalog_entry,
+            columns,
+            config,
+            table_stream,
+            stream_version,
+            [],
+        )
+        for i in unfinished
+    ]
+
+    def on_batch(index, bookmark_values):
+        if "last_rid_fetched" in bookmark_values:
+            rid_ranges[index]["last_rid_fetched"] = bookmark_values["last_rid_fetched"]
+
+    def on_done(index):
+        rid_ranges[index]["complete"] = True
+        LOGGER.info(f"Row id range {index} complete")
+
+    write_from_readers(
+        readers,
+        len(readers),
+        catalog_entry,
+        state,
+        config,
+        on_batch,
+        on_done,
+        message_writer,
+    )
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import collections
+import multiprocessing
+import multiprocessing.pool
+import threading
+
+import singer
+
+from tap_db2.sync_strategies.arrow_encoder import record_encoder_for_stream
+from tap_db2.sync_strategies.stream_plan import StreamPlan
+
+LOGGER = singer.get_logger()
+
+# Batches submitted ahead of the one being written, per worker
+BATCHES_IN_FLIGHT_PER_WORKER = 2
+
+SERIALIZATION_MODES = {"process", "thread"}
+
+# Each worker (a process, or a thread of a thread pool) keeps its own
+# BatchEncoder here, set up by _init_worker
+_worker = threading.local()
+
+
+class BatchEncoder:
+    """Converts and encodes batches for one stream, owned by a single worker.
+
+    Holds the worker's own StreamPlan and record encoder, so no conversion
+    state (temporal caches included) is shared between workers.
+    """
+
+    def __init__(
+        self,
+        catalog_entry,
+        columns,
+        config,
+        table_stream,
+        stream_version,
+        time_extracted,
+        bookmark_columns,
+    ):
+        self.plan = StreamPlan(catalog_entry, columns, config)
+        self.encoder = record_encoder_for_stream(
+            self.plan, table_stream, stream_version, time_extracted, config
+        )
+        self.bookmark_positions = self.plan.positions(bookmark_columns)
+
+    def encode(self, rows):
+        """Returns (row count, RECORD message bytes, last row's bookmark values)."""
+        payload = self.encoder.encode_batch(rows)
+        bookmark_values = self.plan.convert_values(rows[-1], self.bookmark_positions)
+        return len(rows), payload, bookmark_values
+
+
+def _init_worker(*args):
+    _worker.batch_encoder = BatchEncoder(*args)
+
+
+def _encode_batch(rows):
+    return _worker.batch_encoder.encode(rows)
+
+
+class SerializationPool:
+    """Converts and encodes fetched batches on a pool of workers.
+
+    Each worker builds its own BatchEncoder once. Batches are handed out as
+    they are fetched and the encoded results are returned in fetch order,
+    as (row count, RECORD message bytes, converted bookmark columns of the
+    batch's last row), for a single writer in the syncing thread. At most
+    BATCHES_IN_FLIGHT_PER_WORKER batches per worker are outstanding, so a
+    slow writer holds back fetching.
+
+    In "process" mode the workers are processes started with the "spawn"
+    method, since the syncing process may be running writer and prefetch
+    threads. In "thread" mode they are threads of this process, which only
+    run conversion in parallel on a free-threaded (no GIL) Python build but
+    skip pickling the batches.
+    """
+
+    def __init__(
+        self,
+        workers,
+        catalog_entry,
+        columns,
+        config,
+        table_stream,
+        stream_version,
+        time_extracted,
+        bookmark_columns,
+        mode="process",
+    ):
+        self.max_in_flight = workers * BATCHES_IN_FLIGHT_PER_WORKER
+        self.mode = mode
+        initargs = (
+            catalog_entry,
+            list(columns),
+            config,
+            table_stream,
+            stream_version,
+            time_extracted,
+            list(bookmark_columns),
+        )
+        if mode == "thread":
+            self.pool = multiprocessing.pool.ThreadPool(
+                workers, initializer=_init_worker, initargs=initargs
+            )
+        else:
+            self.pool = multiprocessing.get_context("spawn").Pool(
+                workers, initializer=_init_worker, initargs=initargs
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.pool.close()
+        else:
+            self.pool.terminate()
+        self.pool.join()
+
+    def encode(self, batches):
+        """Yields (row count, payload, bookmark values) per batch, in order."""
+        pending = collections.deque()
+        for rows in batches:
+            if self.mode == "process":
+                # Driver rows (e.g. SQLAlchemy Row) are sent as plain tuples
+                rows = [tuple(row) for row in rows]
+            pending.append(self.pool.apply_async(_encode_batch, (rows,)))
+            if len(pending) >= self.max_in_flight:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+
+
+def serialization_workers(config):
+    return config.get("serialization_workers") or 0
+
+
+def serialization_mode(config):
+    mode = config.get("serialization_mode") or "process"
+    if mode not in SERIALIZATION_MODES:
+        raise Exception(
+            f"serialization_mode must be one of {sorted(SERIALIZATION_MODES)}, "
+            f"not {mode}"
+        )
+    return mode
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+from singer import metadata
+
+# DECIMAL values are cast to DECFLOAT(34), which keeps their scale, so that
+# DB2 renders them by the same to-scientific-string rules that str() of a
+# Python Decimal follows - "12.50", "0.00", "1E-7"
+DECIMAL_RENDER_TYPES = {"decimal", "numeric"}
+DECFLOAT_RENDER_TYPES = {"decfloat"}
+
+# datetime.isoformat() leaves out the fraction when it is zero
+DATE_AND_TIME = "CHAR(DATE({column}), ISO) || 'T' || CHAR(TIME({column}), JIS)"
+TIMESTAMP_TEMPLATE = (
+    "CASE WHEN MICROSECOND({column}) = 0 "
+    f"THEN {DATE_AND_TIME} || '+00:00' "
+    f"ELSE {DATE_AND_TIME} || '.' || VARCHAR_FORMAT({{column}}, 'FF6') "
+    "|| '+00:00' END"
+)
+
+
+def render_template(sql_data_type, property_format, use_date_data_type_format):
+    """Returns a SELECT expression template rendering a column as the tap would.
+
+    The template has a {column} placeholder for the escaped column name. The
+    expression yields the same string StreamPlan would produce from the value
+    the driver returns for the plain column. None means the column is
+    selected as it is, which includes types with no string target.
+    """
+    if sql_data_type == "timestamp" and property_format == "date-time":
+        return TIMESTAMP_TEMPLATE
+
+    elif sql_data_type == "date":
+        if use_date_data_type_format:
+            return "CHAR({column}, ISO)"
+        return "CHAR({column}, ISO) || 'T00:00:00+00:00'"
+
+    elif sql_data_type == "time":
+        if property_format == "time":
+            return "CHAR({column}, JIS)"
+        return "'1970-01-01T' || CHAR({column}, JIS) || '+00:00'"
+
+    elif property_format == "singer.decimal":
+        if sql_data_type in DECIMAL_RENDER_TYPES:
+            return "VARCHAR(CAST({column} AS DECFLOAT(34)))"
+        elif sql_data_type in DECFLOAT_RENDER_TYPES:
+            return "VARCHAR({column})"
+
+    return None
+
+
+def use_server_side_rendering(config):
+    return bool(config.get("server_side_rendering"))
+
+
+def rendered_columns(catalog_entry, columns, config):
+    """Maps each column the database renders to its expression template.
+
+    Empty unless server_side_rendering is set in the config.
+    """
+    if not use_server_side_rendering(config):
+        return {}
+
+    use_date_data_type_format = bool(config.get("use_date_datatype"))
+    md_map = metadata.to_map(catalog_entry.metadata)
+    templates = {}
+    for column in columns:
+        sql_data_type = md_map.get(("properties", column), {}).get("sql-datatype")
+        property_schema = catalog_entry.schema.properties.get(column)
+        property_format = property_schema.format if property_schema else None
+        template = render_template(
+            sql_data_type, property_format, use_date_data_type_format
+        )
+        if template is not None:
+            templates[column] = template
+
+    return templates
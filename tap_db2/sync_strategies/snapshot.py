@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import singer
+from singer import metadata
+from sqlalchemy import text
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.sync_strategies.rid_order import uses_rid_order
+
+LOGGER = singer.get_logger()
+
+SYSTEM_PERIOD_TEMPORAL_TYPES = ("S", "B")
+
+
+def uses_system_time(catalog_entry, config):
+    """Whether the stream is read as of the start of the run.
+
+    Tables discovered as system-period temporal ("system-period-temporal"
+    metadata) are, unless system_time_snapshot is false in the config or
+    the stream's "system-time-snapshot" metadata. Tables read in row id
+    order are not, as the rows of the history table have row ids of their
+    own.
+    """
+    md_map = metadata.to_map(catalog_entry.metadata)
+    stream_metadata = md_map.get((), {})
+    if not stream_metadata.get("system-period-temporal"):
+        return False
+    if uses_rid_order(catalog_entry, config):
+        return False
+    system_time = stream_metadata.get("system-time-snapshot")
+    if system_time is None:
+        system_time = config.get("system_time_snapshot")
+    return system_time is None or bool(system_time)
+
+
+def run_start_time(db2_conn, catalog_entries, config):
+    """Returns Db2's CURRENT TIMESTAMP as the run's snapshot time, in ISO format.
+
+    The database clock is used, as it is the one that stamps the rows'
+    system periods. None if no stream is read as of the run start.
+    """
+    if not any(uses_system_time(e, config) for e in catalog_entries):
+        return None
+    with db2_conn.connect() as open_conn:
+        row = open_conn.execute(
+            text("SELECT CURRENT TIMESTAMP FROM SYSIBM.SYSDUMMY1")
+        ).fetchone()
+    run_start = row[0].isoformat()
+    LOGGER.info(f"Reading system-period temporal tables as of {run_start}")
+    return run_start
+
+
+def pin_system_time(catalog_entry, state, config, run_start):
+    """Sets the stream's "system-time-as-of" metadata, returning the time used.
+
+    A FULL_TABLE sync interrupted in an earlier run carries on as of the
+    time in its snapshot_time bookmark, so all its rows come from the same
+    point in time.
+    """
+    if run_start is None or not uses_system_time(catalog_entry, config):
+        return None
+    as_of = (
+        singer.get_bookmark(state, catalog_entry.tap_stream_id, "snapshot_time")
+        or run_start
+    )
+    md_map = metadata.to_map(catalog_entry.metadata)
+    md_map = metadata.write(md_map, (), "system-time-as-of", as_of)
+    catalog_entry.metadata = metadata.to_list(md_map)
+    LOGGER.info(f"Reading {catalog_entry.tap_stream_id} as of {as_of}")
+    return as_of
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code,too-many-arguments,too-many-locals
+
+import datetime
+import decimal
+
+import singer
+from singer import metadata
+from sqlalchemy import text
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.sync_strategies.keyset import (
+    bind_values,
+    keyset_predicate,
+    ordered_key_values,
+)
+
+LOGGER = singer.get_logger()
+
+SPLIT_PLANNERS = {"statistics", "sample", "scan"}
+DEFAULT_SPLIT_PLANNER = "statistics"
+DEFAULT_SPLIT_SAMPLE_PERCENT = 1
+# Statistics collected longer ago than this are not trusted for splitting
+DEFAULT_STATISTICS_MAX_AGE_HOURS = 7 * 24
+
+# Leading key types HIGH2KEY and LOW2KEY can be interpolated between
+NUMERIC_TYPES = {
+    "smallint",
+    "integer",
+    "int",
+    "bigint",
+    "decimal",
+    "numeric",
+    "decfloat",
+    "real",
+    "double",
+}
+INTEGER_TYPES = {"smallint", "integer", "int", "bigint"}
+
+
+class SplitPlan:
+    """Split points chosen for a table, with how they were found.
+
+    boundaries are raw key tuples in key order, each the last key of a range;
+    estimated_rows is the row count the split was based on.
+    """
+
+    def __init__(self, method, boundaries, estimated_rows, notes=None):
+        self.method = method
+        self.boundaries = boundaries
+        self.estimated_rows = estimated_rows
+        self.notes = notes or []
+
+
+def split_planner(config):
+    planner = config.get("split_planner") or DEFAULT_SPLIT_PLANNER
+    if planner not in SPLIT_PLANNERS:
+        raise Exception(
+            f"split_planner must be one of {sorted(SPLIT_PLANNERS)}, not {planner}"
+        )
+    return planner
+
+
+def parse_literal(literal):
+    """Parses a COLDIST/HIGH2KEY value, kept in the catalog as an SQL literal."""
+    if literal is None:
+        return None
+    literal = str(literal).strip()
+    if literal.startswith("'") and literal.endswith("'") and len(literal) > 1:
+        return literal[1:-1].replace("''", "'")
+    try:
+        return decimal.Decimal(literal)
+    except decimal.InvalidOperation:
+        return literal
+
+
+def table_statistics(open_conn, catalog_entry, column):
+    """Reads the catalog statistics of a table and one of its columns.
+
+    Returns a dict with the table's CARD and STATS_TIME, the column's
+    LOW2KEY and HIGH2KEY, and its COLDIST quantiles as (value, rows up to
+    and including the value) and frequent values as (value, rows), or None
+    if the table is not in the catalog.
+    """
+    params = {
+        "table_schema": common.get_database_name(catalog_entry),
+        "table_name": catalog_entry.table,
+        "column_name": column,
+    }
+    row = open_conn.execute(
+        text(
+            """
+            SELECT t.CARD, t.STATS_TIME, c.LOW2KEY, c.HIGH2KEY
+            FROM SYSCAT.TABLES t
+            JOIN SYSCAT.COLUMNS c
+            ON c.TABSCHEMA = t.TABSCHEMA AND c.TABNAME = t.TABNAME
+            WHERE t.TABSCHEMA = :table_schema
+            AND t.TABNAME = :table_name
+            AND c.COLNAME = :column_name
+            """
+        ).bindparams(**params)
+    ).fetchone()
+    if row is None:
+        return None
+
+    card, stats_time, low2key, high2key = row
+    statistics = {
+        "card": card,
+        "stats_time": stats_time,
+        "low2key": parse_literal(low2key),
+        "high2key": parse_literal(high2key),
+        "quantiles": [],
+        "frequent": [],
+    }
+
+    coldist_results = open_conn.execute(
+        text(
+            """
+            SELECT TYPE, COLVALUE, VALCOUNT
+            FROM SYSCAT.COLDIST
+            WHERE TABSCHEMA = :table_schema
+            AND TABNAME = :table_name
+            AND COLNAME = :column_name
+            AND COLVALUE IS NOT NULL
+            AND VALCOUNT >= 0
+            ORDER BY TYPE, SEQNO
+            """
+        ).bindparams(**params)
+    )
+    for (dist_type, value, count) in coldist_results.fetchall():
+        key = "quantiles" if dist_type == "Q" else "frequent"
+        statistics[key].append((parse_literal(value), count))
+
+    return statistics
+
+
+def statistics_problem(statistics, max_age_hours, now=None):
+    """Returns why statistics can't be used for splitting, or None if they can."""
+    if statistics is None:
+        return "the table is not in SYSCAT.TABLES"
+    if statistics["card"] is None or statistics["card"] < 0:
+        return "the table has no statistics (CARD is -1)"
+    if statistics["stats_time"] is None:
+        return "the table has no STATS_TIME"
+    now = now or datetime.datetime.now()
+    age = now - statistics["stats_time"]
+    if age > datetime.timedelta(hours=max_age_hours):
+        return f"statistics are {age} old, over {max_age_hours} hours"
+    return None
+
+
+def split_values_from_statistics(statistics, ranges, sql_data_type):
+    """Returns leading key values splitting the table into ranges of similar rows.
+
+    Each split is the COLDIST quantile whose row count is nearest the
+    split's share of CARD. Without quantiles, numeric keys are split evenly
+    between LOW2KEY and HIGH2KEY. Returns None if neither is available.
+    """
+    card = statistics["card"]
+    quantiles = statistics["quantiles"]
+    if quantiles:
+        values = []
+        for i in range(1, ranges):
+            target = card * i / ranges
+            value, _ = min(quantiles, key=lambda q: abs(q[1] - target))
+            if value not in values:
+                values.append(value)
+        return values
+
+    low, high = statistics["low2key"], statistics["high2key"]
+    if (
+        sql_data_type in NUMERIC_TYPES
+        and isinstance(low, decimal.Decimal)
+        and isinstance(high, decimal.Decimal)
+        and high > low
+    ):
+        values = [low + (high - low) * i / ranges for i in range(1, ranges)]
+        if sql_data_type in INTEGER_TYPES:
+            values = sorted({int(v) for v in values})
+        return values
+
+    return None
+
+
+def skew_notes(statistics, ranges):
+    """Notes frequent values holding more rows than a whole range."""
+    range_rows = statistics["card"] / ranges
+    return [
+        f"value {value} alone has {count} rows, over the {range_rows:.0f} of a range"
+        for value, count in statistics["frequent"]
+        if count > range_rows
+    ]
+
+
+class KeySource:
+    """The key columns of a table up to max_pk_values, for split queries."""
+
+    def __init__(self, catalog_entry, key_properties, max_pk_values):
+        self.catalog_entry = catalog_entry
+        self.key_properties = key_properties
+        self.escaped_keys = [common.escape(k) for k in key_properties]
+        self.keys = ", ".join(self.escaped_keys)
+        self.table = "{}.{}".format(
+            common.escape(common.get_database_name(catalog_entry)),
+            common.escape(catalog_entry.table),
+        )
+        self.where = keyset_predicate(self.escaped_keys, "max_pk", "<", inclusive=True)
+        self.params = bind_values(
+            catalog_entry, ordered_key_values(key_properties, max_pk_values), "max_pk"
+        )
+
+    def execute(self, open_conn, sql, **params):
+        return open_conn.execute(text(sql).bindparams(**self.params, **params))
+
+
+def snap_to_keys(open_conn, source, values):
+    """Returns the last key at or before each leading key value.
+
+    Each is a single probe of the key index, so split values from the
+    statistics become exact key tuples without reading the table.
+    """
+    descending = ", ".join(k + " DESC" for k in source.escaped_keys)
+    sql = (
+        f"SELECT {source.keys} FROM {source.table} WHERE {source.where} "
+        f"AND {source.escaped_keys[0]} <= :split_value "
+        f"ORDER BY {descending} FETCH FIRST 1 ROWS ONLY"
+    )
+    keys = []
+    for value in values:
+        row = source.execute(open_conn, sql, split_value=value).fetchone()
+        if row is not None:
+            keys.append(tuple(row))
+    return keys
+
+
+def plan_from_statistics(open_conn, source, ranges, config):
+    """Plans from the catalog statistics, None if they are missing or stale."""
+    leading_key = source.key_properties[0]
+    statistics = table_statistics(open_conn, source.catalog_entry, leading_key)
+    max_age_hours = (
+        config.get("statistics_max_age_hours") or DEFAULT_STATISTICS_MAX_AGE_HOURS
+    )
+    problem = statistics_problem(statistics, max_age_hours)
+    if problem is not None:
+        LOGGER.info(f"Not splitting by statistics: {problem}")
+        return None
+
+    md_map = metadata.to_map(source.catalog_entry.metadata)
+    sql_data_type = md_map.get(("properties", leading_key), {}).get("sql-datatype")
+    values = split_values_from_statistics(statistics, ranges, sql_data_type)
+    if values is None:
+        LOGGER.info(
+            f"Not splitting by statistics: no quantiles for {leading_key}, "
+            "and it can't be interpolated between LOW2KEY and HIGH2KEY"
+        )
+        return None
+
+    return SplitPlan(
+        "statistics",
+        snap_to_keys(open_conn, source, values),
+        statistics["card"],
+        skew_notes(statistics, ranges),
+    )
+
+
+def plan_from_sample(open_conn, source, ranges, config):
+    """Plans from the keys in a TABLESAMPLE SYSTEM sample, None if it is empty."""
+    percent = config.get("split_sample_percent") or DEFAULT_SPLIT_SAMPLE_PERCENT
+    sql = (
+        f"SELECT {source.keys} FROM {source.table} "
+        f"TABLESAMPLE SYSTEM ({float(percent)}) REPEATABLE (1) "
+        f"WHERE {source.where}"
+    )
+    sample = sorted(tuple(row) for row in source.execute(open_conn, sql).fetchall())
+    if not sample:
+        LOGGER.info(f"Not splitting by sample: the {percent}% sample is empty")
+        return None
+
+    boundaries = [sample[len(sample) * i // ranges] for i in range(1, ranges)]
+    return SplitPlan("sample", boundaries, int(len(sample) * 100 / float(percent)))
+
+
+def plan_from_scan(open_conn, source, ranges, config):
+    """Plans from every n-th key in key order, read from the key index."""
+    row_count = source.execute(
+        open_conn, f"SELECT COUNT(*) FROM {source.table} WHERE {source.where}"
+    ).fetchone()[0]
+    step = -(-row_count // ranges)
+
+    boundaries = []
+    if ranges > 1 and step > 0:
+        sql = (
+            f"SELECT {source.keys} FROM (SELECT {source.keys}, ROW_NUMBER() OVER "
+            f'(ORDER BY {source.keys}) AS "ROW_NUM" FROM {source.table} '
+            f'WHERE {source.where}) AS "KEYS" '
+            f'WHERE MOD("ROW_NUM", {step}) = 0 ORDER BY {source.keys}'
+        )
+        boundaries = [tuple(row) for row in source.execute(open_conn, sql).fetchall()]
+    return SplitPlan("scan", boundaries, row_count)
+
+
+PLANNERS = {
+    "statistics": [plan_from_statistics, plan_from_sample, plan_from_scan],
+    "sample": [plan_from_sample, plan_from_scan],
+    "scan": [plan_from_scan],
+}
+
+
+def plan_splits(open_conn, catalog_entry, key_properties, max_pk_values, ranges, config):
+    """Chooses the keys splitting a table into ranges of about the same rows.
+
+    With split_planner "statistics" (the default) the splits come from the
+    catalog statistics, falling back to a TABLESAMPLE of the keys when they
+    are missing or stale and to a scan of the key index when the sample is
+    empty. "sample" starts with the sample and "scan" only scans.
+    """
+    source = KeySource(catalog_entry, key_properties, max_pk_values)
+    plan = SplitPlan("none", [], None)
+    if ranges > 1:
+        for planner in PLANNERS[split_planner(config)]:
+            plan = planner(open_conn, source, ranges, config)
+            if plan is not None:
+                break
+
+    # Splits are distinct and in key order; a snapped split may repeat
+    plan.boundaries = sorted(set(plan.boundaries))
+    return plan
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import datetime
+import decimal
+import uuid
+
+from singer import metadata
+
+from tap_db2.sync_strategies.server_render import rendered_columns
+from tap_db2.sync_strategies.temporal import (
+    DEFAULT_TEMPORAL_CACHE_SIZE,
+    TemporalFormatter,
+    date_format_function,
+    format_timestamp,
+    time_format_function,
+)
+
+BINARY_TYPES = {"binary", "varbinary"}
+
+TIMESTAMP_TYPES = {"timestamp"}
+
+DATE_TYPES = {"date"}
+
+TIME_TYPES = {"time"}
+
+PASSTHROUGH_TYPES = (int, str, float, decimal.Decimal)
+
+SINGER_DECIMAL_TYPES = (decimal.Decimal, float, int)
+
+
+def convert_value(elem, sql_data_type, property_format, use_date_data_type_format):
+    """Converts a single value to its Singer representation.
+
+    This is the general conversion chain, checking the Python type of the
+    value on every call. The specialised converters built by StreamPlan fall
+    back to it for any value they do not expect.
+    """
+    if isinstance(elem, datetime.datetime):
+        return elem.isoformat() + "+00:00"
+
+    elif isinstance(elem, datetime.date):
+        if use_date_data_type_format:
+            return elem.isoformat()
+        return elem.isoformat() + "T00:00:00+00:00"
+
+    elif isinstance(elem, datetime.time):
+        if property_format == "time":
+            return elem.isoformat()
+        return "1970-01-01T" + elem.isoformat() + "+00:00"
+
+    elif isinstance(elem, datetime.timedelta):
+        epoch = datetime.datetime.utcfromtimestamp(0)
+        timedelta_from_epoch = epoch + elem
+        return timedelta_from_epoch.isoformat() + "+00:00"
+
+    elif isinstance(elem, bytes):
+        if sql_data_type in BINARY_TYPES:
+            # Convert binary byte array to hex string
+            return f"0x{elem.hex().upper()}"
+        # for BIT value, treat 0 as False and anything else as True
+        return elem != b"\x00"
+
+    elif "boolean" in sql_data_type or sql_data_type == "boolean":
+        if elem is None:
+            return None
+        elif elem == 0:
+            return False
+        return True
+
+    elif isinstance(elem, uuid.UUID):
+        return str(elem)
+
+    elif property_format == "singer.decimal":
+        if elem is None:
+            return elem
+        return str(elem)
+
+    return elem
+
+
+def _generic_converter(sql_data_type, property_format, use_date_data_type_format):
+    def convert(elem):
+        return convert_value(
+            elem, sql_data_type, property_format, use_date_data_type_format
+        )
+
+    return convert
+
+
+def _binary_converter(fallback):
+    def convert(elem):
+        if elem is None:
+            return None
+        if type(elem) is bytes:
+            return f"0x{elem.hex().upper()}"
+        return fallback(elem)
+
+    return convert
+
+
+def _boolean_converter(fallback):
+    def convert(elem):
+        if elem is None:
+            return None
+        if type(elem) is bool or type(elem) is int:
+            return elem != 0
+        return fallback(elem)
+
+    return convert
+
+
+def _singer_decimal_converter(fallback):
+    def convert(elem):
+        if elem is None:
+            return None
+        if type(elem) in SINGER_DECIMAL_TYPES:
+            return str(elem)
+        return fallback(elem)
+
+    return convert
+
+
+def _rendered_converter(fallback):
+    # The database already returns the Singer string for rendered columns
+    def convert(elem):
+        if elem is None or type(elem) is str:
+            return elem
+        return fallback(elem)
+
+    return convert
+
+
+def _passthrough_converter(fallback):
+    def convert(elem):
+        if elem is None or type(elem) in PASSTHROUGH_TYPES:
+            return elem
+        return fallback(elem)
+
+    return convert
+
+
+def converter_kind(sql_data_type, property_format, rendered=False):
+    """Names the conversion a column gets, from its sql-datatype and format."""
+    sql_data_type = sql_data_type or ""
+
+    if rendered:
+        return "rendered"
+    elif "boolean" in sql_data_type:
+        return "boolean"
+    elif sql_data_type in BINARY_TYPES:
+        return "binary"
+    elif property_format == "singer.decimal":
+        return "singer.decimal"
+    elif sql_data_type in TIMESTAMP_TYPES:
+        return "timestamp"
+    elif sql_data_type in DATE_TYPES:
+        return "date"
+    elif sql_data_type in TIME_TYPES:
+        return "time"
+
+    return "passthrough"
+
+
+def build_converter(
+    sql_data_type,
+    property_format,
+    use_date_data_type_format,
+    column=None,
+    temporal_cache_size=DEFAULT_TEMPORAL_CACHE_SIZE,
+    rendered=False,
+):
+    """Returns a single-argument converter specialised for one column.
+
+    The choice of converter is made once from the column's sql-datatype and
+    schema format (see converter_kind). Each converter handles the Python
+    type the driver returns for that column directly and hands anything else
+    to convert_value, so the output is always identical to the general
+    conversion chain. DATE, TIME and TIMESTAMP columns get a
+    TemporalFormatter, which can also format a whole column slice with
+    format_batch. A column rendered as a string by the SELECT (see
+    server_render) only checks for the string.
+    """
+    kind = converter_kind(sql_data_type, property_format, rendered)
+    fallback = _generic_converter(
+        sql_data_type or "", property_format, use_date_data_type_format
+    )
+
+    if kind == "rendered":
+        return _rendered_converter(fallback)
+    elif kind == "boolean":
+        return _boolean_converter(fallback)
+    elif kind == "binary":
+        return _binary_converter(fallback)
+    elif kind == "singer.decimal":
+        return _singer_decimal_converter(fallback)
+    elif kind == "timestamp":
+        return TemporalFormatter(
+            column,
+            datetime.datetime,
+            format_timestamp,
+            fallback,
+            temporal_cache_size,
+        )
+    elif kind == "date":
+        return TemporalFormatter(
+            column,
+            datetime.date,
+            date_format_function(use_date_data_type_format),
+            fallback,
+            temporal_cache_size,
+        )
+    elif kind == "time":
+        return TemporalFormatter(
+            column,
+            datetime.time,
+            time_format_function(property_format),
+            fallback,
+            temporal_cache_size,
+        )
+
+    return _passthrough_converter(fallback)
+
+
+def _batch_converter(converter):
+    format_batch = getattr(converter, "format_batch", None)
+    if format_batch is not None:
+        return format_batch
+
+    def convert_batch(values):
+        return [converter(elem) for elem in values]
+
+    return convert_batch
+
+
+class StreamPlan:
+    """Per-stream conversion plan, built once before the first row is fetched.
+
+    Holds one converter per selected column, in the same order as the columns
+    of the SELECT, so rows are converted by position without any catalog
+    metadata lookups.
+    """
+
+    def __init__(self, catalog_entry, columns, config, sql_data_types=None):
+        use_date_data_type_format = bool(config.get("use_date_datatype"))
+        temporal_cache_size = config.get("temporal_cache_size")
+        if temporal_cache_size is None:
+            temporal_cache_size = DEFAULT_TEMPORAL_CACHE_SIZE
+        md_map = metadata.to_map(catalog_entry.metadata)
+        sql_data_types = sql_data_types or {}
+
+        self.columns = list(columns)
+        self.use_date_data_type_format = use_date_data_type_format
+        rendered = rendered_columns(catalog_entry, self.columns, config)
+        kinds = []
+        scales = []
+        converters = []
+        for column in self.columns:
+            sql_data_type = sql_data_types.get(column) or md_map.get(
+                ("properties", column), {}
+            ).get("sql-datatype")
+            property_schema = catalog_entry.schema.properties.get(column)
+            property_format = property_schema.format if property_schema else None
+            kinds.append(
+                converter_kind(sql_data_type, property_format, column in rendered)
+            )
+            scales.append(
+                md_map.get(("properties", column), {}).get("sql-datatype-scale")
+            )
+            converters.append(
+                build_converter(
+                    sql_data_type,
+                    property_format,
+                    use_date_data_type_format,
+                    column,
+                    temporal_cache_size,
+                    column in rendered,
+                )
+            )
+        self.kinds = tuple(kinds)
+        self.scales = tuple(scales)
+        self.converters = tuple(converters)
+        self.batch_converters = tuple(
+            _batch_converter(converter) for converter in converters
+        )
+
+    def convert_row(self, row):
+        return [convert(elem) for convert, elem in zip(self.converters, row)]
+
+    def convert_batch(self, rows):
+        """Converts a batch of rows column by column, returning row tuples."""
+        columns = [
+            convert(values)
+            for convert, values in zip(self.batch_converters, zip(*rows))
+        ]
+        return list(zip(*columns))
+
+    def to_record(self, row):
+        return dict(zip(self.columns, self.convert_row(row)))
+
+    def positions(self, names):
+        """Returns (column, index) pairs for the given columns, in SELECT order."""
+        return [
+            (column, idx) for idx, column in enumerate(self.columns) if column in names
+        ]
+
+    def convert_values(self, row, positions):
+        """Converts only the columns at the given positions into a dict."""
+        return {column: self.converters[idx](row[idx]) for column, idx in positions}
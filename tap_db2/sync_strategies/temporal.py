@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# pylint: disable=duplicate-code
+
+import datetime
+import functools
+
+import singer
+
+LOGGER = singer.get_logger()
+
+# Distinct values remembered per column
+DEFAULT_TEMPORAL_CACHE_SIZE = 4096
+# Lookups after which a column's cache is kept only if it is paying off
+CACHE_SAMPLE_SIZE = 10000
+MIN_CACHE_HIT_RATIO = 0.5
+
+EPOCH_DATE_PREFIX = "1970-01-01T"
+
+
+def format_timestamp(value):
+    return value.isoformat() + "+00:00"
+
+
+def date_format_function(use_date_data_type_format):
+    """Returns the DATE formatter for the date or date-time schema format."""
+    if use_date_data_type_format:
+        return datetime.date.isoformat
+
+    def format_date(value):
+        return value.isoformat() + "T00:00:00+00:00"
+
+    return format_date
+
+
+def time_format_function(property_format):
+    """Returns the TIME formatter for the column's schema format.
+
+    schema_for_column declares TIME columns as "time" with use_date_datatype
+    and as "date-time" otherwise, in which case the time is given on the
+    epoch date like the timedelta values of other drivers.
+    """
+    if property_format == "time":
+        return datetime.time.isoformat
+
+    def format_time(value):
+        return EPOCH_DATE_PREFIX + value.isoformat() + "+00:00"
+
+    return format_time
+
+
+class TemporalFormatter:
+    """Formats the values of one DATE, TIME or TIMESTAMP column.
+
+    Formatted strings are kept in a bounded LRU cache, so a column with few
+    distinct values (a DATE in a fact table, say) pays for isoformat once per
+    value rather than once per row. Once CACHE_SAMPLE_SIZE values have gone
+    through format_batch, the cache is dropped for the rest of the stream if
+    fewer than MIN_CACHE_HIT_RATIO of them were hits, as happens with
+    high-cardinality timestamps.
+
+    Values that are not of value_type, other than None, go to fallback.
+    """
+
+    def __init__(
+        self,
+        column,
+        value_type,
+        format_value,
+        fallback,
+        cache_size=DEFAULT_TEMPORAL_CACHE_SIZE,
+    ):
+        self.column = column
+        self.value_type = value_type
+        self.format_value = format_value
+        self.fallback = fallback
+        self.cached = None
+        self.format = format_value
+        if cache_size:
+            self.cached = functools.lru_cache(maxsize=cache_size)(format_value)
+            self.format = self.cached
+
+    def __call__(self, elem):
+        if elem is None:
+            return None
+        if type(elem) is self.value_type:
+            return self.format(elem)
+        return self.fallback(elem)
+
+    def format_batch(self, values):
+        """Formats a column slice, returning a list in the same order."""
+        value_type = self.value_type
+        format_value = self.format
+        fallback = self.fallback
+        formatted = [
+            None
+            if elem is None
+            else format_value(elem)
+            if type(elem) is value_type
+            else fallback(elem)
+            for elem in values
+        ]
+        if self.format is self.cached:
+            self._review_cache()
+        return formatted
+
+    def _review_cache(self):
+        hits, misses, _, _ = self.cached.cache_info()
+        lookups = hits + misses
+        if lookups < CACHE_SAMPLE_SIZE or hits >= lookups * MIN_CACHE_HIT_RATIO:
+            return
+
+        LOGGER.info(
+            f"Formatting {self.column} without a cache, "
+            f"{hits} of {lookups} values were repeats"
+        )
+        self.format = self.format_value
+        self.cached.cache_clear()
+        self.cached = None
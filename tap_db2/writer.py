@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+import io
+import mmap
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+import singer
+
+LOGGER = singer.get_logger()
+
+# 1 MiB / 1 second keeps the downstream target fed without a syscall per row
+DEFAULT_OUTPUT_BUFFER_BYTES = 1024 * 1024
+DEFAULT_OUTPUT_FLUSH_SECONDS = 1.0
+# Number of filled buffers the writer thread may fall behind by
+WRITER_THREAD_QUEUE_SIZE = 8
+
+# Most bytes the writer thread takes from the spool at a time
+SPOOL_READ_BYTES = 1024 * 1024
+
+_STOP = object()
+
+
+def encode_message(message):
+    """Returns the bytes singer.write_message would print for message."""
+    return (singer.format_message(message) + "\n").encode("utf-8")
+
+
+class SpoolRing:
+    """A bounded FIFO of bytes in a memory-mapped temporary file.
+
+    The file is a tempfile.TemporaryFile, which has no name on POSIX and is
+    deleted on close on Windows, so nothing is left behind when the tap
+    exits, however it exits. put blocks while the ring is full; get returns
+    the oldest bytes, b"" if none arrived within the timeout, and None once
+    the ring is closed and empty.
+    """
+
+    def __init__(self, capacity, directory=None):
+        self.capacity = capacity
+        self._file = tempfile.TemporaryFile(prefix="tap-db2-spool-", dir=directory)
+        self._file.truncate(capacity)
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+        # Total bytes ever read and written; their difference is the fill
+        self._read = 0
+        self._written = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put(self, data, check=None):
+        """Copies data into the ring, calling check while waiting for room."""
+        view = memoryview(data)
+        while view:
+            with self._cond:
+                while self._written - self._read == self.capacity:
+                    self._cond.wait(timeout=1)
+                    if check is not None:
+                        check()
+                size = min(len(view), self.capacity - (self._written - self._read))
+                self._copy_in(view[:size])
+                self._written += size
+                self._cond.notify_all()
+            view = view[size:]
+
+    def _copy_in(self, view):
+        start = self._written % self.capacity
+        first = min(len(view), self.capacity - start)
+        self._map[start:start + first] = view[:first]
+        self._map[:len(view) - first] = view[first:]
+
+    def get(self, timeout=None):
+        with self._cond:
+            if self._written == self._read and not self._closed:
+                self._cond.wait(timeout=timeout)
+            if self._written == self._read:
+                return None if self._closed else b""
+            start = self._read % self.capacity
+            size = min(
+                self._written - self._read, self.capacity - start, SPOOL_READ_BYTES
+            )
+            data = self._map[start:start + size]
+            self._read += size
+            self._cond.notify_all()
+            return data
+
+    def empty(self):
+        with self._cond:
+            return self._written == self._read
+
+    def close(self):
+        """Lets get return None once the remaining bytes have been read."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def release(self):
+        self._map.close()
+        self._file.close()
+
+
+class MessageWriter:
+    """Buffers encoded Singer messages and writes them to stdout in blocks.
+
+    Messages are gathered until buffer_bytes have accumulated or
+    flush_seconds have passed since the last flush, and every STATE message
+    flushes the buffer so a target never sees a STATE before the records it
+    covers. With use_thread the blocks are written by a dedicated thread, so
+    fetching and converting rows carries on while the downstream pipe is busy.
+
+    With spool_bytes the blocks go through a SpoolRing of that size on disk
+    instead of an in-memory queue, so the tap can read a table well ahead of
+    a slow target, and finish and close its cursor, while the writer thread
+    feeds the target from the spool. The spool is a byte stream in the
+    order messages were written, so STATE messages still follow the records
+    they cover.
+
+    A buffer_bytes of 0 writes and flushes every message, as
+    singer.write_message does.
+    """
+
+    def __init__(
+        self,
+        output=None,
+        buffer_bytes=DEFAULT_OUTPUT_BUFFER_BYTES,
+        flush_seconds=DEFAULT_OUTPUT_FLUSH_SECONDS,
+        use_thread=False,
+        spool_bytes=None,
+        spool_dir=None,
+    ):
+        self.output = output
+        self.buffer_bytes = buffer_bytes
+        self.flush_seconds = flush_seconds
+        self._pending = []
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
+        # _lock guards the pending buffer and is shared with the writer
+        # thread; _producer_lock keeps blocks in order while one is handed
+        # off, which may block, without holding _lock
+        self._lock = threading.Lock()
+        self._producer_lock = threading.Lock()
+        self._dispatching = False
+        self._thread = None
+        self._queue = None
+        self._thread_error = None
+        self._spool = None
+
+        if spool_bytes:
+            self._spool = SpoolRing(spool_bytes, spool_dir)
+            self._thread = threading.Thread(
+                target=self._run_spool_thread,
+                name="tap-db2-spool-writer",
+                daemon=True,
+            )
+            self._thread.start()
+        elif use_thread:
+            self._queue = queue.Queue(maxsize=WRITER_THREAD_QUEUE_SIZE)
+            self._thread = threading.Thread(
+                target=self._run_writer_thread, name="tap-db2-writer", daemon=True
+            )
+            self._thread.start()
+
+    @property
+    def has_thread(self):
+        """Whether blocks are written by a writer thread."""
+        return self._thread is not None
+
+    @property
+    def spool_capacity(self):
+        """Size in bytes of the spool on disk, or None without one."""
+        return None if self._spool is None else self._spool.capacity
+
+    def _output(self):
+        # Resolved on every write so that a replaced sys.stdout is honoured
+        output = self.output or sys.stdout
+        return getattr(output, "buffer", output)
+
+    def _write_block(self, block):
+        output = self._output()
+        if isinstance(output, io.TextIOBase):
+            output.write(block.decode("utf-8"))
+        else:
+            output.write(block)
+        output.flush()
+
+    def _run_writer_thread(self):
+        while True:
+            try:
+                block = self._queue.get(timeout=self.flush_seconds or None)
+            except queue.Empty:
+                block = self._take_pending_if_idle()
+                if not block:
+                    continue
+            if block is _STOP:
+                return
+            try:
+                self._write_block(block)
+            except Exception as exc:  # pylint: disable=broad-except
+                # Surfaced to the producing thread on its next write
+                self._thread_error = exc
+                return
+
+    def _run_spool_thread(self):
+        while True:
+            block = self._spool.get(timeout=self.flush_seconds or None)
+            if block is None:
+                return
+            if not block:
+                block = self._take_pending_if_idle()
+                if not block:
+                    continue
+            try:
+                self._write_block(block)
+            except Exception as exc:  # pylint: disable=broad-except
+                self._thread_error = exc
+                return
+
+    def _check_thread(self):
+        if self._thread_error is not None:
+            raise self._thread_error
+
+    def _dispatch(self, block):
+        if self._spool is not None:
+            self._check_thread()
+            if block is _STOP:
+                self._spool.close()
+            else:
+                self._spool.put(block, self._check_thread)
+            return
+        if self._queue is None:
+            self._write_block(block)
+            return
+        while True:
+            # A full queue is waited on in steps so a failed writer thread
+            # raises here instead of blocking forever
+            self._check_thread()
+            try:
+                self._queue.put(block, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _take_pending(self):
+        block = b"".join(self._pending)
+        self._pending = []
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
+        return block
+
+    def _take_pending_if_idle(self):
+        # Called by the writer thread when nothing has been dispatched for
+        # flush_seconds, so slow streams still reach the target. Pending data
+        # is only taken while the queue is empty, keeping blocks in order.
+        pipeline = self._spool or self._queue
+        with self._lock:
+            if self._pending and not self._dispatching and pipeline.empty():
+                return self._take_pending()
+        return None
+
+    def _hand_off(self, block):
+        # Called holding _producer_lock; the blocking dispatch happens outside
+        # _lock so the writer thread can still take idle data meanwhile
+        try:
+            self._dispatch(block)
+        finally:
+            with self._lock:
+                self._dispatching = False
+
+    def write_bytes(self, data, flush=False):
+        """Queues one encoded message (ending in a newline) for output."""
+        with self._producer_lock:
+            with self._lock:
+                self._pending.append(data)
+                self._pending_bytes += len(data)
+                if not (
+                    flush
+                    or self._pending_bytes >= self.buffer_bytes
+                    or time.monotonic() - self._last_flush >= self.flush_seconds
+                ):
+                    return
+                block = self._take_pending()
+                self._dispatching = True
+            self._hand_off(block)
+
+    def write_message(self, message):
+        """Formats a Singer message as singer.write_message would and queues it."""
+        self.write_bytes(
+            encode_message(message), flush=isinstance(message, singer.StateMessage)
+        )
+
+    def flush(self):
+        with self._producer_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                block = self._take_pending()
+                self._dispatching = True
+            self._hand_off(block)
+
+    def close(self):
+        """Flushes anything pending and waits for the writer thread to finish."""
+        self.flush()
+        if self._thread is not None:
+            self._dispatch(_STOP)
+            self._thread.join()
+            self._thread = None
+            if self._spool is not None:
+                self._spool.release()
+                self._spool = None
+            self._check_thread()
+
+
+def from_config(config):
+    """Builds the MessageWriter a sync writes its messages through."""
+    buffer_bytes = config.get("output_buffer_bytes")
+    flush_seconds = config.get("output_flush_seconds")
+    message_writer = MessageWriter(
+        buffer_bytes=(
+            DEFAULT_OUTPUT_BUFFER_BYTES if buffer_bytes is None else buffer_bytes
+        ),
+        flush_seconds=(
+            DEFAULT_OUTPUT_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        ),
+        use_thread=bool(config.get("output_writer_thread")),
+        spool_bytes=config.get("output_spool_bytes"),
+        spool_dir=config.get("output_spool_dir"),
+    )
+    on_thread = " on a writer thread" if message_writer.has_thread else ""
+    LOGGER.info(
+        f"Output buffer: {message_writer.buffer_bytes} bytes, flushed every "
+        f"{message_writer.flush_seconds} seconds{on_thread}"
+    )
+    if message_writer.spool_capacity is not None:
+        LOGGER.info(
+            f"Spooling output through {message_writer.spool_capacity} bytes on disk"
+        )
+    return message_writer
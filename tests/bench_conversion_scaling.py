@@ -0,0 +1,123 @@
+"""Measures how record conversion scales with serialization workers.
+
+Encodes synthetic batches through SerializationPool with 1, 2, 4, ... workers
+and prints rows per second and the speedup over one worker, e.g.
+
+    python tests/bench_conversion_scaling.py --mode thread --max-workers 8
+
+Thread mode only scales on a free-threaded (no GIL) Python build; the GIL
+status of the running interpreter is printed first.
+"""
+import argparse
+import datetime
+import decimal
+import sys
+import time
+
+from singer import metadata
+from singer.catalog import CatalogEntry
+from singer.schema import Schema
+
+from tap_db2.sync_strategies.serialization_pool import (
+    SERIALIZATION_MODES,
+    SerializationPool,
+)
+
+# (column, sql-datatype, schema format)
+COLUMNS = [
+    ("ID", "bigint", None),
+    ("NAME", "varchar", None),
+    ("AMOUNT", "decimal", "singer.decimal"),
+    ("CREATED", "timestamp", "date-time"),
+    ("BOOKED", "date", "date-time"),
+    ("FLAG", "boolean", None),
+]
+
+START = datetime.datetime(2023, 1, 1)
+
+
+def make_catalog_entry():
+    mdata = {}
+    for column, sql_data_type, _ in COLUMNS:
+        mdata = metadata.write(
+            mdata, ("properties", column), "sql-datatype", sql_data_type
+        )
+    return CatalogEntry(
+        tap_stream_id="BENCH-TABLE",
+        stream="TABLE",
+        table="TABLE",
+        schema=Schema(
+            type="object",
+            properties={
+                column: Schema(type=["null", "string"], format=property_format)
+                for column, _, property_format in COLUMNS
+            },
+        ),
+        metadata=metadata.to_list(mdata),
+    )
+
+
+def make_batches(rows, batch_size):
+    data = [
+        (
+            n,
+            f"name {n}",
+            decimal.Decimal(n).scaleb(-2),
+            START + datetime.timedelta(seconds=n),
+            START.date() + datetime.timedelta(days=n % 365),
+            n % 2 == 0,
+        )
+        for n in range(rows)
+    ]
+    return [data[i:i + batch_size] for i in range(0, rows, batch_size)]
+
+
+def time_workers(workers, mode, batches, config):
+    with SerializationPool(
+        workers,
+        make_catalog_entry(),
+        [c[0] for c in COLUMNS],
+        config,
+        "TABLE",
+        1,
+        None,
+        {"ID"},
+        mode,
+    ) as pool:
+        # Let every worker build its encoder before timing
+        list(pool.encode(batches[:workers]))
+        start = time.perf_counter()
+        for _ in pool.encode(batches):
+            pass
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=sorted(SERIALIZATION_MODES), default="thread")
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--arrow-batches", action="store_true")
+    args = parser.parse_args()
+
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"python {sys.version.split()[0]} gil_enabled={gil_enabled}")
+
+    batches = make_batches(args.rows, args.batch_size)
+    config = {"arrow_batches": args.arrow_batches}
+
+    workers = 1
+    baseline = None
+    while workers <= args.max_workers:
+        elapsed = time_workers(workers, args.mode, batches, config)
+        baseline = baseline or elapsed
+        print(
+            f"{args.mode:<8} workers={workers:<3} seconds={elapsed:.3f} "
+            f"rows/s={args.rows / elapsed:,.0f} speedup={baseline / elapsed:.2f}"
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compares fetch throughput of the sqlalchemy and ibm_db fetch backends.
+
+Runs the same query on both backends and reports rows per second, e.g.
+
+    python tests/bench_fetch_backends.py -c config.json \\
+        --query 'SELECT * FROM "SCHEMA"."TABLE"' --arraysize 10000 --repeat 3
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import text
+
+from tap_db2.connection import FETCH_BACKENDS, ResultIterator, get_db2_engine
+
+
+def time_backend(config, backend, query, arraysize):
+    engine = get_db2_engine(dict(config, fetch_backend=backend))
+    with engine.connect() as open_conn:
+        start = time.perf_counter()
+        results = open_conn.execute(text(query))
+        rows = 0
+        for _ in ResultIterator(results, arraysize):
+            rows += 1
+        elapsed = time.perf_counter() - start
+    return rows, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-c", "--config", required=True)
+    parser.add_argument("--query", required=True)
+    parser.add_argument("--arraysize", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.config) as config_file:
+        config = json.load(config_file)
+
+    for backend in sorted(FETCH_BACKENDS):
+        for attempt in range(args.repeat):
+            rows, elapsed = time_backend(config, backend, args.query, args.arraysize)
+            print(
+                f"{backend:<10} run={attempt + 1} rows={rows} "
+                f"seconds={elapsed:.3f} rows/s={rows / elapsed:,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Fake catalog entries, engines and connections shared by the tests."""
+
+import abc
+
+from singer import metadata
+from singer.catalog import CatalogEntry
+from singer.schema import Schema
+
+INTEGER_DATATYPES = {"smallint", "integer", "bigint"}
+
+
+def make_catalog_entry(sql_datatypes=None, properties=None, table="TABLE", **md):
+    """Returns the catalog entry of SCHEMA.table.
+
+    sql_datatypes maps each column to its "sql-datatype" metadata; their
+    schemas are nullable integers or strings unless properties gives them.
+    Other keyword arguments are written as stream metadata, with the
+    underscores in their names replaced by dashes.
+    """
+    sql_datatypes = sql_datatypes or {}
+    mdata = metadata.write({}, (), "database-name", "SCHEMA")
+    for key, value in md.items():
+        mdata = metadata.write(mdata, (), key.replace("_", "-"), value)
+    for column, sql_datatype in sql_datatypes.items():
+        mdata = metadata.write(
+            mdata, ("properties", column), "sql-datatype", sql_datatype
+        )
+    if properties is None:
+        properties = {
+            column: Schema(
+                type=[
+                    "null",
+                    "integer" if sql_datatype in INTEGER_DATATYPES else "string",
+                ]
+            )
+            for column, sql_datatype in sql_datatypes.items()
+        }
+    return CatalogEntry(
+        tap_stream_id=f"SCHEMA-{table}",
+        stream=table,
+        table=table,
+        schema=Schema(type="object", properties=properties),
+        metadata=metadata.to_list(mdata),
+    )
+
+
+class FakeResults:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+class FakeConnection:
+    """Has each statement answered by its engine, recording its SQL there."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __enter__(self):
+        self.engine.connections += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def execute(self, statement):
+        sql = statement.text
+        self.engine.statements.append(sql)
+        return self.engine.answer(sql, statement.compile().params)
+
+
+class FakeEngine(abc.ABC):
+    """Stands in for a SQLAlchemy engine over the rows of one table."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statements = []
+        self.connections = 0
+
+    def connect(self):
+        return FakeConnection(self)
+
+    @abc.abstractmethod
+    def answer(self, sql, params):
+        """Returns the FakeResults of a statement with its bound params."""
@@ -0,0 +1,132 @@
+import datetime
+import decimal
+import unittest
+
+import singer
+from singer import metadata
+from singer.catalog import CatalogEntry
+from singer.schema import Schema
+
+from tap_db2.sync_strategies.arrow_encoder import ArrowRecordEncoder, arrow_available
+from tap_db2.sync_strategies.record_encoder import RecordEncoder
+from tap_db2.sync_strategies.stream_plan import StreamPlan
+
+# (column, sql-datatype, schema format, scale)
+COLUMNS = [
+    ("ID", "bigint", None, 0),
+    ("NAME", "varchar", None, None),
+    ("AMOUNT", "decimal", "singer.decimal", 2),
+    ("PRICE", "decimal", None, 2),
+    ("RATE", "decimal", "singer.decimal", 10),
+    ("CREATED", "timestamp", "date-time", None),
+    ("BOOKED", "date", "date-time", None),
+    ("AT", "time", "date-time", None),
+    ("FLAG", "boolean", None, None),
+    ("DATA", "varbinary", None, None),
+    ("RATIO", "double", None, None),
+]
+
+START = datetime.datetime(2023, 1, 2, 3, 4, 5)
+
+
+def make_row(n):
+    return (
+        n,
+        f"name \"{n}\" é",
+        decimal.Decimal(n).scaleb(-2).quantize(decimal.Decimal("0.01")),
+        decimal.Decimal(-n).scaleb(-2).quantize(decimal.Decimal("0.01")),
+        decimal.Decimal(n).scaleb(-10).quantize(decimal.Decimal("1E-10")),
+        START + datetime.timedelta(seconds=n, microseconds=n % 3),
+        START.date() + datetime.timedelta(days=n % 7),
+        datetime.time(n % 24, n % 60),
+        n % 2 == 0,
+        bytes([n % 256, 0]),
+        n / 3,
+    )
+
+
+def make_catalog_entry():
+    mdata = {}
+    for column, sql_data_type, _, scale in COLUMNS:
+        mdata = metadata.write(
+            mdata, ("properties", column), "sql-datatype", sql_data_type
+        )
+        if scale is not None:
+            mdata = metadata.write(
+                mdata, ("properties", column), "sql-datatype-scale", scale
+            )
+    return CatalogEntry(
+        tap_stream_id="SCHEMA-TABLE",
+        stream="TABLE",
+        table="TABLE",
+        schema=Schema(
+            type="object",
+            properties={
+                column: Schema(type=["null", "string"], format=property_format)
+                for column, _, property_format, _ in COLUMNS
+            },
+        ),
+        metadata=metadata.to_list(mdata),
+    )
+
+
+@unittest.skipUnless(arrow_available(), "pyarrow is not installed")
+class TestArrowRecordEncoder(unittest.TestCase):
+    def assert_matches_record_encoder(self, rows, config=None):
+        columns = [c[0] for c in COLUMNS]
+        time_extracted = singer.utils.now()
+        plan = StreamPlan(make_catalog_entry(), columns, config or {})
+        expected = RecordEncoder(plan, "TABLE", 1, time_extracted).encode_batch(rows)
+
+        plan = StreamPlan(make_catalog_entry(), columns, config or {})
+        actual = ArrowRecordEncoder(plan, "TABLE", 1, time_extracted).encode_batch(
+            rows
+        )
+        self.assertEqual(actual, expected)
+
+    def test_typed_columns(self):
+        self.assert_matches_record_encoder([make_row(n) for n in range(500)])
+
+    def test_date_datatype(self):
+        self.assert_matches_record_encoder(
+            [make_row(n) for n in range(50)], {"use_date_datatype": True}
+        )
+
+    def test_nulls(self):
+        rows = [make_row(n) for n in range(10)]
+        rows.append((None,) * len(COLUMNS))
+        self.assert_matches_record_encoder(rows)
+        self.assert_matches_record_encoder([(None,) * len(COLUMNS)] * 3)
+
+    def test_values_falling_back_to_the_plan(self):
+        rows = [make_row(n) for n in range(10)]
+        rows[3] = (
+            2**70,
+            None,
+            5,
+            decimal.Decimal("0.0000001"),
+            1.5,
+            "2023-01-02T03:04:05+00:00",
+            datetime.datetime(2023, 1, 2, 3, 4, 5),
+            None,
+            1,
+            None,
+            0.1,
+        )
+        self.assert_matches_record_encoder(rows)
+
+    def test_decimals_below_the_column_scale(self):
+        rows = [make_row(n) for n in range(10)]
+        for idx, (amount, price) in enumerate(
+            [
+                (decimal.Decimal("12.5"), decimal.Decimal("1E+2")),
+                (decimal.Decimal("7"), decimal.Decimal("-0.00")),
+                (decimal.Decimal("0.1"), decimal.Decimal("3.0")),
+            ]
+        ):
+            rows[idx] = rows[idx][:2] + (amount, price) + rows[idx][4:]
+        self.assert_matches_record_encoder(rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
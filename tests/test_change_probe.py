@@ -0,0 +1,124 @@
+import datetime
+import unittest
+
+from tap_db2.sync_strategies.change_probe import (
+    bookmark_signature,
+    bookmark_skipped_run,
+    probe_streams,
+    should_skip,
+    table_change_signatures,
+)
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class ProbeEngine(FakeEngine):
+    def __init__(self, rows, error=None):
+        super().__init__(rows)
+        self.error = error
+        self.params = []
+
+    def answer(self, sql, params):
+        if self.error is not None:
+            raise self.error
+        self.params.append(params)
+        return FakeResults(self.rows)
+
+
+def make_stream(table, is_view=False):
+    return make_catalog_entry(
+        table=table, is_view=is_view, full_table_skip_unchanged=True
+    )
+
+
+SIGNATURE = {
+    "alter_time": "2024-01-01T00:00:00",
+    "stats_time": None,
+    "rows_inserted": 10,
+    "rows_updated": 0,
+    "rows_deleted": 0,
+    "db_conn_time": "2024-02-01T00:00:00",
+}
+
+
+def synced_state(signature, runs_skipped=0):
+    return {
+        "bookmarks": {
+            "SCHEMA-A": {
+                "initial_full_table_complete": True,
+                "change_probe": {"signature": signature, "runs_skipped": runs_skipped},
+            }
+        }
+    }
+
+
+class TestChangeProbe(unittest.TestCase):
+    def test_signatures_in_one_query(self):
+        engine = ProbeEngine(
+            [
+                (
+                    "SCHEMA",
+                    "A",
+                    datetime.datetime(2024, 1, 1),
+                    None,
+                    10,
+                    0,
+                    0,
+                    datetime.datetime(2024, 2, 1),
+                ),
+                ("SCHEMA", "B", datetime.datetime(2024, 1, 1), None)
+                + (None,) * 4,
+            ]
+        )
+        signatures = table_change_signatures(
+            engine.connect(), [make_stream("A"), make_stream("B")]
+        )
+
+        self.assertEqual(len(engine.statements), 1)
+        self.assertEqual(signatures["SCHEMA-A"], SIGNATURE)
+        self.assertIsNone(signatures["SCHEMA-B"]["rows_inserted"])
+        self.assertEqual(engine.params[0]["table_name_1"], "B")
+
+    def test_views_are_not_probed(self):
+        engine = ProbeEngine([])
+        self.assertEqual(probe_streams(engine, [make_stream("V", True)], {}), {})
+        self.assertEqual(engine.statements, [])
+
+    def test_failed_probe_syncs_everything(self):
+        engine = ProbeEngine([], error=RuntimeError("SQL0551N"))
+        self.assertEqual(probe_streams(engine, [make_stream("A")], {}), {})
+
+    def test_should_skip(self):
+        entry = make_stream("A")
+        self.assertTrue(should_skip(entry, synced_state(SIGNATURE), SIGNATURE, {}))
+        self.assertFalse(
+            should_skip(
+                entry, synced_state(SIGNATURE), dict(SIGNATURE, rows_updated=1), {}
+            )
+        )
+        self.assertFalse(should_skip(entry, synced_state(SIGNATURE), None, {}))
+
+        # An interrupted sync is always resumed
+        state = synced_state(SIGNATURE)
+        state["bookmarks"]["SCHEMA-A"]["version"] = 1
+        self.assertFalse(should_skip(entry, state, SIGNATURE, {}))
+
+    def test_refresh_every_runs(self):
+        entry = make_stream("A")
+        config = {"full_table_refresh_every_runs": 3}
+        state = synced_state(SIGNATURE)
+
+        self.assertTrue(should_skip(entry, state, SIGNATURE, config))
+        bookmark_skipped_run(state, entry)
+        self.assertTrue(should_skip(entry, state, SIGNATURE, config))
+        bookmark_skipped_run(state, entry)
+        self.assertFalse(should_skip(entry, state, SIGNATURE, config))
+
+        bookmark_signature(state, entry, SIGNATURE)
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-A"]["change_probe"]["runs_skipped"], 0
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import io
+import json
+import unittest
+from unittest import mock
+
+import tap_db2.sync_strategies.common as common
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.checkpoint import CheckpointPolicy, state_snapshot
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class RowsEngine(FakeEngine):
+    def answer(self, sql, params):
+        return FakeResults(self.rows)
+
+
+def make_stream():
+    return make_catalog_entry(
+        {"ID": "integer"},
+        table_key_properties=["ID"],
+        replication_method="FULL_TABLE",
+    )
+
+
+class TestCheckpointPolicy(unittest.TestCase):
+    def test_rows(self):
+        policy = CheckpointPolicy(rows=100)
+        self.assertFalse(policy.due(60, 0))
+        self.assertTrue(policy.due(60, 0))
+        self.assertFalse(policy.due(60, 0))
+
+    def test_bytes(self):
+        policy = CheckpointPolicy(rows=None, bytes=1000)
+        self.assertFalse(policy.due(1, 999))
+        self.assertTrue(policy.due(1, 1))
+
+    def test_seconds(self):
+        policy = CheckpointPolicy(rows=None, seconds=30)
+        with mock.patch("time.monotonic", return_value=policy.last_checkpoint + 31):
+            self.assertTrue(policy.due(1, 1))
+
+
+class TestStateSnapshot(unittest.TestCase):
+    def test_copies_stream_being_synced(self):
+        state = {
+            "currently_syncing": "A",
+            "bookmarks": {"A": {"last_pk_fetched": {"ID": 1}}, "B": {"version": 1}},
+        }
+        snapshot = state_snapshot(state, "A")
+
+        state["currently_syncing"] = None
+        state["bookmarks"]["A"]["last_pk_fetched"] = {"ID": 2}
+        state["bookmarks"]["C"] = {}
+
+        self.assertEqual(
+            snapshot,
+            {
+                "currently_syncing": "A",
+                "bookmarks": {
+                    "A": {"last_pk_fetched": {"ID": 1}},
+                    "B": {"version": 1},
+                },
+            },
+        )
+
+
+class TestSyncQueryCheckpoints(unittest.TestCase):
+    def sync(self, config, rows):
+        output = io.BytesIO()
+        state = {"bookmarks": {"SCHEMA-TABLE": {"max_pk_values": {"ID": 10**6}}}}
+        message_writer = writer.MessageWriter(output, buffer_bytes=0)
+        common.sync_query(
+            RowsEngine(rows).connect(),
+            make_stream(),
+            state,
+            'SELECT "ID" FROM "SCHEMA"."TABLE"',
+            ["ID"],
+            1,
+            "TABLE",
+            {},
+            config,
+            message_writer,
+        )
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_state_after_each_checkpoint(self):
+        messages = self.sync(
+            {"cursor_array_size": 100, "checkpoint_rows": 250},
+            [(n,) for n in range(1000)],
+        )
+
+        self.assertEqual(
+            [m["record"]["ID"] for m in messages if m["type"] == "RECORD"],
+            list(range(1000)),
+        )
+        # Checked per batch of 100, after the batch crossing every 250 rows
+        self.assertEqual(
+            [
+                m["value"]["bookmarks"]["SCHEMA-TABLE"]["last_pk_fetched"]["ID"]
+                for m in messages
+                if m["type"] == "STATE"
+            ],
+            [299, 599, 899, 999],
+        )
+        self.assertEqual(messages[-1]["type"], "STATE")
+
+    def test_legacy_record_messages(self):
+        fast = self.sync({"cursor_array_size": 7}, [(n,) for n in range(20)])
+        legacy = self.sync(
+            {"cursor_array_size": 7, "fast_record_encoder": False},
+            [(n,) for n in range(20)],
+        )
+        self.assertEqual(
+            [m["record"] for m in fast if m["type"] == "RECORD"],
+            [m["record"] for m in legacy if m["type"] == "RECORD"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import io
+import json
+import re
+import unittest
+
+from singer.schema import Schema
+
+import tap_db2.sync_strategies.full_table as full_table
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.checksum_chunks import row_hash_expression
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class ChecksumEngine(FakeEngine):
+    """Answers the chunk queries over {ID: VALUE} rows, hashing rows in Python."""
+
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = dict(rows)
+
+    def answer(self, sql, params):
+        rows = sorted(self.rows.items())
+        if "max_pk_0" in params:
+            rows = [row for row in rows if row[0] <= params["max_pk_0"]]
+        if "last_pk_0" in params:
+            rows = [row for row in rows if row[0] > params["last_pk_0"]]
+
+        if "DESC" in sql:
+            return FakeResults([(row[0],) for row in rows[-1:]])
+        if "SUM(DECIMAL(" in sql:
+            checksum = sum(hash(row) for row in rows) if rows else None
+            return FakeResults([(len(rows), checksum)])
+        if "OFFSET" in sql:
+            offset = int(re.search(r"OFFSET (\d+) ROWS", sql).group(1))
+            return FakeResults([(row[0],) for row in rows[offset:offset + 1]])
+        return FakeResults(rows)
+
+
+def make_stream():
+    return make_catalog_entry(
+        {"ID": "integer", "VALUE": "varchar", "DOC": "xml"},
+        properties={
+            "ID": Schema(type=["null", "integer"]),
+            "VALUE": Schema(type=["null", "string"]),
+        },
+        table_key_properties=["ID"],
+        replication_method="FULL_TABLE",
+        full_table_checksums=True,
+    )
+
+
+class TestChecksumChunks(unittest.TestCase):
+    def sync(self, engine, state, stream_version, config=None):
+        output = io.BytesIO()
+        message_writer = writer.MessageWriter(output, buffer_bytes=0)
+        full_table.sync_table(
+            engine,
+            config or {"full_table_chunk_size": 10},
+            make_stream(),
+            state,
+            ["ID", "VALUE"],
+            stream_version,
+            message_writer,
+        )
+        # As do_sync_full_table leaves it
+        bookmark = state["bookmarks"]["SCHEMA-TABLE"]
+        bookmark.pop("version", None)
+        bookmark["initial_full_table_complete"] = True
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def records(self, messages):
+        return [m for m in messages if m["type"] == "RECORD"]
+
+    def test_row_hash_expression(self):
+        expression = row_hash_expression(make_stream(), ["ID", "DOC"])
+        self.assertEqual(
+            expression, """HASH8(COALESCE(VARCHAR(HASH8(VARCHAR("ID"))), 'N'))"""
+        )
+
+    def test_only_changed_chunks_are_written_again(self):
+        engine = ChecksumEngine({n: f"v{n}" for n in range(1, 101)})
+        state = {}
+        messages = self.sync(engine, state, 1)
+        self.assertEqual(len(self.records(messages)), 100)
+        chunks = state["bookmarks"]["SCHEMA-TABLE"]["chunk_checksums"]["chunks"]
+        self.assertEqual([c["upper"]["ID"] for c in chunks], list(range(10, 101, 10)))
+
+        engine.rows[45] = "changed"
+        engine.rows.update({n: f"v{n}" for n in range(101, 106)})
+        messages = self.sync(engine, state, 2)
+
+        records = self.records(messages)
+        self.assertEqual(
+            [r["record"]["ID"] for r in records],
+            list(range(41, 51)) + list(range(101, 106)),
+        )
+        # Written with the version of the rows that weren't written again
+        self.assertTrue(all(r["version"] == 1 for r in records))
+        self.assertEqual(
+            [m["version"] for m in messages if m["type"] == "ACTIVATE_VERSION"], [1]
+        )
+
+        messages = self.sync(engine, state, 3)
+        self.assertEqual(self.records(messages), [])
+
+    def test_grown_chunk_is_split(self):
+        engine = ChecksumEngine({n: "v" for n in range(0, 1000, 100)})
+        state = {}
+        self.sync(engine, state, 1, {"full_table_chunk_size": 5})
+
+        engine.rows.update({n: "new" for n in range(101, 126)})
+        messages = self.sync(engine, state, 2, {"full_table_chunk_size": 5})
+
+        # The first chunk, up to 400, is written again in chunks of 5
+        self.assertEqual(
+            [r["record"]["ID"] for r in self.records(messages)],
+            [0, 100] + list(range(101, 126)) + [200, 300, 400],
+        )
+        chunks = state["bookmarks"]["SCHEMA-TABLE"]["chunk_checksums"]["chunks"]
+        self.assertEqual(
+            [c["upper"]["ID"] for c in chunks], [103, 108, 113, 118, 123, 400, 900]
+        )
+
+    def test_resumes_after_last_finished_chunk(self):
+        engine = ChecksumEngine({n: f"v{n}" for n in range(1, 31)})
+        state = {}
+        self.sync(engine, state, 1)
+        engine.rows.update({n: "changed" for n in range(1, 31)})
+
+        bookmark = state["bookmarks"]["SCHEMA-TABLE"]
+        bookmark["pending_chunk_checksums"] = bookmark["chunk_checksums"]["chunks"][:1]
+        bookmark["max_pk_values"] = {"ID": 30}
+        bookmark["version"] = 1
+        messages = self.sync(engine, state, 2)
+
+        self.assertEqual(
+            [r["record"]["ID"] for r in self.records(messages)], list(range(11, 31))
+        )
+        self.assertNotIn("pending_chunk_checksums", state["bookmarks"]["SCHEMA-TABLE"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from tap_db2.connection import NativeEngine, dsn_value
+
+
+class TestNativeDsn(unittest.TestCase):
+    def test_values_are_braced(self):
+        self.assertEqual(dsn_value("secret"), "{secret}")
+        self.assertEqual(dsn_value("a;b}c"), "{a;b}}c}")
+
+    def test_password_cannot_add_keywords(self):
+        engine = NativeEngine(
+            {
+                "database": "TESTDB",
+                "hostname": "localhost",
+                "port": 50000,
+                "username": "db2inst1",
+                "password": "pw;SECURITY=NONE",
+            }
+        )
+        self.assertEqual(
+            engine.dsn,
+            "DATABASE=TESTDB;HOSTNAME=localhost;PORT=50000;PROTOCOL=TCPIP;"
+            "UID={db2inst1};PWD={pw;SECURITY=NONE};",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
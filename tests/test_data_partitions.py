@@ -0,0 +1,254 @@
+import io
+import json
+import re
+import sqlite3
+import unittest
+from unittest import mock
+
+import tap_db2.sync_strategies.full_table as full_table
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.data_partitions import (
+    discover_data_partitions,
+    partition_predicate,
+    split_partition_values,
+    sync_data_partitions,
+    uses_data_partitions,
+)
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+PARTITIONS = [
+    {"name": "P0", "low": ["MINVALUE"], "low-inclusive": True, "high": ["100"], "high-inclusive": False},
+    {"name": "P1", "low": ["100"], "low-inclusive": True, "high": ["200"], "high-inclusive": False},
+    {"name": "P2", "low": ["200"], "low-inclusive": True, "high": ["MAXVALUE"], "high-inclusive": True},
+]
+
+
+class PartitionedEngine(FakeEngine):
+    """Evaluates the partition predicates over (ID,) rows in SQLite."""
+
+    def answer(self, sql, params):
+        predicate = re.search(r" WHERE (.*?)(?: FOR READ ONLY.*)?$", sql).group(1)
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE TABLE T (ID INTEGER)")
+        db.executemany("INSERT INTO T VALUES (?)", self.rows)
+        return FakeResults(db.execute(f"SELECT ID FROM T WHERE {predicate}").fetchall())
+
+
+def make_stream(partitions=PARTITIONS, nulls_first=None):
+    stream_metadata = {}
+    if nulls_first is not None:
+        stream_metadata["data_partition_nulls_first"] = [nulls_first]
+    return make_catalog_entry(
+        {"ID": "integer"},
+        table_key_properties=[],
+        data_partition_expressions=["ID"],
+        data_partitions=partitions,
+        **stream_metadata,
+    )
+
+
+class LostConnection(Exception):
+    pass
+
+
+class InterruptedResults(FakeResults):
+    """Loses the connection once its first batch has been fetched."""
+
+    def fetchmany(self, size):
+        if len(self.rows) < 100:
+            raise LostConnection()
+        return super().fetchmany(size)
+
+
+class InterruptingEngine(PartitionedEngine):
+    """Loses the connection part way through partition P1."""
+
+    def answer(self, sql, params):
+        results = super().answer(sql, params)
+        if "ID >= 100 " in sql:
+            return InterruptedResults(results.rows)
+        return results
+
+
+class TestPartitionPredicate(unittest.TestCase):
+    def test_split_partition_values(self):
+        self.assertEqual(
+            split_partition_values("'2023-01-01',5"), ["'2023-01-01'", "5"]
+        )
+        self.assertEqual(split_partition_values("'a,b', 'c'"), ["'a,b'", "'c'"])
+        self.assertEqual(split_partition_values("MAXVALUE"), ["MAXVALUE"])
+        self.assertEqual(split_partition_values(""), [])
+
+    def test_single_column(self):
+        self.assertEqual(partition_predicate(["ID"], PARTITIONS[0]), "(ID < 100)")
+        self.assertEqual(
+            partition_predicate(["ID"], PARTITIONS[1]),
+            "((ID >= 100 OR ID IS NULL)) AND (ID < 200)",
+        )
+        self.assertEqual(
+            partition_predicate(["ID"], PARTITIONS[2]), "((ID >= 200 OR ID IS NULL))"
+        )
+
+    def test_nulls_first(self):
+        self.assertEqual(
+            partition_predicate(["ID"], PARTITIONS[0], [True]),
+            "((ID < 100 OR ID IS NULL))",
+        )
+        self.assertEqual(
+            partition_predicate(["ID"], PARTITIONS[2], [True]), "(ID >= 200)"
+        )
+
+    def test_multi_column(self):
+        partition = {
+            "low": ["2023", "MINVALUE"],
+            "low-inclusive": False,
+            "high": ["2023", "6"],
+            "high-inclusive": True,
+        }
+        self.assertEqual(
+            partition_predicate(["Y", "M"], partition),
+            "((Y >= 2023 OR Y IS NULL)) AND "
+            "(Y <= 2023 AND ((Y < 2023) OR (Y = 2023 AND M <= 6)))",
+        )
+
+    def test_uses_data_partitions(self):
+        self.assertFalse(uses_data_partitions(make_stream(), {}))
+        self.assertTrue(
+            uses_data_partitions(make_stream(), {"full_table_by_partition": True})
+        )
+        self.assertFalse(
+            uses_data_partitions(make_stream([]), {"full_table_by_partition": True})
+        )
+
+
+class TestDiscoverDataPartitions(unittest.TestCase):
+    def test_discover(self):
+        connection = mock.Mock()
+        connection.execute.side_effect = [
+            FakeResults([("S", "T", "Y", "N"), ("S", "T", "M", "Y")]),
+            FakeResults(
+                [
+                    ("S", "T", "P0", "Y", "MINVALUE,MINVALUE", "N", "2023,1"),
+                    ("S", "OTHER", "PART0", "Y", "", "Y", ""),
+                ]
+            ),
+        ]
+        self.assertEqual(
+            discover_data_partitions(connection),
+            {
+                ("S", "T"): {
+                    "expressions": ["Y", "M"],
+                    "nulls-first": [False, True],
+                    "partitions": [
+                        {
+                            "name": "P0",
+                            "low": ["MINVALUE", "MINVALUE"],
+                            "low-inclusive": True,
+                            "high": ["2023", "1"],
+                            "high-inclusive": False,
+                        }
+                    ],
+                }
+            },
+        )
+
+
+class TestSyncDataPartitions(unittest.TestCase):
+    def sync(self, engine, state, parallelism, nulls_first=None):
+        output = io.BytesIO()
+        message_writer = writer.MessageWriter(output, buffer_bytes=0)
+        sync_data_partitions(
+            engine,
+            {"cursor_array_size": 30},
+            make_stream(nulls_first=nulls_first),
+            state,
+            ["ID"],
+            1,
+            "TABLE",
+            parallelism,
+            message_writer,
+        )
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_every_partition(self):
+        for parallelism in (1, 3):
+            state = {}
+            messages = self.sync(
+                PartitionedEngine([(n,) for n in range(300)]), state, parallelism
+            )
+            ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+            self.assertEqual(sorted(ids), list(range(300)))
+            self.assertEqual(
+                sorted(state["bookmarks"]["SCHEMA-TABLE"]["completed_partitions"]),
+                ["P0", "P1", "P2"],
+            )
+
+    def test_skips_completed_partitions(self):
+        engine = PartitionedEngine([(n,) for n in range(300)])
+        state = {"bookmarks": {"SCHEMA-TABLE": {"completed_partitions": ["P0", "P2"]}}}
+        messages = self.sync(engine, state, 1)
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, list(range(100, 200)))
+        self.assertEqual(len(engine.statements), 1)
+
+    def test_null_keys(self):
+        rows = [(n,) for n in range(300)] + [(None,), (None,)]
+        # NULLs are stored in the last partition unless they sort first
+        for nulls_first, completed in ((None, ["P2"]), (False, ["P2"]), (True, ["P0"])):
+            engine = PartitionedEngine(rows)
+            messages = self.sync(engine, {}, 1, nulls_first)
+            ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+            self.assertEqual(ids.count(None), 2)
+            self.assertEqual(len(ids), 302)
+
+            state = {"bookmarks": {"SCHEMA-TABLE": {"completed_partitions": completed}}}
+            messages = self.sync(PartitionedEngine(rows), state, 1, nulls_first)
+            ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+            self.assertNotIn(None, ids)
+
+    def test_partly_written_partitions(self):
+        state = {}
+        with self.assertRaises(LostConnection):
+            self.sync(InterruptingEngine([(n,) for n in range(300)]), state, 1)
+        bookmark = state["bookmarks"]["SCHEMA-TABLE"]
+        self.assertEqual(bookmark["completed_partitions"], ["P0"])
+        self.assertEqual(bookmark["partial_parts"], ["P1"])
+
+    def test_keyless_resume_of_a_partly_written_partition(self):
+        state = {
+            "bookmarks": {
+                "SCHEMA-TABLE": {
+                    "version": 5,
+                    "completed_partitions": ["P0"],
+                    "partial_parts": ["P1"],
+                }
+            }
+        }
+        output = io.BytesIO()
+        full_table.sync_table(
+            PartitionedEngine([(n,) for n in range(300)]),
+            {"cursor_array_size": 30, "full_table_by_partition": True},
+            make_stream(),
+            state,
+            ["ID"],
+            5,
+            writer.MessageWriter(output, buffer_bytes=0),
+        )
+        messages = [json.loads(line) for line in output.getvalue().splitlines()]
+
+        # The rows of P0 and of the start of P1 were written in version 5, so
+        # the table is read again in a version of its own
+        records = [m for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(sorted(m["record"]["ID"] for m in records), list(range(300)))
+        versions = {m["version"] for m in records}
+        self.assertEqual(len(versions), 1)
+        self.assertNotIn(5, versions)
+        self.assertEqual(messages[-1]["type"], "ACTIVATE_VERSION")
+        self.assertEqual(messages[-1]["version"], versions.pop())
+        self.assertNotIn("partial_parts", state["bookmarks"]["SCHEMA-TABLE"])
+
+
+if __name__ == "__main__":
+    unittest.main()
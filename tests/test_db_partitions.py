@@ -0,0 +1,89 @@
+import io
+import json
+import re
+import unittest
+
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.db_partitions import (
+    db_partition_predicate,
+    sync_db_partitions,
+    uses_db_partitions,
+)
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class DbPartitionedEngine(FakeEngine):
+    """Stores row (ID,) on database partition ID % partitions."""
+
+    def __init__(self, rows, partitions):
+        super().__init__(rows)
+        self.partitions = partitions
+
+    def answer(self, sql, params):
+        if "SYSCAT.DBPARTITIONGROUPDEF" in sql:
+            return FakeResults([(n,) for n in range(self.partitions)])
+
+        number = int(re.search(r'DBPARTITIONNUM\("ID"\) = (\d+)', sql).group(1))
+        return FakeResults(
+            [row for row in self.rows if row[0] % self.partitions == number]
+        )
+
+
+def make_stream():
+    return make_catalog_entry({"ID": "integer"}, full_table_by_dbpartition=True)
+
+
+class TestDbPartitions(unittest.TestCase):
+    def sync(self, engine, state):
+        output = io.BytesIO()
+        message_writer = writer.MessageWriter(output, buffer_bytes=0)
+        with engine.connect() as open_conn:
+            synced = sync_db_partitions(
+                engine,
+                open_conn,
+                {"cursor_array_size": 10},
+                make_stream(),
+                state,
+                ["ID"],
+                1,
+                "TABLE",
+                None,
+                message_writer,
+            )
+        return synced, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_predicate(self):
+        self.assertEqual(db_partition_predicate("ID", 3), 'DBPARTITIONNUM("ID") = 3')
+        self.assertTrue(uses_db_partitions(make_stream(), {}))
+
+    def test_reads_each_partition(self):
+        engine = DbPartitionedEngine([(n,) for n in range(100)], 4)
+        state = {}
+        synced, messages = self.sync(engine, state)
+
+        self.assertTrue(synced)
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(sorted(ids), list(range(100)))
+        self.assertEqual(
+            sorted(state["bookmarks"]["SCHEMA-TABLE"]["completed_dbpartitions"]),
+            [0, 1, 2, 3],
+        )
+
+    def test_resumes_unfinished_partitions(self):
+        engine = DbPartitionedEngine([(n,) for n in range(100)], 4)
+        state = {"bookmarks": {"SCHEMA-TABLE": {"completed_dbpartitions": [0, 2, 3]}}}
+        _, messages = self.sync(engine, state)
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, list(range(1, 100, 4)))
+
+    def test_single_partition_is_left_to_the_caller(self):
+        engine = DbPartitionedEngine([(n,) for n in range(10)], 1)
+        synced, messages = self.sync(engine, {})
+        self.assertFalse(synced)
+        self.assertEqual(messages, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
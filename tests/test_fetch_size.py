@@ -0,0 +1,109 @@
+import unittest
+
+from singer import metadata
+from singer.catalog import CatalogEntry
+from singer.schema import Schema
+
+from tap_db2.sync_strategies.fetch_size import (
+    FetchSizeTuner,
+    FixedFetchSize,
+    estimate_row_bytes,
+    fetch_batches,
+    fetch_size_for_stream,
+)
+
+
+def make_catalog_entry(columns):
+    mdata = {}
+    for column, sql_data_type, length in columns:
+        mdata = metadata.write(
+            mdata, ("properties", column), "sql-datatype", sql_data_type
+        )
+        mdata = metadata.write(
+            mdata, ("properties", column), "sql-datatype-length", length
+        )
+    return CatalogEntry(
+        tap_stream_id="SCHEMA-TABLE",
+        stream="TABLE",
+        table="TABLE",
+        schema=Schema(type="object", properties={}),
+        metadata=metadata.to_list(mdata),
+    )
+
+
+class FakeResults:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.requested = []
+
+    def fetchmany(self, size):
+        self.requested.append(size)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+class TestFetchSize(unittest.TestCase):
+    def test_wide_tables_fetch_fewer_rows(self):
+        narrow = [("A", "integer", 4), ("B", "varchar", 10), ("C", "date", 4)]
+        wide = [(f"C{n}", "varchar", 200) for n in range(300)]
+        config = {"fetch_memory_budget_bytes": 10 * 1024 * 1024}
+
+        narrow_size = fetch_size_for_stream(
+            make_catalog_entry(narrow), [c[0] for c in narrow], config
+        ).size
+        wide_size = fetch_size_for_stream(
+            make_catalog_entry(wide), [c[0] for c in wide], config
+        ).size
+
+        self.assertEqual(narrow_size, 50000)
+        self.assertLess(wide_size, 200)
+        self.assertGreater(wide_size, 50)
+
+    def test_estimate_uses_declared_string_length(self):
+        catalog_entry = make_catalog_entry([("A", "varchar", 1000), ("B", "bigint", 8)])
+
+        self.assertEqual(
+            estimate_row_bytes(catalog_entry, ["A", "B"]),
+            56 + (8 + 49 + 1000) + (8 + 32),
+        )
+
+    def test_cursor_array_size_fixes_the_size(self):
+        fetch_size = fetch_size_for_stream(
+            make_catalog_entry([]), [], {"cursor_array_size": 250}
+        )
+
+        self.assertIsInstance(fetch_size, FixedFetchSize)
+        self.assertEqual(fetch_size.size, 250)
+
+    def test_tuner_grows_on_quick_full_fetches_within_budget(self):
+        tuner = FetchSizeTuner(1000, memory_budget=100 * 1000, max_size=10**6)
+        self.assertEqual(tuner.size, 100)
+
+        # Doubling is capped by the budget at the corrected row width
+        tuner.observe([(1,)] * tuner.size, 0.001)
+        self.assertEqual(tuner.size, 100 * 1000 // tuner.row_bytes)
+
+        # Rows turned out to be much smaller than estimated, so the budget
+        # allows more of them
+        for _ in range(20):
+            tuner.observe([(1,)] * tuner.size, 0.001)
+        self.assertGreater(tuner.size, 1000)
+
+    def test_tuner_shrinks_on_slow_fetches(self):
+        tuner = FetchSizeTuner(100, memory_budget=100 * 1000)
+        size = tuner.size
+
+        tuner.observe([("x" * 60,)] * 10, 5.0)
+        self.assertEqual(tuner.size, size // 2)
+
+    def test_fetch_batches(self):
+        results = FakeResults(range(25))
+
+        batches = list(fetch_batches(results, FixedFetchSize(10)))
+
+        self.assertEqual([len(b) for b in batches], [10, 10, 5])
+        self.assertEqual(results.requested, [10, 10, 10, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import datetime
+import io
+import json
+import unittest
+
+from singer.schema import Schema
+
+import tap_db2.sync_strategies.incremental as incremental
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.incremental_windows import (
+    advance,
+    next_window,
+    window_end,
+)
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class KeysEngine(FakeEngine):
+    """Answers key bounds, CARD and window queries over a list of keys."""
+
+    def __init__(self, keys):
+        super().__init__(keys)
+        self.windows = []
+
+    def answer(self, sql, params):
+        if "IS NULL" in sql:
+            return FakeResults([(k,) for k in self.rows if k is None])
+        lower = params.get("lower")
+        keys = [
+            k for k in self.rows if k is not None and (lower is None or k >= lower)
+        ]
+        if "SYSCAT.TABLES" in sql:
+            return FakeResults([(len(self.rows),)])
+        if "MIN(" in sql:
+            return FakeResults([(min(keys), max(keys)) if keys else (None, None)])
+        if "<=" in sql:
+            keys = [k for k in keys if k <= params["upper"]]
+        else:
+            keys = [k for k in keys if k < params["upper"]]
+        self.windows.append((params["lower"], params["upper"], len(keys)))
+        return FakeResults([(k,) for k in keys])
+
+
+def make_stream(sql_datatype="integer"):
+    properties = None
+    if sql_datatype == "timestamp":
+        properties = {"ID": Schema(type=["null", "string"], format="date-time")}
+    return make_catalog_entry(
+        {"ID": sql_datatype},
+        properties,
+        replication_method="INCREMENTAL",
+        replication_key="ID",
+        incremental_window_rows=10,
+    )
+
+
+class TestIncrementalWindows(unittest.TestCase):
+    def sync(self, engine, state, config=None, stream=None):
+        output = io.BytesIO()
+        message_writer = writer.MessageWriter(output, buffer_bytes=0)
+        incremental.sync_table(
+            engine,
+            config or {},
+            stream or make_stream(),
+            state,
+            ["ID"],
+            message_writer,
+        )
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_windows_adapt_to_rows(self):
+        # Dense keys, a gap, then keys ten apart
+        keys = list(range(1, 41)) + list(range(1000, 1400, 10))
+        engine = KeysEngine(keys)
+        state = {}
+        messages = self.sync(engine, state)
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, keys)
+        # The first window is sized from CARD as if the keys were even
+        self.assertEqual(engine.windows[0][:2], (1, 1 + int(1389 * 10 / 80)))
+        self.assertTrue(all(rows <= 40 for _, _, rows in engine.windows))
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"]["replication_key_value"], 1390
+        )
+
+    def test_resumes_from_bookmark(self):
+        engine = KeysEngine(list(range(1, 101)))
+        state = {
+            "bookmarks": {
+                "SCHEMA-TABLE": {"replication_key": "ID", "replication_key_value": 91}
+            }
+        }
+        messages = self.sync(engine, state)
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, list(range(91, 101)))
+
+    def test_null_keys_on_first_sync(self):
+        engine = KeysEngine([None] + list(range(1, 31)) + [None])
+        state = {}
+        messages = self.sync(engine, state)
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, [None, None] + list(range(1, 31)))
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"]["replication_key_value"], 30
+        )
+
+        messages = self.sync(engine, state)
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, [30])
+
+    def test_sentinel_key(self):
+        keys = [datetime.datetime(2025, 1, 1), datetime.datetime(9999, 12, 31)]
+        engine = KeysEngine(keys)
+        messages = self.sync(
+            engine, {}, {"incremental_window_size": 1}, make_stream("timestamp")
+        )
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, [k.isoformat() + "+00:00" for k in keys])
+        self.assertEqual(engine.windows[-1][1], keys[-1])
+
+    def test_empty_window_bookmark_matches_row_bookmarks(self):
+        keys = [datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 10)]
+        messages = self.sync(
+            KeysEngine(keys),
+            {},
+            {"incremental_window_size": 86400},
+            make_stream("timestamp"),
+        )
+
+        values = [
+            m["value"]["bookmarks"]["SCHEMA-TABLE"]["replication_key_value"]
+            for m in messages
+            if m["type"] == "STATE"
+            and m["value"]["bookmarks"]["SCHEMA-TABLE"].get("replication_key_value")
+        ]
+        # After a row, then after the empty window ending on 2024-01-06
+        self.assertIn("2024-01-01T00:00:00+00:00", values)
+        self.assertIn("2024-01-06T00:00:00+00:00", values)
+        self.assertTrue(all(value.endswith("+00:00") for value in values))
+
+    def test_window_end(self):
+        high = datetime.date(9999, 12, 31)
+        self.assertIsNone(window_end(datetime.date(2025, 1, 1), high, 1e15))
+        self.assertIsNone(window_end(datetime.date(9999, 12, 30), high, 86400 * 2))
+        self.assertEqual(
+            window_end(datetime.date(9999, 12, 29), high, 86400),
+            datetime.date(9999, 12, 30),
+        )
+        self.assertIsNone(window_end(1, 10, 9))
+        self.assertEqual(window_end(1, 10, 8), 9)
+
+    def test_window_steps(self):
+        self.assertEqual(next_window(100, 0, 10), 400)
+        self.assertEqual(next_window(100, 1000, 10), 25)
+        self.assertEqual(next_window(100, 20, 10), 50)
+        self.assertEqual(
+            advance(datetime.datetime(2024, 1, 1), 90.4),
+            datetime.datetime(2024, 1, 1, 0, 1, 30),
+        )
+        self.assertEqual(
+            advance(datetime.date(2024, 1, 1), 3600), datetime.date(2024, 1, 2)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
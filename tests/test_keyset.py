@@ -0,0 +1,185 @@
+import datetime
+import decimal
+import io
+import json
+import re
+import unittest
+from unittest import mock
+
+import tap_db2.sync_strategies.common as common
+import tap_db2.sync_strategies.full_table as full_table
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.keyset import bind_value, keyset_predicate
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class KeysetEngine(FakeEngine):
+    """Answers keyset queries over sorted (ID, SEQ) rows, recording the params."""
+
+    def __init__(self, rows):
+        super().__init__(sorted(rows))
+        self.params = []
+
+    def answer(self, sql, params):
+        self.params.append(params)
+        if "DESC" in sql:
+            return FakeResults(self.rows[-1:])
+
+        rows = self.rows
+        if "last_pk_0" in params:
+            lower = (params["last_pk_0"], params["last_pk_1"])
+            rows = [row for row in rows if row > lower]
+        upper = (params["max_pk_0"], params["max_pk_1"])
+        rows = [row for row in rows if row <= upper]
+        limit = int(re.search(r"FETCH FIRST (\d+) ROWS ONLY", sql).group(1))
+        return FakeResults(rows[:limit])
+
+
+def make_stream():
+    return make_catalog_entry(
+        {"ID": "integer", "SEQ": "integer"},
+        table_key_properties=["ID", "SEQ"],
+        replication_method="FULL_TABLE",
+    )
+
+
+class TestKeysetPredicate(unittest.TestCase):
+    def test_single_key(self):
+        self.assertEqual(keyset_predicate(['"ID"'], "last_pk", ">"), '"ID" > :last_pk_0')
+        self.assertEqual(
+            keyset_predicate(['"ID"'], "max_pk", "<", inclusive=True),
+            '"ID" <= :max_pk_0',
+        )
+
+    def test_composite_key(self):
+        self.assertEqual(
+            keyset_predicate(['"A"', '"B"', '"C"'], "p", ">"),
+            '"A" >= :p_0 AND (("A" > :p_0) OR ("A" = :p_0 AND "B" > :p_1) '
+            'OR ("A" = :p_0 AND "B" = :p_1 AND "C" > :p_2))',
+        )
+        self.assertEqual(
+            keyset_predicate(['"A"', '"B"'], "p", "<", inclusive=True),
+            '"A" <= :p_0 AND (("A" < :p_0) OR ("A" = :p_0 AND "B" <= :p_1))',
+        )
+
+
+class TestBindValue(unittest.TestCase):
+    def test_bookmarked_values(self):
+        self.assertEqual(
+            bind_value("2023-01-02T03:04:05.000006+00:00", "timestamp"),
+            datetime.datetime(2023, 1, 2, 3, 4, 5, 6),
+        )
+        self.assertEqual(
+            bind_value("2023-01-02T00:00:00+00:00", "date"), datetime.date(2023, 1, 2)
+        )
+        self.assertEqual(bind_value("2023-01-02", "date"), datetime.date(2023, 1, 2))
+        self.assertEqual(
+            bind_value("1970-01-01T03:04:05+00:00", "time"), datetime.time(3, 4, 5)
+        )
+        self.assertEqual(bind_value("03:04:05", "time"), datetime.time(3, 4, 5))
+        self.assertEqual(bind_value("1.50", "decimal"), decimal.Decimal("1.50"))
+        self.assertEqual(bind_value("0x0AFF", "varbinary"), b"\x0a\xff")
+        self.assertEqual(bind_value("abc", "varchar"), "abc")
+        self.assertEqual(bind_value(5, "integer"), 5)
+
+
+class TestKeysetChunks(unittest.TestCase):
+    def sync(self, engine, state, config):
+        output = io.BytesIO()
+        message_writer = writer.MessageWriter(output, buffer_bytes=0)
+        full_table.sync_keyset_chunks(
+            engine.connect(),
+            config,
+            make_stream(),
+            state,
+            ["ID", "SEQ"],
+            1,
+            "TABLE",
+            message_writer,
+        )
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_chunks_in_key_order(self):
+        rows = [(i, j) for i in range(10) for j in range(3)]
+        engine = KeysetEngine(rows)
+        state = {}
+        messages = self.sync(
+            engine, state, {"full_table_chunk_size": 7, "cursor_array_size": 5}
+        )
+
+        self.assertEqual(
+            [(m["record"]["ID"], m["record"]["SEQ"]) for m in messages if m["type"] == "RECORD"],
+            rows,
+        )
+        # The max key query, then chunks of 7, 7, 7, 7 and the last 2 rows
+        self.assertEqual(len(engine.statements), 6)
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"],
+            {"max_pk_values": {"ID": 9, "SEQ": 2}, "last_pk_fetched": {"ID": 9, "SEQ": 2}},
+        )
+
+    def test_resumes_after_last_pk_fetched(self):
+        rows = [(i, j) for i in range(10) for j in range(3)]
+        engine = KeysetEngine(rows + [(10, 0)])
+        state = {
+            "bookmarks": {
+                "SCHEMA-TABLE": {
+                    "max_pk_values": {"ID": 9, "SEQ": 2},
+                    "last_pk_fetched": {"ID": 4, "SEQ": 1},
+                }
+            }
+        }
+        messages = self.sync(engine, state, {"full_table_chunk_size": 100})
+
+        # Rows inserted after max_pk_values was taken are left out
+        self.assertEqual(
+            [(m["record"]["ID"], m["record"]["SEQ"]) for m in messages if m["type"] == "RECORD"],
+            rows[14:],
+        )
+        sql, params = engine.statements[0], engine.params[0]
+        self.assertIn("WHERE", sql)
+        self.assertEqual(params["last_pk_0"], 4)
+        self.assertEqual(params["last_pk_1"], 1)
+
+    def test_one_worker_pool_per_stream(self):
+        rows = [(i, j) for i in range(10) for j in range(3)]
+        config = {
+            "full_table_chunk_size": 7,
+            "serialization_workers": 2,
+            "serialization_mode": "thread",
+        }
+        with mock.patch.object(
+            common, "SerializationPool", wraps=common.SerializationPool
+        ) as pool:
+            messages = self.sync(KeysetEngine(rows), {}, config)
+
+        self.assertEqual(pool.call_count, 1)
+        self.assertEqual(
+            [(m["record"]["ID"], m["record"]["SEQ"]) for m in messages if m["type"] == "RECORD"],
+            rows,
+        )
+
+    def test_empty_table(self):
+        engine = KeysetEngine([])
+        state = {}
+        self.assertEqual(self.sync(engine, state, {}), [])
+        self.assertEqual(state, {})
+
+    def test_chunk_size(self):
+        catalog_entry = make_stream()
+        self.assertEqual(
+            full_table.chunk_size_for_stream(catalog_entry, {}),
+            full_table.DEFAULT_FULL_TABLE_CHUNK_SIZE,
+        )
+        self.assertEqual(
+            full_table.chunk_size_for_stream(catalog_entry, {"full_table_chunk_size": 50}),
+            50,
+        )
+        self.assertFalse(
+            full_table.uses_keyset_chunks(catalog_entry, {"full_table_chunk_size": 0})
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import io
+import json
+import re
+import unittest
+
+import tap_db2.sync_strategies.full_table as full_table
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.pk_ranges import parallelism_for_stream, plan_pk_ranges
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class KeyRangeEngine(FakeEngine):
+    """Answers the key range queries over sorted (ID,) rows."""
+
+    def __init__(self, rows, fail_after=None):
+        super().__init__(sorted(rows))
+        self.fail_after = fail_after
+
+    def answer(self, sql, params):
+        rows = self.rows
+        if "max_pk_0" in params:
+            rows = [row for row in rows if row[0] <= params["max_pk_0"]]
+        if "last_pk_0" in params:
+            rows = [row for row in rows if row[0] > params["last_pk_0"]]
+
+        if "SYSCAT" in sql or "TABLESAMPLE" in sql:
+            return FakeResults([])
+        if "DESC" in sql:
+            return FakeResults(rows[-1:])
+        if "COUNT(*)" in sql:
+            return FakeResults([(len(rows),)])
+        if "ROW_NUMBER" in sql:
+            step = int(re.search(r'MOD\("ROW_NUM", (\d+)\)', sql).group(1))
+            return FakeResults(rows[step - 1::step])
+
+        if self.fail_after is not None and rows and rows[0][0] >= self.fail_after:
+            raise RuntimeError("connection lost")
+        limit = int(re.search(r"FETCH FIRST (\d+) ROWS ONLY", sql).group(1))
+        return FakeResults(rows[:limit])
+
+
+def make_stream(parallelism=None):
+    stream_metadata = {}
+    if parallelism is not None:
+        stream_metadata["full_table_parallelism"] = parallelism
+    return make_catalog_entry(
+        {"ID": "integer"},
+        table_key_properties=["ID"],
+        replication_method="FULL_TABLE",
+        **stream_metadata,
+    )
+
+
+class TestPlanPkRanges(unittest.TestCase):
+    def test_even_split(self):
+        engine = KeyRangeEngine([(n,) for n in range(1, 101)])
+        pk_ranges = plan_pk_ranges(
+            engine.connect(), make_stream(), ["ID"], {"ID": 100}, 4, {}
+        )
+        self.assertEqual(
+            pk_ranges,
+            [
+                {"lower": None, "upper": {"ID": 25}},
+                {"lower": {"ID": 25}, "upper": {"ID": 50}},
+                {"lower": {"ID": 50}, "upper": {"ID": 75}},
+                {"lower": {"ID": 75}, "upper": {"ID": 100}},
+            ],
+        )
+
+    def test_fewer_rows_than_ranges(self):
+        engine = KeyRangeEngine([(1,), (2,)])
+        pk_ranges = plan_pk_ranges(
+            engine.connect(), make_stream(), ["ID"], {"ID": 2}, 4, {}
+        )
+        self.assertEqual(
+            pk_ranges,
+            [
+                {"lower": None, "upper": {"ID": 1}},
+                {"lower": {"ID": 1}, "upper": {"ID": 2}},
+            ],
+        )
+
+    def test_parallelism(self):
+        self.assertEqual(parallelism_for_stream(make_stream(), {}), 1)
+        self.assertEqual(
+            parallelism_for_stream(make_stream(), {"full_table_parallelism": 3}), 3
+        )
+        self.assertEqual(
+            parallelism_for_stream(make_stream(8), {"full_table_parallelism": 3}), 8
+        )
+
+
+class TestSyncPkRanges(unittest.TestCase):
+    def sync(self, engine, state, config):
+        output = io.BytesIO()
+        message_writer = writer.MessageWriter(output, buffer_bytes=0)
+        with engine.connect() as open_conn:
+            full_table.sync_keyset_ranges(
+                engine,
+                open_conn,
+                config,
+                make_stream(4),
+                state,
+                ["ID"],
+                1,
+                "TABLE",
+                message_writer,
+            )
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_reads_every_range(self):
+        engine = KeyRangeEngine([(n,) for n in range(1, 1001)])
+        state = {}
+        messages = self.sync(
+            engine, state, {"full_table_chunk_size": 60, "cursor_array_size": 25}
+        )
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(sorted(ids), list(range(1, 1001)))
+        pk_ranges = state["bookmarks"]["SCHEMA-TABLE"]["pk_ranges"]
+        self.assertEqual(len(pk_ranges), 4)
+        self.assertTrue(all(r["complete"] for r in pk_ranges))
+        self.assertEqual(
+            [r["last_pk_fetched"] for r in pk_ranges],
+            [{"ID": 250}, {"ID": 500}, {"ID": 750}, {"ID": 1000}],
+        )
+
+    def test_resumes_unfinished_ranges(self):
+        engine = KeyRangeEngine([(n,) for n in range(1, 101)])
+        state = {
+            "bookmarks": {
+                "SCHEMA-TABLE": {
+                    "max_pk_values": {"ID": 100},
+                    "pk_ranges": [
+                        {"lower": None, "upper": {"ID": 50}, "complete": True},
+                        {
+                            "lower": {"ID": 50},
+                            "upper": {"ID": 100},
+                            "last_pk_fetched": {"ID": 80},
+                        },
+                    ],
+                }
+            }
+        }
+        messages = self.sync(engine, state, {})
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, list(range(81, 101)))
+        self.assertFalse(any("COUNT(*)" in sql for sql in engine.statements))
+
+    def test_failure_is_raised(self):
+        engine = KeyRangeEngine([(n,) for n in range(1, 101)], fail_after=60)
+        state = {}
+        with self.assertRaises(RuntimeError):
+            self.sync(engine, state, {"full_table_chunk_size": 10})
+
+        # The ranges stay bookmarked for a resume
+        pk_ranges = state["bookmarks"]["SCHEMA-TABLE"]["pk_ranges"]
+        self.assertEqual(len(pk_ranges), 4)
+        self.assertFalse(pk_ranges[3].get("complete"))
+
+
+if __name__ == "__main__":
+    unittest.main()
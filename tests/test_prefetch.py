@@ -0,0 +1,69 @@
+import threading
+import time
+import unittest
+
+from tap_db2.sync_strategies.prefetch import BatchPrefetcher, prefetched
+
+
+class TestBatchPrefetcher(unittest.TestCase):
+    def test_batches_keep_their_order(self):
+        batches = [[n, n + 1] for n in range(0, 200, 2)]
+
+        with BatchPrefetcher(iter(batches), 3) as prefetcher:
+            self.assertEqual(list(prefetcher), batches)
+
+    def test_fetches_on_another_thread_ahead_of_the_consumer(self):
+        fetch_threads = []
+
+        def batches():
+            for n in range(5):
+                fetch_threads.append(threading.current_thread())
+                yield [n]
+
+        with BatchPrefetcher(batches(), 2) as prefetcher:
+            iterator = iter(prefetcher)
+            self.assertEqual(next(iterator), [0])
+            deadline = time.monotonic() + 5
+            # The queue holds two batches and the thread blocks on a third
+            while len(fetch_threads) < 4 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(fetch_threads), 4)
+            self.assertEqual(list(iterator), [[1], [2], [3], [4]])
+
+        self.assertNotIn(threading.current_thread(), fetch_threads)
+
+    def test_fetch_errors_are_raised_after_earlier_batches(self):
+        def batches():
+            yield [1]
+            raise RuntimeError("SQL30081N connection lost")
+
+        consumed = []
+        with self.assertRaisesRegex(RuntimeError, "SQL30081N"):
+            with BatchPrefetcher(batches(), 2) as prefetcher:
+                for batch in prefetcher:
+                    consumed.append(batch)
+        self.assertEqual(consumed, [[1]])
+
+    def test_consumer_failure_stops_the_fetch_thread(self):
+        def batches():
+            n = 0
+            while True:
+                n += 1
+                yield [n]
+
+        prefetcher = BatchPrefetcher(batches(), 1)
+        with self.assertRaises(ValueError):
+            with prefetcher:
+                for _ in prefetcher:
+                    raise ValueError()
+        self.assertFalse(prefetcher.thread.is_alive())
+
+    def test_disabled_by_default(self):
+        batches = [[1], [2]]
+
+        with prefetched(batches, {}) as result:
+            self.assertIs(result, batches)
+
+
+if __name__ == "__main__":
+    unittest.main()
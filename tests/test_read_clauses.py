@@ -0,0 +1,85 @@
+import unittest
+from unittest import mock
+
+import tap_db2.sync_strategies.common as common
+from tap_db2.sync_strategies.common import (
+    pin_read_clauses,
+    read_clauses,
+    with_read_clauses,
+)
+
+from fakes import make_catalog_entry
+
+
+class TestReadClauses(unittest.TestCase):
+    def test_read_only_by_default(self):
+        self.assertEqual(read_clauses(make_catalog_entry(), {}), "FOR READ ONLY")
+        self.assertEqual(
+            with_read_clauses(
+                "SELECT 1 FROM T", make_catalog_entry(), {"query_read_only": False}
+            ),
+            "SELECT 1 FROM T",
+        )
+
+    def test_clause_order(self):
+        config = {
+            "query_isolation": "cs",
+            "query_optimize_for_rows": 1000,
+            "query_skip_locked_data": True,
+        }
+        self.assertEqual(
+            read_clauses(make_catalog_entry(), config),
+            "FOR READ ONLY OPTIMIZE FOR 1000 ROWS WITH CS SKIP LOCKED DATA",
+        )
+
+    def test_metadata_overrides_config(self):
+        entry = make_catalog_entry(query_isolation="UR", query_read_only=False)
+        self.assertEqual(
+            read_clauses(entry, {"query_isolation": "RS", "query_read_only": True}),
+            "WITH UR",
+        )
+
+    def test_skip_locked_data_needs_cs_or_rs(self):
+        config = {"query_isolation": "UR", "query_skip_locked_data": True}
+        self.assertEqual(
+            read_clauses(make_catalog_entry(), config), "FOR READ ONLY WITH UR"
+        )
+
+    def test_currently_committed(self):
+        config = {"query_currently_committed": True, "query_skip_locked_data": True}
+        self.assertEqual(
+            read_clauses(make_catalog_entry(), config),
+            "FOR READ ONLY WITH CS USE CURRENTLY COMMITTED",
+        )
+        config = {"query_currently_committed": True, "query_isolation": "UR"}
+        self.assertEqual(
+            read_clauses(make_catalog_entry(), config), "FOR READ ONLY WITH UR"
+        )
+
+    def test_skip_locked_data_is_warned_about(self):
+        config = {"query_isolation": "CS", "query_skip_locked_data": True}
+        with self.assertLogs(common.LOGGER, "WARNING") as logs:
+            read_clauses(make_catalog_entry(), config)
+        self.assertIn("never emitted", logs.output[0])
+
+    def test_pinned_once_per_stream(self):
+        entry = make_catalog_entry()
+        config = {"query_isolation": "CS", "query_skip_locked_data": True}
+        self.assertEqual(
+            pin_read_clauses(entry, config), "FOR READ ONLY WITH CS SKIP LOCKED DATA"
+        )
+        with mock.patch.object(common, "read_clauses") as read_clauses_mock:
+            for _ in range(3):
+                self.assertEqual(
+                    with_read_clauses("SELECT 1 FROM T", entry, config),
+                    "SELECT 1 FROM T FOR READ ONLY WITH CS SKIP LOCKED DATA",
+                )
+        read_clauses_mock.assert_not_called()
+
+    def test_unknown_isolation(self):
+        with self.assertRaises(Exception):
+            read_clauses(make_catalog_entry(), {"query_isolation": "NC"})
+
+
+if __name__ == "__main__":
+    unittest.main()
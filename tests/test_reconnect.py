@@ -0,0 +1,157 @@
+import io
+import json
+import re
+import unittest
+
+import tap_db2.sync_strategies.full_table as full_table
+import tap_db2.writer as writer
+from tap_db2.connection import reconnect_delay, retryable_sqlcode
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class CommunicationError(Exception):
+    pass
+
+
+class WrappedError(Exception):
+    """Like a SQLAlchemy DBAPIError, with the driver's error as orig."""
+
+    def __init__(self, orig):
+        super().__init__("(ibm_db_dbi.Error)")
+        self.orig = orig
+
+
+class FailingResults(FakeResults):
+    def __init__(self, rows, fail_at, fail_message):
+        super().__init__(rows)
+        self.fail_at = fail_at
+        self.fail_message = fail_message
+
+    def fetchmany(self, size):
+        batch = super().fetchmany(size)
+        if any(row[0] >= self.fail_at for row in batch):
+            raise WrappedError(CommunicationError(self.fail_message))
+        return batch
+
+
+class FailingEngine(FakeEngine):
+    """Answers keyset chunk queries, losing the connection at a row."""
+
+    def __init__(self, rows, fail_at, failures=1, fail_message="SQL30081N"):
+        super().__init__(rows)
+        self.fail_at = fail_at
+        self.failures = failures
+        self.fail_message = fail_message
+
+    def answer(self, sql, params):
+        rows = self.rows
+        if "max_pk_0" in params:
+            rows = [row for row in rows if row[0] <= params["max_pk_0"]]
+        if "last_pk_0" in params:
+            rows = [row for row in rows if row[0] > params["last_pk_0"]]
+
+        if "DESC" in sql:
+            return FakeResults(rows[-1:])
+        limit = int(re.search(r"FETCH FIRST (\d+) ROWS ONLY", sql).group(1))
+        rows = rows[:limit]
+        if self.failures and any(row[0] >= self.fail_at for row in rows):
+            self.failures -= 1
+            return FailingResults(rows, self.fail_at, self.fail_message)
+        return FakeResults(rows)
+
+
+class KeylessFailingEngine(FakeEngine):
+    """Answers a single query for the whole table, losing the connection once."""
+
+    def __init__(self, rows, fail_at):
+        super().__init__(rows)
+        self.fail_at = fail_at
+
+    def answer(self, sql, params):
+        if self.connections == 1:
+            return FailingResults(self.rows, self.fail_at, "SQL30081N")
+        return FakeResults(self.rows)
+
+
+def make_stream(key_properties=("ID",)):
+    return make_catalog_entry(
+        {"ID": "integer"},
+        table_key_properties=list(key_properties),
+        replication_method="FULL_TABLE",
+    )
+
+
+CONFIG = {
+    "full_table_chunk_size": 30,
+    "cursor_array_size": 10,
+    "reconnect_backoff_seconds": 0,
+}
+
+
+class TestReconnect(unittest.TestCase):
+    def sync(self, engine, state, config=None, stream=None):
+        output = io.BytesIO()
+        message_writer = writer.MessageWriter(output, buffer_bytes=0)
+        full_table.sync_table(
+            engine,
+            config or CONFIG,
+            stream or make_stream(),
+            state,
+            ["ID"],
+            1,
+            message_writer,
+        )
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_retryable_sqlcode(self):
+        self.assertEqual(
+            retryable_sqlcode(WrappedError(CommunicationError("SQL0911N deadlock"))),
+            "SQL0911N",
+        )
+        self.assertIsNone(retryable_sqlcode(WrappedError(ValueError("SQL0204N"))))
+        self.assertLessEqual(reconnect_delay(20, {}), 300)
+
+    def test_resumes_after_last_written_row(self):
+        engine = FailingEngine([(n,) for n in range(1, 101)], fail_at=45)
+        messages = self.sync(engine, {})
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        # The batch being fetched when the connection was lost was not written
+        self.assertEqual(ids, list(range(1, 101)))
+        self.assertEqual(engine.connections, 2)
+
+    def test_keyless_single_query_restarts_in_a_new_version(self):
+        engine = KeylessFailingEngine([(n,) for n in range(1, 101)], fail_at=45)
+        state = {}
+        messages = self.sync(engine, state, stream=make_stream(()))
+
+        records = [m for m in messages if m["type"] == "RECORD"]
+        first = [m["record"]["ID"] for m in records if m["version"] == 1]
+        self.assertEqual(first, list(range(1, 41)))
+        retried = [m for m in records if m["version"] != 1]
+        self.assertEqual([m["record"]["ID"] for m in retried], list(range(1, 101)))
+        # Only the rows read after the reconnect are kept
+        self.assertEqual(messages[-1]["type"], "ACTIVATE_VERSION")
+        self.assertEqual(messages[-1]["version"], retried[0]["version"])
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"]["version"], retried[0]["version"]
+        )
+
+    def test_other_errors_are_raised(self):
+        engine = FailingEngine(
+            [(n,) for n in range(1, 101)], fail_at=45, fail_message="SQL0204N"
+        )
+        with self.assertRaises(WrappedError):
+            self.sync(engine, {})
+        self.assertEqual(engine.connections, 1)
+
+    def test_reconnects_are_bounded(self):
+        engine = FailingEngine([(n,) for n in range(1, 101)], fail_at=1, failures=10)
+        with self.assertRaises(WrappedError):
+            self.sync(engine, {}, dict(CONFIG, max_reconnects=2))
+        self.assertEqual(engine.connections, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import datetime
+import decimal
+import unittest
+
+import singer
+from singer.schema import Schema
+
+from tap_db2.sync_strategies.record_encoder import RecordEncoder
+from tap_db2.sync_strategies.stream_plan import StreamPlan
+
+from fakes import make_catalog_entry
+
+COLUMNS = ["ID", "NAME", "AMOUNT", "PRICE", "CREATED", "FLAG", "RATIO", "kéy \"q\""]
+
+ROWS = [
+    (1, "aardvark", decimal.Decimal("12.50"), decimal.Decimal("1.10"),
+     datetime.datetime(2023, 1, 2, 3, 4, 5), True, 1.5, "plain"),
+    (2**70, "béar \"quoted\"\n\t\x00\x7f", decimal.Decimal("-0.0000001"),
+     None, datetime.datetime(2023, 1, 2, 3, 4, 5, 123), False, 1e16, "\U0001F600"),
+    (None, None, None, None, None, None, None, None),
+]
+
+
+def make_stream():
+    formats = {"PRICE": "singer.decimal", "CREATED": "date-time"}
+    sql_data_types = {"CREATED": "timestamp", "FLAG": "boolean", "PRICE": "decimal"}
+    return make_catalog_entry(
+        {column: sql_data_types.get(column, "varchar") for column in COLUMNS},
+        properties={
+            column: Schema(type=["null", "string"], format=formats.get(column))
+            for column in COLUMNS
+        },
+    )
+
+
+class TestRecordEncoder(unittest.TestCase):
+    def assert_encodes_like_singer(self, table_stream, version, time_extracted):
+        plan = StreamPlan(make_stream(), COLUMNS, {})
+        encoder = RecordEncoder(plan, table_stream, version, time_extracted)
+
+        expected_batch = b""
+        for row in ROWS:
+            expected = singer.format_message(
+                singer.RecordMessage(
+                    stream=table_stream,
+                    record=plan.to_record(row),
+                    version=version,
+                    time_extracted=time_extracted,
+                )
+            )
+            self.assertEqual(encoder.encode_row(row), (expected + "\n").encode())
+            expected_batch += (expected + "\n").encode()
+
+        self.assertEqual(encoder.encode_batch(ROWS), expected_batch)
+
+    def test_matches_singer_format_message(self):
+        self.assert_encodes_like_singer(
+            "TABLE", 1509133344771, singer.utils.now()
+        )
+
+    def test_without_version_or_time_extracted(self):
+        self.assert_encodes_like_singer("TABLE", None, None)
+
+    def test_stream_name_containing_record_placeholder(self):
+        self.assert_encodes_like_singer(
+            'odd "record": {} stream', 1, singer.utils.now()
+        )
+
+    def test_non_finite_float_raises(self):
+        plan = StreamPlan(make_stream(), ["RATIO"], {})
+        encoder = RecordEncoder(plan, "TABLE", 1, None)
+
+        with self.assertRaises(ValueError):
+            encoder.encode_row((float("nan"),))
+
+
+if __name__ == "__main__":
+    unittest.main()
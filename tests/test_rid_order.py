@@ -0,0 +1,177 @@
+import io
+import json
+import re
+import unittest
+
+import tap_db2.sync_strategies.full_table as full_table
+import tap_db2.writer as writer
+from tap_db2.sync_strategies.rid_order import encode_rid, uses_rid_order
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+def rid(n):
+    # Row ids compare as bytes, like RID_BIT values
+    return n.to_bytes(4, "big") + b"\x00\x01"
+
+
+class RidEngine(FakeEngine):
+    """Answers the row id queries over a table of (row id, ID) rows."""
+
+    def __init__(self, ids):
+        super().__init__(sorted((rid((n * 7) % 101), n) for n in ids))
+
+    def answer(self, sql, params):
+        rows = self.rows
+        if "upper_rid" in params:
+            rows = [r for r in rows if r[0] <= params["upper_rid"]]
+        if "lower_rid" in params:
+            rows = [r for r in rows if r[0] > params["lower_rid"]]
+
+        if sql.startswith("SELECT MAX(RID_BIT"):
+            return FakeResults([(max((r[0] for r in rows), default=None),)])
+        if "COUNT(*)" in sql:
+            return FakeResults([(len(rows),)])
+        if "ROW_NUMBER" in sql:
+            step = int(re.search(r'MOD\("ROW_NUM", (\d+)\)', sql).group(1))
+            return FakeResults([(r[0],) for r in rows[step - 1::step]])
+        assert sql.endswith('ORDER BY RID_BIT("SCHEMA"."TABLE") FOR READ ONLY')
+        return self.results([(r[1], r[0]) for r in rows])
+
+    def results(self, rows):
+        return FakeResults(rows)
+
+
+class LostConnection(Exception):
+    pass
+
+
+class InterruptedResults(FakeResults):
+    """Loses the connection after fetching two batches."""
+
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.fetches = 0
+
+    def fetchmany(self, size):
+        self.fetches += 1
+        if self.fetches > 2:
+            raise LostConnection()
+        return super().fetchmany(size)
+
+
+class InterruptingRidEngine(RidEngine):
+    def results(self, rows):
+        return InterruptedResults(rows)
+
+
+def make_stream():
+    return make_catalog_entry(
+        {"ID": "integer"}, table_key_properties=[], full_table_rid_order=True
+    )
+
+
+class TestRidOrder(unittest.TestCase):
+    def sync(self, engine, state, config):
+        output = io.BytesIO()
+        message_writer = writer.MessageWriter(output, buffer_bytes=0)
+        with engine.connect() as open_conn:
+            full_table.sync_rows(
+                engine,
+                open_conn,
+                config,
+                make_stream(),
+                state,
+                ["ID"],
+                1,
+                "TABLE",
+                message_writer,
+            )
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_uses_rid_order(self):
+        self.assertTrue(uses_rid_order(make_stream(), {}))
+        # The rows are read in one query, so the chunk size plays no part
+        self.assertTrue(uses_rid_order(make_stream(), {"full_table_chunk_size": 0}))
+        self.assertFalse(
+            uses_rid_order(
+                make_catalog_entry({"ID": "integer"}, table_key_properties=["ID"]),
+                {"full_table_rid_order": True},
+            )
+        )
+
+    def test_single_ordered_query(self):
+        engine = RidEngine(range(101))
+        state = {}
+        messages = self.sync(engine, state, {"cursor_array_size": 30})
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, [r[1] for r in engine.rows])
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"]["last_rid_fetched"], encode_rid(rid(100))
+        )
+        # The MAX and a single ordered read, whatever the size of the table
+        self.assertEqual(len(engine.statements), 2)
+
+    def test_bookmarks_last_row_written(self):
+        engine = InterruptingRidEngine(range(101))
+        state = {}
+        output = io.BytesIO()
+        with self.assertRaises(LostConnection):
+            with engine.connect() as open_conn:
+                full_table.sync_rows(
+                    engine,
+                    open_conn,
+                    {"cursor_array_size": 30},
+                    make_stream(),
+                    state,
+                    ["ID"],
+                    1,
+                    "TABLE",
+                    writer.MessageWriter(output, buffer_bytes=0),
+                )
+        messages = [json.loads(line) for line in output.getvalue().splitlines()]
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, [r[1] for r in engine.rows[:60]])
+        self.assertEqual(
+            state["bookmarks"]["SCHEMA-TABLE"]["last_rid_fetched"],
+            encode_rid(engine.rows[59][0]),
+        )
+
+    def test_resumes_after_last_rid_fetched(self):
+        engine = RidEngine(range(101))
+        state = {
+            "bookmarks": {
+                "SCHEMA-TABLE": {
+                    "max_rid": encode_rid(rid(100)),
+                    "last_rid_fetched": encode_rid(rid(49)),
+                }
+            }
+        }
+        messages = self.sync(engine, state, {"cursor_array_size": 30})
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(ids, [r[1] for r in engine.rows[50:]])
+
+    def test_parallel_ranges(self):
+        engine = RidEngine(range(101))
+        state = {}
+        messages = self.sync(
+            engine, state, {"cursor_array_size": 10, "full_table_parallelism": 3}
+        )
+
+        ids = [m["record"]["ID"] for m in messages if m["type"] == "RECORD"]
+        self.assertEqual(sorted(ids), list(range(101)))
+        # COUNT, boundaries and MAX, then one ordered read per range
+        self.assertEqual(len(engine.statements), 6)
+        rid_ranges = state["bookmarks"]["SCHEMA-TABLE"]["rid_ranges"]
+        self.assertEqual(len(rid_ranges), 3)
+        self.assertTrue(all(r["complete"] for r in rid_ranges))
+        self.assertEqual(
+            [r["last_rid_fetched"] for r in rid_ranges], [r["upper"] for r in rid_ranges]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
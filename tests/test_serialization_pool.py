@@ -0,0 +1,69 @@
+import datetime
+import decimal
+import unittest
+
+import singer
+from singer.schema import Schema
+
+from tap_db2.sync_strategies.record_encoder import RecordEncoder
+from tap_db2.sync_strategies.serialization_pool import SerializationPool
+from tap_db2.sync_strategies.stream_plan import StreamPlan
+
+from fakes import make_catalog_entry
+
+COLUMNS = ["ID", "CREATED", "AMOUNT"]
+
+
+def make_stream():
+    return make_catalog_entry(
+        dict(zip(COLUMNS, ["integer", "timestamp", "decimal"])),
+        properties={
+            "ID": Schema(type=["null", "integer"]),
+            "CREATED": Schema(type=["null", "string"], format="date-time"),
+            "AMOUNT": Schema(type=["null", "string"], format="singer.decimal"),
+        },
+        table_key_properties=["ID"],
+    )
+
+
+class TestSerializationPool(unittest.TestCase):
+    def assert_encodes_batches_in_order(self, mode):
+        catalog_entry = make_stream()
+        time_extracted = singer.utils.now()
+        batches = [
+            [
+                (
+                    n,
+                    datetime.datetime(2023, 1, 1) + datetime.timedelta(seconds=n),
+                    decimal.Decimal(n) / 100,
+                )
+                for n in range(start, start + 50)
+            ]
+            for start in range(0, 1000, 50)
+        ]
+        encoder = RecordEncoder(
+            StreamPlan(catalog_entry, COLUMNS, {}), "TABLE", 1, time_extracted
+        )
+
+        with SerializationPool(
+            2, catalog_entry, COLUMNS, {}, "TABLE", 1, time_extracted, {"ID"}, mode
+        ) as pool:
+            results = list(pool.encode(iter(batches)))
+
+        self.assertEqual(len(results), len(batches))
+        for batch, (row_count, payload, bookmark_values) in zip(batches, results):
+            self.assertEqual(row_count, len(batch))
+            self.assertEqual(
+                payload, b"".join(encoder.encode_row(row) for row in batch)
+            )
+            self.assertEqual(bookmark_values, {"ID": batch[-1][0]})
+
+    def test_processes(self):
+        self.assert_encodes_batches_in_order("process")
+
+    def test_threads(self):
+        self.assert_encodes_batches_in_order("thread")
+
+
+if __name__ == "__main__":
+    unittest.main()
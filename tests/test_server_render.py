@@ -0,0 +1,180 @@
+import os
+import unittest
+
+from singer import metadata
+from singer.catalog import CatalogEntry
+from singer.schema import Schema
+
+import tap_db2
+from tap_db2.sync_strategies.common import generate_select_sql
+from tap_db2.sync_strategies.server_render import rendered_columns
+from tap_db2.sync_strategies.stream_plan import StreamPlan
+
+# Every type schema_for_column supports
+DATA_TYPES = sorted(
+    set(tap_db2.BYTES_FOR_INTEGER_TYPE)
+    | set(tap_db2.FLOAT_TYPE_EXPONENT)
+    | tap_db2.DECIMAL_TYPES
+    | tap_db2.STRING_TYPES
+    | tap_db2.DATETIME_TYPES
+    | tap_db2.DATE_TYPES
+    | tap_db2.TIME_TYPES
+    | {"boolean"}
+)
+
+
+def make_catalog_entry(data_types, config):
+    columns = [
+        tap_db2.Column("SCHEMA", "TABLE", data_type.upper(), data_type, 10, 2, 0)
+        for data_type in data_types
+    ]
+    return CatalogEntry(
+        tap_stream_id="SCHEMA-TABLE",
+        stream="TABLE",
+        table="TABLE",
+        database="SCHEMA",
+        schema=Schema(
+            type="object",
+            properties={
+                c.column_name: tap_db2.schema_for_column(c, config) for c in columns
+            },
+        ),
+        metadata=metadata.to_list(
+            metadata.write(
+                metadata.to_map(tap_db2.create_column_metadata(columns, config)),
+                (),
+                "database-name",
+                "SCHEMA",
+            )
+        ),
+    )
+
+
+class TestRenderedColumns(unittest.TestCase):
+    def rendered(self, config):
+        catalog_entry = make_catalog_entry(DATA_TYPES, config)
+        columns = [data_type.upper() for data_type in DATA_TYPES]
+        return set(rendered_columns(catalog_entry, columns, config))
+
+    def test_matrix(self):
+        for use_date_datatype in (False, True):
+            for use_singer_decimal in (False, True):
+                config = {
+                    "server_side_rendering": True,
+                    "use_date_datatype": use_date_datatype,
+                    "use_singer_decimal": use_singer_decimal,
+                }
+                expected = {"TIMESTAMP", "DATE", "TIME"}
+                if use_singer_decimal:
+                    expected |= {"DECIMAL", "NUMERIC", "DECFLOAT"}
+                self.assertEqual(self.rendered(config), expected, msg=config)
+
+    def test_off_by_default(self):
+        self.assertEqual(self.rendered({"use_singer_decimal": True}), set())
+
+    def test_select_sql(self):
+        config = {"server_side_rendering": True, "use_date_datatype": True}
+        catalog_entry = make_catalog_entry(["integer", "date"], config)
+        self.assertEqual(
+            generate_select_sql(catalog_entry, ["INTEGER", "DATE"], config),
+            'SELECT "INTEGER",CHAR("DATE", ISO) FROM "SCHEMA"."TABLE"',
+        )
+        self.assertEqual(
+            generate_select_sql(catalog_entry, ["INTEGER", "DATE"]),
+            'SELECT "INTEGER","DATE" FROM "SCHEMA"."TABLE"',
+        )
+
+    def test_plan_accepts_rendered_and_driver_values(self):
+        config = {"server_side_rendering": True}
+        catalog_entry = make_catalog_entry(["date"], config)
+        plan = StreamPlan(catalog_entry, ["DATE"], config)
+
+        self.assertEqual(
+            plan.convert_row(["2023-01-02T00:00:00+00:00"]),
+            ["2023-01-02T00:00:00+00:00"],
+        )
+
+
+# DB2 literals per type, rendered in the database and converted by the tap
+SAMPLE_VALUES = {
+    "TIMESTAMP": [
+        "TIMESTAMP('2023-01-02-03.04.05.000000')",
+        "TIMESTAMP('2023-01-02-03.04.05.000123')",
+        "TIMESTAMP('0001-01-01-00.00.00.999999')",
+        "TIMESTAMP('9999-12-31-23.59.59.100000')",
+    ],
+    "DATE": ["DATE('2023-01-02')", "DATE('0001-01-01')", "DATE('9999-12-31')"],
+    "TIME": ["TIME('00:00:00')", "TIME('23:59:59')", "TIME('12:05:09')"],
+    "DECIMAL(31,0)": ["0", "-1", "1234567890123456789012345678901"],
+    "DECIMAL(10,2)": ["0", "12.5", "-0.01", "99999999.99"],
+    "DECIMAL(31,10)": ["0", "0.0000001", "-12.5", "0.0000000001"],
+    "NUMERIC(5,5)": ["0.00001", "-0.5"],
+    "DECFLOAT(16)": ["0", "1.5", "-1E+10", "0.0000001", "123456789012.3456"],
+    "DECFLOAT(34)": ["12.50", "1E-30", "-0"],
+}
+
+
+def db2_config():
+    return {
+        key: os.environ.get(f"TAP_DB2_{key.upper()}")
+        for key in ("hostname", "port", "database", "username", "password")
+    }
+
+
+@unittest.skipUnless(
+    all(db2_config().values()),
+    "TAP_DB2_HOSTNAME/PORT/DATABASE/USERNAME/PASSWORD are not set",
+)
+class TestRenderedValuesMatchDb2(unittest.TestCase):
+    """Renders sample values in DB2 and compares them with the tap's conversion."""
+
+    def assert_rendered_like_tap(self, config):
+        from sqlalchemy import text
+
+        from tap_db2.connection import get_db2_engine
+
+        engine = get_db2_engine(dict(db2_config(), **config))
+        with engine.connect() as open_conn:
+            for sql_type, literals in SAMPLE_VALUES.items():
+                data_type = sql_type.split("(")[0].lower()
+                catalog_entry = make_catalog_entry([data_type], config)
+                column = data_type.upper()
+                escaped = f'"{column}"'
+                template = rendered_columns(catalog_entry, [column], config)[column]
+                plan = StreamPlan(
+                    catalog_entry,
+                    [column],
+                    dict(config, server_side_rendering=False),
+                )
+
+                for literal in literals + ["NULL"]:
+                    rendered, raw = open_conn.execute(
+                        text(
+                            f"SELECT {template.format(column=escaped)}, {escaped} "
+                            f"FROM (VALUES CAST({literal} AS {sql_type})) "
+                            f"AS T({escaped})"
+                        )
+                    ).fetchone()
+                    self.assertEqual(
+                        rendered,
+                        plan.convert_row([raw])[0],
+                        msg=f"{sql_type} {literal} {config}",
+                    )
+
+    def test_date_time_formats(self):
+        self.assert_rendered_like_tap(
+            {"server_side_rendering": True, "use_singer_decimal": True}
+        )
+
+    def test_date_datatype_formats(self):
+        self.assert_rendered_like_tap(
+            {
+                "server_side_rendering": True,
+                "use_singer_decimal": True,
+                "use_date_datatype": True,
+            }
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import datetime
+import unittest
+
+from tap_db2.sync_strategies.checksum_chunks import table_sql
+from tap_db2.sync_strategies.common import generate_select_sql
+from tap_db2.sync_strategies.snapshot import (
+    pin_system_time,
+    run_start_time,
+    uses_system_time,
+)
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class ClockEngine(FakeEngine):
+    def answer(self, sql, params):
+        return FakeResults([(datetime.datetime(2024, 3, 1, 12, 30, 0, 250),)])
+
+
+def make_stream(temporal=True, **stream_metadata):
+    if temporal:
+        stream_metadata["system_period_temporal"] = True
+    return make_catalog_entry(table_key_properties=["ID"], **stream_metadata)
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_uses_system_time(self):
+        self.assertTrue(uses_system_time(make_stream(), {}))
+        self.assertFalse(uses_system_time(make_stream(temporal=False), {}))
+        self.assertFalse(
+            uses_system_time(make_stream(), {"system_time_snapshot": False})
+        )
+        self.assertTrue(
+            uses_system_time(
+                make_stream(system_time_snapshot=True),
+                {"system_time_snapshot": False},
+            )
+        )
+
+    def test_run_start_from_database_clock(self):
+        engine = ClockEngine()
+        self.assertIsNone(
+            run_start_time(engine, [make_stream(temporal=False)], {})
+        )
+        self.assertEqual(engine.statements, [])
+
+        self.assertEqual(
+            run_start_time(engine, [make_stream()], {}),
+            "2024-03-01T12:30:00.000250",
+        )
+
+    def test_all_queries_read_as_of_the_pinned_time(self):
+        entry = make_stream()
+        as_of = pin_system_time(entry, {}, {}, "2024-03-01T12:30:00.000250")
+
+        self.assertEqual(as_of, "2024-03-01T12:30:00.000250")
+        clause = "FOR SYSTEM_TIME AS OF TIMESTAMP '2024-03-01 12:30:00.000250'"
+        self.assertEqual(
+            generate_select_sql(entry, ["ID"]),
+            f'SELECT "ID" FROM "SCHEMA"."TABLE" {clause}',
+        )
+        self.assertEqual(table_sql(entry), f'"SCHEMA"."TABLE" {clause}')
+
+    def test_interrupted_sync_keeps_its_time(self):
+        state = {"bookmarks": {"SCHEMA-TABLE": {"snapshot_time": "2024-02-01T00:00:00"}}}
+        entry = make_stream()
+        self.assertEqual(
+            pin_system_time(entry, state, {}, "2024-03-01T12:30:00"),
+            "2024-02-01T00:00:00",
+        )
+
+        entry = make_stream(temporal=False)
+        self.assertIsNone(pin_system_time(entry, state, {}, "2024-03-01T12:30:00"))
+        self.assertEqual(
+            generate_select_sql(entry, ["ID"]), 'SELECT "ID" FROM "SCHEMA"."TABLE"'
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
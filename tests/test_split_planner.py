@@ -0,0 +1,155 @@
+import datetime
+import decimal
+import re
+import unittest
+
+from tap_db2.sync_strategies.pk_ranges import plan_pk_ranges
+from tap_db2.sync_strategies.split_planner import (
+    parse_literal,
+    split_values_from_statistics,
+    statistics_problem,
+)
+
+from fakes import FakeEngine, FakeResults, make_catalog_entry
+
+
+class StatisticsEngine(FakeEngine):
+    """Answers the split queries over sorted (ID,) rows and catalog statistics."""
+
+    def __init__(self, rows, statistics=None, coldist=(), sample=None):
+        super().__init__(sorted(rows))
+        self.statistics = statistics
+        self.coldist = list(coldist)
+        self.sample = sample
+
+    def answer(self, sql, params):
+        if "SYSCAT.COLDIST" in sql:
+            return FakeResults(self.coldist)
+        if "SYSCAT.TABLES" in sql:
+            return FakeResults([self.statistics] if self.statistics else [])
+
+        rows = [row for row in self.rows if row[0] <= params["max_pk_0"]]
+        if "TABLESAMPLE" in sql:
+            return FakeResults(self.sample if self.sample is not None else [])
+        if "split_value" in params:
+            return FakeResults(
+                [row for row in rows if row[0] <= params["split_value"]][-1:]
+            )
+        if "COUNT(*)" in sql:
+            return FakeResults([(len(rows),)])
+        step = int(re.search(r'MOD\("ROW_NUM", (\d+)\)', sql).group(1))
+        return FakeResults(rows[step - 1::step])
+
+
+def make_stream():
+    return make_catalog_entry({"ID": "integer"}, table_key_properties=["ID"])
+
+
+def upper_bounds(pk_ranges):
+    return [r["upper"]["ID"] for r in pk_ranges]
+
+
+class TestSplitPlanner(unittest.TestCase):
+    def test_parse_literal(self):
+        self.assertEqual(parse_literal("42"), decimal.Decimal("42"))
+        self.assertEqual(parse_literal("'O''Brien'"), "O'Brien")
+        self.assertIsNone(parse_literal(None))
+
+    def test_statistics_problem(self):
+        now = datetime.datetime(2024, 1, 10)
+        statistics = {"card": 100, "stats_time": datetime.datetime(2024, 1, 9)}
+        self.assertIsNone(statistics_problem(statistics, 48, now))
+        self.assertIn("old", statistics_problem(statistics, 12, now))
+        self.assertIn("CARD", statistics_problem(dict(statistics, card=-1), 48, now))
+        self.assertIsNotNone(statistics_problem(None, 48, now))
+
+    def test_split_values_from_quantiles(self):
+        statistics = {
+            "card": 1000,
+            "quantiles": [
+                (decimal.Decimal(value), count)
+                for value, count in [(1, 1), (90, 240), (95, 510), (300, 760)]
+            ],
+        }
+        self.assertEqual(
+            split_values_from_statistics(statistics, 4, "integer"),
+            [decimal.Decimal(90), decimal.Decimal(95), decimal.Decimal(300)],
+        )
+
+    def test_split_values_interpolated(self):
+        statistics = {
+            "card": 1000,
+            "quantiles": [],
+            "low2key": decimal.Decimal(0),
+            "high2key": decimal.Decimal(100),
+        }
+        self.assertEqual(
+            split_values_from_statistics(statistics, 4, "integer"), [25, 50, 75]
+        )
+        self.assertIsNone(split_values_from_statistics(statistics, 4, "varchar"))
+
+    def test_plans_from_statistics(self):
+        # IDs are dense up to 100 and sparse after, which the quantiles show
+        rows = [(n,) for n in range(1, 101)] + [(n,) for n in range(200, 1001, 100)]
+        engine = StatisticsEngine(
+            rows,
+            statistics=(108, datetime.datetime.now(), "2", "900"),
+            coldist=[("Q", "1", 1), ("Q", "54", 54), ("Q", "99", 99), ("F", "7", 1)],
+        )
+        pk_ranges = plan_pk_ranges(
+            engine.connect(), make_stream(), ["ID"], {"ID": 1000}, 2, {}
+        )
+        self.assertEqual(upper_bounds(pk_ranges), [54, 1000])
+        self.assertFalse(any("COUNT(*)" in sql for sql in engine.statements))
+
+    def test_split_values_snap_to_keys(self):
+        rows = [(n,) for n in range(0, 1001, 10)]
+        engine = StatisticsEngine(
+            rows, statistics=(101, datetime.datetime.now(), "10", "990")
+        )
+        pk_ranges = plan_pk_ranges(
+            engine.connect(), make_stream(), ["ID"], {"ID": 1000}, 3, {}
+        )
+        # 10 + 980 / 3 and 10 + 2 * 980 / 3, moved down to existing keys
+        self.assertEqual(upper_bounds(pk_ranges), [330, 660, 1000])
+
+    def test_stale_statistics_fall_back_to_sample(self):
+        rows = [(n,) for n in range(1, 101)]
+        engine = StatisticsEngine(
+            rows,
+            statistics=(10, datetime.datetime(2000, 1, 1), "1", "10"),
+            sample=[(n,) for n in range(100, 0, -10)],
+        )
+        pk_ranges = plan_pk_ranges(
+            engine.connect(), make_stream(), ["ID"], {"ID": 100}, 2, {}
+        )
+        self.assertEqual(upper_bounds(pk_ranges), [60, 100])
+
+    def test_empty_sample_falls_back_to_scan(self):
+        rows = [(n,) for n in range(1, 101)]
+        engine = StatisticsEngine(rows, sample=[])
+        pk_ranges = plan_pk_ranges(
+            engine.connect(),
+            make_stream(),
+            ["ID"],
+            {"ID": 100},
+            4,
+            {"split_planner": "sample"},
+        )
+        self.assertEqual(upper_bounds(pk_ranges), [25, 50, 75, 100])
+        self.assertFalse(any("SYSCAT" in sql for sql in engine.statements))
+
+    def test_unknown_planner(self):
+        with self.assertRaises(Exception):
+            plan_pk_ranges(
+                StatisticsEngine([]).connect(),
+                make_stream(),
+                ["ID"],
+                {"ID": 1},
+                2,
+                {"split_planner": "guess"},
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import datetime
+import decimal
+import unittest
+import uuid
+
+from singer.schema import Schema
+
+from tap_db2.sync_strategies.stream_plan import StreamPlan, convert_value
+
+from fakes import make_catalog_entry
+
+VALUES = [
+    None,
+    0,
+    1,
+    -42,
+    True,
+    False,
+    1.5,
+    "abc",
+    "",
+    decimal.Decimal("12.50"),
+    decimal.Decimal("0.0000001"),
+    datetime.datetime(2023, 1, 2, 3, 4, 5),
+    datetime.datetime(2023, 1, 2, 3, 4, 5, 678),
+    datetime.date(2023, 1, 2),
+    datetime.time(3, 4, 5),
+    datetime.time(3, 4, 5, 678),
+    datetime.timedelta(hours=1, minutes=2),
+    b"\x00",
+    b"\x01\xff",
+    uuid.UUID("12345678-1234-5678-1234-567812345678"),
+]
+
+# (column, sql-datatype, schema format)
+COLUMNS = [
+    ("c_int", "integer", None),
+    ("c_varchar", "varchar", None),
+    ("c_decimal", "decimal", None),
+    ("c_singer_decimal", "decimal", "singer.decimal"),
+    ("c_decfloat", "decfloat", "singer.decimal"),
+    ("c_timestamp", "timestamp", "date-time"),
+    ("c_date", "date", "date-time"),
+    ("c_time", "time", "date-time"),
+    ("c_time_format", "time", "time"),
+    ("c_boolean", "boolean", None),
+    ("c_binary", "binary", None),
+    ("c_varbinary", "varbinary", None),
+]
+
+
+def make_stream():
+    return make_catalog_entry(
+        {column: sql_data_type for column, sql_data_type, _ in COLUMNS},
+        properties={
+            column: Schema(
+                type=["null", "string"], format=property_format, inclusion="available"
+            )
+            for column, _, property_format in COLUMNS
+        },
+    )
+
+
+class TestStreamPlan(unittest.TestCase):
+    def assert_matches_generic_chain(self, config):
+        catalog_entry = make_stream()
+        columns = [c[0] for c in COLUMNS]
+        plan = StreamPlan(catalog_entry, columns, config)
+        use_date_data_type_format = bool(config.get("use_date_datatype"))
+
+        for value in VALUES:
+            row = [value] * len(columns)
+            expected = [
+                convert_value(
+                    value, sql_data_type, property_format, use_date_data_type_format
+                )
+                for _, sql_data_type, property_format in COLUMNS
+            ]
+            actual = plan.convert_row(row)
+            self.assertEqual(actual, expected, msg=repr(value))
+            self.assertEqual(
+                [type(v) for v in actual], [type(v) for v in expected], msg=repr(value)
+            )
+
+    def test_matches_generic_chain(self):
+        self.assert_matches_generic_chain({})
+
+    def test_matches_generic_chain_with_date_datatype(self):
+        self.assert_matches_generic_chain({"use_date_datatype": True})
+
+    def test_convert_batch(self):
+        catalog_entry = make_stream()
+        columns = [c[0] for c in COLUMNS]
+        plan = StreamPlan(catalog_entry, columns, {})
+        rows = [tuple([value] * len(columns)) for value in VALUES]
+
+        self.assertEqual(
+            plan.convert_batch(rows), [tuple(plan.convert_row(row)) for row in rows]
+        )
+
+    def test_to_record(self):
+        catalog_entry = make_stream()
+        plan = StreamPlan(catalog_entry, ["c_int", "c_date", "c_binary"], {})
+
+        self.assertEqual(
+            plan.to_record([1, datetime.date(2023, 1, 2), b"\xab"]),
+            {
+                "c_int": 1,
+                "c_date": "2023-01-02T00:00:00+00:00",
+                "c_binary": "0xAB",
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import datetime
+import unittest
+
+from tap_db2.sync_strategies.temporal import (
+    CACHE_SAMPLE_SIZE,
+    TemporalFormatter,
+    date_format_function,
+    format_timestamp,
+    time_format_function,
+)
+
+
+def fallback(elem):
+    return ("fallback", elem)
+
+
+class TestTemporalFormatter(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(
+            format_timestamp(datetime.datetime(2023, 1, 2, 3, 4, 5, 6)),
+            "2023-01-02T03:04:05.000006+00:00",
+        )
+        self.assertEqual(
+            date_format_function(False)(datetime.date(2023, 1, 2)),
+            "2023-01-02T00:00:00+00:00",
+        )
+        self.assertEqual(
+            date_format_function(True)(datetime.date(2023, 1, 2)), "2023-01-02"
+        )
+        self.assertEqual(time_format_function("time")(datetime.time(3, 4)), "03:04:00")
+        self.assertEqual(
+            time_format_function("date-time")(datetime.time(3, 4)),
+            "1970-01-01T03:04:00+00:00",
+        )
+
+    def test_format_batch(self):
+        formatter = TemporalFormatter(
+            "C", datetime.date, date_format_function(True), fallback
+        )
+        values = [datetime.date(2023, 1, 2), None, "2023-01-02"]
+        self.assertEqual(
+            formatter.format_batch(values),
+            ["2023-01-02", None, ("fallback", "2023-01-02")],
+        )
+        self.assertEqual(
+            [formatter(value) for value in values], formatter.format_batch(values)
+        )
+
+    def test_keeps_cache_for_repeated_values(self):
+        formatter = TemporalFormatter(
+            "C", datetime.date, date_format_function(False), fallback
+        )
+        days = [
+            datetime.date(2023, 1, 1) + datetime.timedelta(n % 30)
+            for n in range(1000)
+        ]
+        for _ in range(CACHE_SAMPLE_SIZE // len(days) + 1):
+            formatter.format_batch(days)
+
+        self.assertIs(formatter.format, formatter.cached)
+        self.assertEqual(formatter.cached.cache_info().currsize, 30)
+
+    def test_drops_cache_for_distinct_values(self):
+        formatter = TemporalFormatter(
+            "C", datetime.datetime, format_timestamp, fallback
+        )
+        start = datetime.datetime(2023, 1, 1)
+        values = [
+            start + datetime.timedelta(seconds=n) for n in range(CACHE_SAMPLE_SIZE)
+        ]
+        formatted = formatter.format_batch(values)
+
+        self.assertEqual(formatted, [format_timestamp(value) for value in values])
+        self.assertIs(formatter.format, format_timestamp)
+        self.assertIsNone(formatter.cached)
+
+    def test_without_cache(self):
+        formatter = TemporalFormatter(
+            "C", datetime.datetime, format_timestamp, fallback, cache_size=0
+        )
+        self.assertIsNone(formatter.cached)
+        self.assertEqual(
+            formatter(datetime.datetime(2023, 1, 2)), "2023-01-02T00:00:00+00:00"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import singer
+
+from tap_db2.writer import MessageWriter, SpoolRing, from_config
+
+
+def record(n):
+    return singer.RecordMessage(stream="TABLE", record={"ID": n}, version=1)
+
+
+def expected_lines(messages):
+    return b"".join(
+        (singer.format_message(m) + "\n").encode() for m in messages
+    )
+
+
+class TestMessageWriter(unittest.TestCase):
+    def test_buffers_until_state(self):
+        output = io.BytesIO()
+        message_writer = MessageWriter(output, buffer_bytes=10**6, flush_seconds=60)
+
+        messages = [record(1), record(2)]
+        for message in messages:
+            message_writer.write_message(message)
+        self.assertEqual(output.getvalue(), b"")
+
+        state = singer.StateMessage(value={"bookmarks": {}})
+        message_writer.write_message(state)
+        self.assertEqual(output.getvalue(), expected_lines(messages + [state]))
+
+    def test_flushes_by_size(self):
+        output = io.BytesIO()
+        message_writer = MessageWriter(output, buffer_bytes=1, flush_seconds=60)
+
+        message_writer.write_message(record(1))
+        self.assertEqual(output.getvalue(), expected_lines([record(1)]))
+
+    def test_flushes_by_time(self):
+        output = io.BytesIO()
+        message_writer = MessageWriter(output, buffer_bytes=10**6, flush_seconds=0.01)
+
+        message_writer.write_message(record(1))
+        time.sleep(0.02)
+        message_writer.write_message(record(2))
+        self.assertEqual(output.getvalue(), expected_lines([record(1), record(2)]))
+
+    def test_text_output(self):
+        output = io.StringIO()
+        message_writer = MessageWriter(output, buffer_bytes=0)
+
+        message_writer.write_bytes(b'{"type": "STATE", "value": {}}\n')
+        self.assertEqual(output.getvalue(), '{"type": "STATE", "value": {}}\n')
+
+    def test_writer_thread_keeps_order(self):
+        output = io.BytesIO()
+        message_writer = MessageWriter(
+            output, buffer_bytes=100, flush_seconds=60, use_thread=True
+        )
+
+        messages = []
+        for n in range(1000):
+            messages.append(record(n))
+            if n % 97 == 0:
+                messages.append(singer.StateMessage(value={"n": n}))
+        for message in messages:
+            message_writer.write_message(message)
+        message_writer.close()
+
+        self.assertEqual(output.getvalue(), expected_lines(messages))
+
+    def test_writer_thread_flushes_idle_buffer(self):
+        output = io.BytesIO()
+        message_writer = MessageWriter(
+            output, buffer_bytes=10**6, flush_seconds=0.01, use_thread=True
+        )
+
+        message_writer.write_bytes(b"x\n")
+        deadline = time.monotonic() + 5
+        while output.getvalue() != b"x\n" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        message_writer.close()
+
+        self.assertEqual(output.getvalue(), b"x\n")
+
+    def test_writer_thread_error_is_raised(self):
+        class BrokenPipe(io.BytesIO):
+            def write(self, data):
+                raise BrokenPipeError()
+
+        message_writer = MessageWriter(
+            BrokenPipe(), buffer_bytes=0, flush_seconds=60, use_thread=True
+        )
+        message_writer.write_bytes(b"x\n")
+
+        with self.assertRaises(BrokenPipeError):
+            message_writer.close()
+
+
+class TestSpool(unittest.TestCase):
+    def test_ring_wraps_around(self):
+        ring = SpoolRing(10)
+        ring.put(b"abcdefg")
+        self.assertEqual(ring.get(), b"abcdefg")
+        ring.put(b"hijklmn")
+        self.assertEqual(ring.get() + ring.get(), b"hijklmn")
+        ring.close()
+        self.assertIsNone(ring.get())
+        ring.release()
+
+    def test_spool_keeps_order(self):
+        output = io.BytesIO()
+        message_writer = MessageWriter(
+            output, buffer_bytes=100, flush_seconds=60, spool_bytes=1000
+        )
+
+        messages = []
+        for n in range(1000):
+            messages.append(record(n))
+            if n % 97 == 0:
+                messages.append(singer.StateMessage(value={"n": n}))
+        for message in messages:
+            message_writer.write_message(message)
+        message_writer.close()
+
+        self.assertEqual(output.getvalue(), expected_lines(messages))
+
+    def test_spool_runs_ahead_of_a_slow_target(self):
+        release = threading.Event()
+
+        class SlowOutput(io.BytesIO):
+            def write(self, data):
+                release.wait()
+                return super().write(data)
+
+        output = SlowOutput()
+        message_writer = MessageWriter(
+            output, buffer_bytes=0, flush_seconds=60, spool_bytes=10**6
+        )
+        messages = [record(n) for n in range(100)]
+        for message in messages:
+            message_writer.write_message(message)
+
+        # Everything was written to the spool while the target was stuck
+        self.assertEqual(output.getvalue(), b"")
+        release.set()
+        message_writer.close()
+        self.assertEqual(output.getvalue(), expected_lines(messages))
+
+    def test_spool_leaves_no_file(self):
+        with tempfile.TemporaryDirectory() as spool_dir:
+            message_writer = MessageWriter(
+                io.BytesIO(), buffer_bytes=0, spool_bytes=1000, spool_dir=spool_dir
+            )
+            message_writer.write_message(record(1))
+            if os.name == "posix":
+                self.assertEqual(os.listdir(spool_dir), [])
+            message_writer.close()
+            self.assertEqual(os.listdir(spool_dir), [])
+
+    def test_from_config(self):
+        message_writer = from_config({})
+        self.assertFalse(message_writer.has_thread)
+        self.assertIsNone(message_writer.spool_capacity)
+
+        with tempfile.TemporaryDirectory() as spool_dir:
+            message_writer = from_config(
+                {"output_spool_bytes": 1000, "output_spool_dir": spool_dir}
+            )
+            self.assertTrue(message_writer.has_thread)
+            self.assertEqual(message_writer.spool_capacity, 1000)
+            message_writer.close()
+            self.assertFalse(message_writer.has_thread)
+
+    def test_spool_writer_error_is_raised(self):
+        class BrokenPipe(io.BytesIO):
+            def write(self, data):
+                raise BrokenPipeError()
+
+        message_writer = MessageWriter(
+            BrokenPipe(), buffer_bytes=0, flush_seconds=60, spool_bytes=100
+        )
+        with self.assertRaises(BrokenPipeError):
+            for _ in range(100):
+                message_writer.write_bytes(b"x" * 50 + b"\n")
+            message_writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()